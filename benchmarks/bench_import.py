@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: benchmarks/bench_import.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Import time benchmark - imports each of the headless nim_core entry points in a
+#  fresh interpreter, the way a render farm task or a DCC startup script does, and
+#  reports the time taken and the NIM, GUI and application modules that were loaded.
+#
+#  Python 2 has no "-X importtime", so --tree prints the same report by timing each
+#  import statement :
+#
+#      import time: self [us] | cumulative | imported package
+#
+#  The modules each entry point loads are tracked in import_baseline.json, next to
+#  this file.  --check fails if an entry point loads a module that isn't listed there,
+#  and --save records the current modules and times as the new baseline :
+#
+#      python benchmarks/bench_import.py --check
+#      python benchmarks/bench_import.py --tree nim_core.nim_api
+
+
+#  General Imports :
+import argparse, json, os, subprocess, sys, tempfile, shutil
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+
+#  Variables :
+entries=['nim_core.nim_api', 'nim_core.nim_batch', 'nim_core.nim_client', 'nim_core.nim_file',
+    'nim_core.nim_postsave', 'nim_core.nim_prefs', 'nim_core.nim_prewarm', 'nim_core.nim_publish',
+    'nim_core.nim_versions']
+#  Top level packages that are tracked, besides nim_core - Qt and the applications :
+tracked=['PySide', 'PySide2', 'PyQt4', 'PyQt5', 'shiboken', 'shiboken2', 'sip',
+    'maya', 'nuke', 'hiero', 'hou', 'c4d', 'MaxPlus', 'pymxs', 'flame']
+baseline_path=os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'import_baseline.json' )
+
+#  Run in the fresh interpreter - imports the entry point and prints the result as JSON :
+_child='''
+import json, sys, time
+sys.path.insert( 0, %(root)r )
+tree=%(tree)r
+records=[]
+if tree :
+    import __builtin__
+    _import=__builtin__.__import__
+    stack=[]
+    seen=set( sys.modules )
+    def _timed( name, globals=None, locals=None, fromlist=None, level=-1 ) :
+        count=len( sys.modules )
+        stack.append( [0.0] )
+        start=time.time()
+        try :
+            return _import( name, globals, locals, fromlist, level )
+        finally :
+            elapsed=time.time()-start
+            children=stack.pop()[0]
+            if stack :
+                stack[-1][0]+=elapsed
+            if len( sys.modules )!=count :
+                new=[key for key in sys.modules if key not in seen and sys.modules[key] is not None]
+                label=[key for key in new if key==name or key.endswith( '.'+name )]
+                if label :
+                    seen.add( label[0] )
+                    records.append( ( len( stack ), int( (elapsed-children)*1e6 ), int( elapsed*1e6 ), label[0] ) )
+    __builtin__.__import__=_timed
+before=set( sys.modules )
+start=time.time()
+__import__( %(entry)r )
+elapsed=time.time()-start
+loaded=sorted( [key for key in set( sys.modules )-before if sys.modules[key] is not None] )
+print json.dumps( {'ms': elapsed*1000, 'modules': loaded, 'tree': records} )
+'''
+
+
+def _tracked( modules=None ) :
+    'Returns the loaded modules that are tracked - nim_core, Qt and the applications'
+    return sorted( [name for name in modules if name.split( '.' )[0] in ['nim_core']+tracked] )
+
+def measure( entry='', tree=False ) :
+    'Imports an entry point in a new interpreter, with an empty NIM home, and returns the result'
+    home=tempfile.mkdtemp( prefix='nim_bench_import_' )
+    env=dict( os.environ )
+    env['HOME']=env['USERPROFILE']=home
+    try :
+        output=subprocess.check_output( [sys.executable, '-c', _child % {'root': root, 'tree': tree, 'entry': entry}],
+            env=env, cwd=home )
+    finally :
+        shutil.rmtree( home, ignore_errors=True )
+    return json.loads( output.strip().splitlines()[-1] )
+
+def run( repeat=5 ) :
+    'Measures every entry point, returning { entry : { "ms", "modules" } }'
+    results={}
+    for entry in entries :
+        times=[]
+        for index in range( repeat ) :
+            result=measure( entry )
+            times.append( result['ms'] )
+        results[entry]={'ms': round( sorted( times )[len( times )/2], 1 ), 'modules': _tracked( result['modules'] )}
+    return results
+
+def print_tree( entry='' ) :
+    'Prints an "-X importtime" style report for one entry point'
+    result=measure( entry, tree=True )
+    print 'import time: self [us] | cumulative | imported package'
+    for depth, selfTime, cumulative, name in result['tree'] :
+        print 'import time: %9d | %10d | %s%s' % ( selfTime, cumulative, '  '*depth, name )
+    return
+
+def check( results=None, baseline=None ) :
+    'Returns the problems found comparing results to the baseline'
+    problems=[]
+    for entry in entries :
+        known=baseline.get( entry )
+        if known is None :
+            problems.append( '%s isn\'t in the baseline - run with --save' % entry )
+            continue
+        added=sorted( set( results[entry]['modules'] )-set( known['modules'] ) )
+        if added :
+            problems.append( '%s now imports %s' % ( entry, ', '.join( added ) ) )
+    return problems
+
+
+if __name__=='__main__' :
+    parser=argparse.ArgumentParser( description='Times importing the headless nim_core modules.' )
+    parser.add_argument( '--repeat', type=int, default=5, help='imports timed per entry point' )
+    parser.add_argument( '--tree', metavar='MODULE', help='print an "-X importtime" style report for a module' )
+    parser.add_argument( '--check', action='store_true', help='fail if an entry point loads modules not in the baseline' )
+    parser.add_argument( '--save', action='store_true', help='record the results as the new baseline' )
+    args=parser.parse_args()
+
+    if args.tree :
+        print_tree( args.tree )
+        sys.exit( 0 )
+
+    baseline={}
+    if os.path.isfile( baseline_path ) :
+        with open( baseline_path, 'r' ) as baselineFile :
+            baseline=json.load( baselineFile )
+    results=run( repeat=args.repeat )
+    print '%-24s %10s %12s %8s' % ( 'entry point', 'median ms', 'baseline ms', 'modules' )
+    for entry in entries :
+        known=baseline.get( entry, {} )
+        print '%-24s %10.1f %12s %8d' % ( entry, results[entry]['ms'],
+            '%.1f' % known['ms'] if 'ms' in known else '-', len( results[entry]['modules'] ) )
+
+    if args.save :
+        with open( baseline_path, 'w' ) as baselineFile :
+            json.dump( results, baselineFile, indent=4, separators=(',', ': '), sort_keys=True )
+            baselineFile.write( '\n' )
+        print 'Saved %s' % baseline_path
+    if args.check :
+        problems=check( results, baseline )
+        for problem in problems :
+            print problem
+        sys.exit( 1 if problems else 0 )
+
+
+#  End
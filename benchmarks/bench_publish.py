@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: benchmarks/bench_publish.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Publish benchmark - publishes scene files of a few sizes with each of the
+#  nim_publish strategies on its own, with the default strategy order, and with
+#  shutil.copyfile, as publish_copy did before nim_publish.  Each publish replaces
+#  the previous one at the same path, as publishing new versions of a scene does.
+#
+#  For each run it reports the median time, the throughput, and the disk space the
+#  published file took, from the free space on the file system.  Strategies the
+#  file system doesn't support are reported as such.  Run it on the file system to
+#  measure - by default a temporary directory :
+#
+#      python benchmarks/bench_publish.py --dir /mnt/projects --sizes 1 64 512
+
+
+#  General Imports :
+import argparse, os, shutil, sys, tempfile, time
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+#  NIM Imports :
+import nim_core.nim_publish as Pub
+
+
+#  Variables :
+runs=['shutil', 'reflink', 'hardlink', 'symlink', 'copy', 'default']
+chunk_size=1024*1024
+
+
+class _Quiet( object ) :
+    'Hides the publish messages while timing'
+    def __enter__(self) :
+        self.stdout, sys.stdout=sys.stdout, open( os.devnull, 'w' )
+    def __exit__( self, *args ) :
+        sys.stdout.close()
+        sys.stdout=self.stdout
+        return False
+
+
+def _makeFile( filePath='', size=0 ) :
+    'Writes a file of random data, as a scene file that doesn\'t compress'
+    with open( filePath, 'wb' ) as f :
+        written=0
+        while written < size :
+            data=os.urandom( min( chunk_size, size-written ) )
+            f.write( data )
+            written+=len( data )
+        f.flush()
+        os.fsync( f.fileno() )
+    return
+
+def _freeBytes( path='' ) :
+    'Returns the space free on the file system holding a path, or None if it can\'t be read'
+    if not hasattr( os, 'statvfs' ) :
+        return None
+    st=os.statvfs( path )
+    return st.f_bavail*st.f_frsize
+
+def _publish( run='', filePath='', pubPath='' ) :
+    'Publishes a file with one run\'s strategy, returning the strategy used, or False'
+    if run=='shutil' :
+        if os.path.lexists( pubPath ) :
+            os.chmod( pubPath, 0644 )
+            os.remove( pubPath )
+        shutil.copyfile( filePath, pubPath )
+        return 'shutil'
+    with _Quiet() :
+        return Pub.publish_file( filePath=filePath, pubPath=pubPath, order=None if run=='default' else [run] )
+
+def _clear( pubDir='' ) :
+    'Removes the published files'
+    for name in os.listdir( pubDir ) :
+        path=os.path.join( pubDir, name )
+        if not os.path.islink( path ) :
+            os.chmod( path, 0644 )
+        os.remove( path )
+    return
+
+def _median( values=None ) :
+    values=sorted( values )
+    return values[len( values )/2]
+
+def run( workDir=None, sizes=None, repeat=5 ) :
+    'Runs the benchmark, returning the report lines'
+    baseDir=tempfile.mkdtemp( prefix='nim_bench_publish_', dir=workDir )
+    srcDir=os.path.join( baseDir, 'work' )
+    pubDir=os.path.join( baseDir, 'pub' )
+    os.makedirs( srcDir )
+    os.makedirs( pubDir )
+    lines=['Publishing in %s, median of %d runs' % ( baseDir, repeat ), '',
+        '%8s %-10s %-10s %10s %10s %10s' % ( 'size MB', 'run', 'used', 'median ms', 'MB/s', 'disk MB' )]
+    try :
+        for sizeMB in sizes or [1, 64, 256] :
+            filePath=os.path.join( srcDir, 'SH010_comp_v01.nk' )
+            pubPath=os.path.join( pubDir, 'SH010_comp.nk' )
+            _makeFile( filePath, int( sizeMB*1024*1024 ) )
+            for runName in runs :
+                #  Find out again whether the file system supports the strategy :
+                Pub._unsupported.clear()
+                _clear( pubDir )
+                times=[]
+                used=None
+                free=_freeBytes( pubDir )
+                for index in range( repeat ) :
+                    start=time.time()
+                    used=_publish( runName, filePath, pubPath )
+                    times.append( time.time()-start )
+                    if not used :
+                        break
+                    if index==0 and free is not None :
+                        disk=( free-_freeBytes( pubDir ) )/1048576.0
+                if not used :
+                    lines.append( '%8s %-10s %-10s %10s %10s %10s' % ( sizeMB, runName, 'unsupported', '-', '-', '-' ) )
+                    continue
+                median=_median( times )
+                lines.append( '%8s %-10s %-10s %10.2f %10.1f %10s' % ( sizeMB, runName, used, median*1000,
+                    sizeMB/median if median else 0.0, '%.1f' % disk if free is not None else '-' ) )
+            os.remove( filePath )
+    finally :
+        _clear( pubDir )
+        shutil.rmtree( baseDir, ignore_errors=True )
+    return lines
+
+
+if __name__=='__main__' :
+    parser=argparse.ArgumentParser( description='Times publishing scene files with each publish strategy.' )
+    parser.add_argument( '--dir', default=None, help='directory on the file system to test - a temporary one by default' )
+    parser.add_argument( '--sizes', type=float, nargs='+', default=[1, 64, 256], help='file sizes, in MB' )
+    parser.add_argument( '--repeat', type=int, default=5, help='publishes timed per strategy and size' )
+    args=parser.parse_args()
+    for line in run( workDir=args.dir, sizes=args.sizes, repeat=args.repeat ) :
+        print line
+
+
+#  End
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: benchmarks/bench_thumbs.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Thumbnail loading benchmark - scrolls through a list of shots the way an artist
+#  holding the arrow key does, against a local stand-in NIM server that serves the
+#  shot icons.  Three runs are timed :
+#
+#      synchronous  - each selection fetches, decodes and scales its icon on the UI
+#                     thread, as the GUI did before nim_thumbs
+#      background   - each selection asks nim_thumbs.ThumbService for the icon
+#      scroll back  - scrolls back over the shots just seen, which are cached
+#
+#  For each run it reports the time the UI thread was blocked per selection, the
+#  requests that reached the server, and how long the last shot took to show.
+#
+#      QT_QPA_PLATFORM=offscreen python benchmarks/bench_thumbs.py --shots 300
+
+
+#  General Imports :
+import argparse, os, shutil, sys, tempfile, time
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, root )
+sys.path.insert( 0, os.path.join( root, 'tests' ) )
+
+#  Import Python GUI packages :
+try :
+    from PySide2 import QtCore, QtGui
+    from PySide2.QtWidgets import QApplication
+except ImportError :
+    try :
+        from PySide import QtCore, QtGui
+        from PySide.QtGui import QApplication
+    except ImportError :
+        try :
+            from PyQt4 import QtCore, QtGui
+            from PyQt4.QtGui import QApplication
+        except ImportError :
+            print 'Qt is not available - skipping the thumbnail benchmark'
+            sys.exit( 0 )
+
+from nim_test_server import NimTestServer
+
+
+#  Variables :
+icon_width=1920
+icon_height=1080
+icon_variants=8
+
+
+def _icons() :
+    'Returns a few full size JPEG shot icons, as the server stores them'
+    icons=[]
+    for index in range( icon_variants ) :
+        image=QtGui.QImage( icon_width, icon_height, QtGui.QImage.Format_RGB32 )
+        image.fill( QtGui.QColor.fromHsv( index*360/icon_variants, 160, 200 ) )
+        data=QtCore.QByteArray()
+        buf=QtCore.QBuffer( data )
+        buf.open( QtCore.QIODevice.WriteOnly )
+        image.save( buf, 'JPG', 90 )
+        buf.close()
+        icons.append( str(data) if not hasattr( data, 'data' ) else data.data() )
+    return icons
+
+def _shotIcon( params=None, headers=None ) :
+    'Answers getShotIcon with a link to the shot\'s icon'
+    return [{'img_link': 'img/%s.jpg' % params.get( 'ID' )}]
+
+def _pump( app=None, seconds=0.0 ) :
+    'Runs the event loop for a while, as the UI does between key presses'
+    end=time.time()+seconds
+    while True :
+        app.processEvents()
+        remaining=end-time.time()
+        if remaining <= 0 :
+            return
+        time.sleep( min( remaining, 0.002 ) )
+
+
+class Viewer( QtCore.QObject ) :
+    'Stands in for the GUI\'s thumbnail label - keeps the last pixmap shown for the selected shot'
+
+    def __init__( self, service=None ) :
+        super( Viewer, self ).__init__()
+        self.service=service
+        self.selected=None
+        self.shownAt={}
+        if service is not None :
+            service.ready.connect( self.set_img )
+        return
+
+    def set_img( self, elem='shot', itemID=None, size=0, img=None ) :
+        if img is not None :
+            self.service.store( elem=elem, itemID=itemID, size=size, img=img )
+        if str(itemID)==str(self.selected) :
+            self.shownAt[str(itemID)]=time.time()
+        return
+
+
+def _summary( name='', blocked=None, hits=0, lastShown=0.0, total=0.0 ) :
+    blocked=sorted( blocked )
+    return '%-13s %9.2f %9.2f %9.2f %8d %10.1f %8.2f' % ( name, 1000*sum( blocked )/len( blocked ),
+        1000*blocked[int( len( blocked )*0.95 )], 1000*blocked[-1], hits, 1000*lastShown, total )
+
+def run( shots=300, size=200, interval=0.02, delay=0.01 ) :
+    'Runs the benchmark, returning the report lines'
+    app=QApplication.instance() or QApplication( sys.argv )
+    icons=_icons()
+    images=dict( [('%d.jpg' % shotID, icons[shotID % icon_variants]) for shotID in range( 1, shots+1 )] )
+    lines=['%d shots, %dpx thumbnails, %d ms between selections, %d ms server latency' % ( shots, size,
+        interval*1000, delay*1000 ), '',
+        '%-13s %9s %9s %9s %8s %10s %8s' % ( 'run', 'mean ms', 'p95 ms', 'max ms', 'requests', 'last ms', 'total s' )]
+
+    home=tempfile.mkdtemp( prefix='nim_bench_' )
+    server=NimTestServer( routes={'getShotIcon': _shotIcon}, images=images, delay=delay )
+    try :
+        with server :
+            #  Point the default client at the server, through the preferences :
+            os.environ['HOME']=os.environ['USERPROFILE']=home
+            os.makedirs( os.path.join( home, '.nim' ) )
+            with open( os.path.join( home, '.nim', 'prefs.nim' ), 'w' ) as prefsFile :
+                prefsFile.write( 'NIM_URL=%s\nNIM_User=bench\n' % server.url )
+            import nim_core.nim_thumbs as Thumbs
+
+            #  Synchronous - the UI thread loads each icon before the next key press is handled :
+            service=Thumbs.ThumbService( maxItems=shots )
+            blocked=[]
+            start=time.time()
+            for shotID in range( 1, shots+1 ) :
+                began=time.time()
+                img=service._load( elem='shot', itemID=shotID, size=size )
+                QtGui.QPixmap.fromImage( img )
+                blocked.append( time.time()-began )
+                _pump( app, interval )
+            lines.append( _summary( 'synchronous', blocked, server.hits(), blocked[-1], time.time()-start ) )
+
+            #  Background - selections queue a request, the worker fetches the latest one :
+            server.reset()
+            viewer=Viewer( service )
+            blocked=[]
+            start=time.time()
+            for shotID in range( 1, shots+1 ) :
+                began=time.time()
+                viewer.selected=shotID
+                if service.cached( elem='shot', itemID=shotID, size=size ) is None :
+                    service.request( elem='shot', itemID=shotID, size=size )
+                blocked.append( time.time()-began )
+                _pump( app, interval )
+            lastSelected=time.time()-interval
+            while str(shots) not in viewer.shownAt and time.time()-lastSelected < 30 :
+                _pump( app, 0.005 )
+            lastShown=viewer.shownAt.get( str(shots), time.time() )-lastSelected
+            lines.append( _summary( 'background', blocked, server.hits(), lastShown, time.time()-start ) )
+            fetched=server.hits( 'getShotIcon' )
+
+            #  Scroll back - the shots that were shown come from the pixmap cache :
+            server.reset()
+            cachedIDs=[int(key[1]) for key in service.pixCache.items]
+            blocked=[]
+            hits=0
+            start=time.time()
+            for shotID in sorted( cachedIDs, reverse=True ) :
+                began=time.time()
+                viewer.selected=shotID
+                if service.cached( elem='shot', itemID=shotID, size=size ) is None :
+                    service.request( elem='shot', itemID=shotID, size=size )
+                else :
+                    hits+=1
+                blocked.append( time.time()-began )
+                _pump( app, interval )
+            lines.append( _summary( 'scroll back', blocked, server.hits(), 0.0, time.time()-start ) )
+            lines.append( '' )
+            lines.append( '%d of %d shots were fetched while scrolling, %d cache hits scrolling back' % (
+                fetched, shots, hits ) )
+            service.stop()
+    finally :
+        shutil.rmtree( home, ignore_errors=True )
+    return lines
+
+
+if __name__=='__main__' :
+    parser=argparse.ArgumentParser( description='Times shot thumbnail loading against a local NIM server.' )
+    parser.add_argument( '--shots', type=int, default=300, help='shots to scroll through' )
+    parser.add_argument( '--size', type=int, default=200, help='thumbnail size, in pixels' )
+    parser.add_argument( '--interval', type=float, default=0.02, help='seconds between selections' )
+    parser.add_argument( '--delay', type=float, default=0.01, help='server latency per request, in seconds' )
+    args=parser.parse_args()
+    for line in run( shots=args.shots, size=args.size, interval=args.interval, delay=args.delay ) :
+        print line
+
+
+#  End
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: benchmarks/bench_verup.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Version up planning benchmark - times nim_file.plan_verUp, which works out the
+#  directories, version number and paths of a version up, against a local stand-in
+#  NIM server that answers every request after a fixed latency.  Each plan is timed
+#  cold, with the query cache cleared, and warm, straight after another plan.
+#
+#  It reports the median time of each, the requests that reached the server per
+#  plan, and the most that were in flight at once.  It fails if a cold plan takes
+#  longer than the target :
+#
+#      python benchmarks/bench_verup.py --delay 0.05 --target 0.2
+
+
+#  General Imports :
+import argparse, os, shutil, sys, tempfile, time
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, root )
+sys.path.insert( 0, os.path.join( root, 'tests' ) )
+
+from nim_test_server import NimTestServer
+
+
+#  Variables :
+serverID='1'
+jobID='10'
+shotID='20'
+taskID='30'
+
+
+class _Quiet( object ) :
+    'Hides the version up messages while timing'
+    def __enter__(self) :
+        self.stdout, sys.stdout=sys.stdout, open( os.devnull, 'w' )
+    def __exit__( self, *args ) :
+        sys.stdout.close()
+        sys.stdout=self.stdout
+        return False
+
+
+def _routes( serverPath='' ) :
+    'Returns the API answers for a shot on a server mounted at serverPath'
+    serverRoot=serverPath.rstrip( '/' )
+    return {
+        'getUserID': [{'ID': '1'}],
+        'get_serverOSPath': [{'serverOSPath': serverRoot+'/'}],
+        'getServerInfo': [{'ID': serverID, 'path': serverRoot, 'winPath': 'Z:/projects', 'osxPath': '/Volumes/projects'}],
+        'getPaths': {'root': 'JOB/SH010', 'renders': 'JOB/SH010/renders', 'comps': 'JOB/SH010/comps', 'plates': 'JOB/SH010/plates'},
+        'getShotInfo': [{'shotName': 'SH010', 'jobFolder': 'JOB'}],
+        'getBasenameVersion': [{'version': '3'}],
+        'getTaskTypes': [{'ID': taskID, 'name': 'COMP', 'folder': 'comp'}],
+        }
+
+def _nim( serverPath='' ) :
+    'Returns a NIM dictionary set to the shot\'s comp task, as the version up dialog leaves it'
+    import nim_core.nim as Nim
+    nim=Nim.NIM()
+    nim.nim['app']='Nuke'
+    nim.set_tab( _type='SHOT' )
+    nim.set_server( path=serverPath, ID=serverID )
+    for elem, ID, name in [('job', jobID, 'JOB'), ('shot', shotID, 'SH010'), ('task', taskID, 'COMP')] :
+        nim.set_ID( elem=elem, ID=ID )
+        nim.set_name( elem=elem, name=name )
+    nim.set_name( elem='fileExt', name='.nk' )
+    return nim
+
+def _median( values=None ) :
+    values=sorted( values )
+    return values[len( values )/2]
+
+def run( delay=0.05, repeat=10 ) :
+    'Runs the benchmark, returning ( report lines, median cold time )'
+    home=tempfile.mkdtemp( prefix='nim_bench_verup_' )
+    serverPath=os.path.join( home, 'projects' )
+    os.makedirs( os.path.join( serverPath, 'JOB', 'SH010', 'comp' ) )
+    server=NimTestServer( routes=_routes( serverPath ), delay=delay )
+    lines=['plan_verUp, %d ms server latency, median of %d plans' % ( delay*1000, repeat ), '',
+        '%-6s %10s %10s %10s %10s' % ( 'run', 'median ms', 'max ms', 'requests', 'in flight' )]
+    try :
+        with server :
+            os.environ['HOME']=os.environ['USERPROFILE']=home
+            os.makedirs( os.path.join( home, '.nim' ) )
+            with open( os.path.join( home, '.nim', 'prefs.nim' ), 'w' ) as prefsFile :
+                prefsFile.write( 'NIM_URL=%s\nNIM_User=bench\n' % server.url )
+            import nim_core.nim_client as Client
+            import nim_core.nim_file as F
+
+            with Client.NimClient( nimURL=server.url, apiUser='bench', headless=True ) :
+                with _Quiet() :
+                    nim=_nim( serverPath )
+                cold=None
+                for runName in ['cold', 'warm'] :
+                    times, requests, inFlight=[], [], []
+                    for index in range( repeat ) :
+                        if runName=='cold' :
+                            Client.clear_cache()
+                        server.reset()
+                        start=time.time()
+                        with _Quiet() :
+                            plan=F.plan_verUp( nim=nim )
+                        times.append( time.time()-start )
+                        requests.append( server.hits() )
+                        inFlight.append( server.maxActive )
+                        F.release_ver( plan['reservation'] )
+                    if runName=='cold' :
+                        cold=_median( times )
+                    lines.append( '%-6s %10.1f %10.1f %10d %10d' % ( runName, _median( times )*1000, max( times )*1000,
+                        _median( requests ), max( inFlight ) ) )
+                lines.append( '' )
+                lines.append( 'Planned %s, version %s' % ( plan['filePath'], plan['verNum'] ) )
+    finally :
+        shutil.rmtree( home, ignore_errors=True )
+    return lines, cold
+
+
+if __name__=='__main__' :
+    parser=argparse.ArgumentParser( description='Times planning a version up against a local NIM server.' )
+    parser.add_argument( '--delay', type=float, default=0.05, help='server latency per request, in seconds' )
+    parser.add_argument( '--repeat', type=int, default=10, help='plans timed, cold and warm' )
+    parser.add_argument( '--target', type=float, default=0.2, help='most seconds a cold plan may take' )
+    args=parser.parse_args()
+    lines, cold=run( delay=args.delay, repeat=args.repeat )
+    for line in lines :
+        print line
+    print 'Cold plan %.1f ms - target %.1f ms %s' % ( cold*1000, args.target*1000, 'met' if cold <= args.target else 'MISSED' )
+    sys.exit( 0 if cold <= args.target else 1 )
+
+
+#  End
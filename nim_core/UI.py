@@ -27,6 +27,7 @@ import nim_api as Api
 import nim_file as F
 import nim_prefs as Prefs
 import nim_print as P
+import nim_thumbs as Thumbs
 import nim_win as Win
 #  Import Python GUI packages :
 try : 
@@ -214,6 +215,10 @@ class GUI(QtGui.QMainWindow) :
         #  Size window :
         self.resize( int(self.pref_sizeX), int(self.pref_sizeY) )
         
+        #  Background thumbnail loader :
+        self.thumbs=Thumbs.ThumbService( parent=self )
+        self.thumbs.ready.connect( self.set_img )
+        
         #  Make main window widget :
         self.mainWidg=QtGui.QWidget(self)
         self.setCentralWidget( self.mainWidg )
@@ -1288,45 +1293,20 @@ class GUI(QtGui.QMainWindow) :
             
             #  Versions :
             elif elem=='ver' :
+                pubFiles=None
                 for option in self.nim.Dict( elem ) :
                     #  Populate "Load" Publish File :
                     if self.nim.pub() and self.nim.mode().lower() in ['load'] :
-                        nimDir=Api.to_nimDir( nim=self.nim )
-                        basename=Api.to_basename( nim=self.nim )
-                        files=[]
-                        if os.path.isdir( nimDir ) and os.listdir( nimDir ) :
-                            if self.app=='Maya' :
-                                temp_files=os.listdir( nimDir )
-                                for _file in temp_files :
-                                    if re.search( '^'+basename+'.(ma|mb)$', _file ) :
-                                        if _file not in files :
-                                            files.append( _file )
-                            elif self.app=='Nuke' :
-                                temp_files=os.listdir( nimDir )
-                                for _file in temp_files :
-                                    if re.search( '^'+basename+'.(nk|nknc)$', _file ) :
-                                        if _file not in files :
-                                            files.append( _file )
-                            elif self.app=='C4D' :
-                                temp_files=os.listdir( nimDir )
-                                for _file in temp_files :
-                                    if re.search( '^'+basename+'.c4d$', _file ) :
-                                        if _file not in files :
-                                            files.append( _file )
-                            if self.app=='3dsMax' :
-                                temp_files=os.listdir( nimDir )
-                                for _file in temp_files :
-                                    if re.search( '^'+basename+'.max$', _file ) :
-                                        if _file not in files :
-                                            files.append( _file )
-                            if self.app=='Houdini' :
-                                temp_files=os.listdir( nimDir )
-                                for _file in temp_files :
-                                    if re.search( '^'+basename+'.hip$', _file ) :
-                                        if _file not in files :
-                                            files.append( _file )
-                        if files :
-                            for _file in files :
+                        #  Scan the directory once for the published files :
+                        if pubFiles is None :
+                            pubFiles=[]
+                            nimDir=Api.to_nimDir( nim=self.nim )
+                            basename=Api.to_basename( nim=self.nim )
+                            if self.app in F.app_exts and nimDir and os.path.isdir( nimDir ) :
+                                pubFiles=F.find_files( fileDir=nimDir, basename=basename, \
+                                    exts=F.app_exts[self.app], versioned=False )
+                        if pubFiles :
+                            for _file in pubFiles :
                                 item=QtGui.QListWidgetItem( self.nim.Input( elem ) )
                                 item.setText( _file )
                             break
@@ -1908,116 +1888,68 @@ class GUI(QtGui.QMainWindow) :
     def update_img(self) :
         'Displays shot and asset thumbnail images, or a default image'
         self.img_size=self.width()/2.25
-        img, img_loc, _type='', '', ''
-        _set=False
+        _type, itemID='', None
         
-        #  Get Asset/Shot Thumbnail NIM URL relative path :
+        #  Get the Asset/Shot to display :
         if self.nim.tab()=='ASSET' and self.nim.ID( 'asset' ) :
-            _type='asset'
-            img=Api.get( {'q':'getAssetIcon', 'ID': self.nim.ID( 'asset' )} )
+            _type, itemID='asset', self.nim.ID( 'asset' )
         elif self.nim.tab()=='SHOT' and self.nim.ID( 'shot' ) :
-            _type='shot'
-            img=Api.get( {'q':'getShotIcon', 'ID': self.nim.ID( 'shot' )} )
+            _type, itemID='shot', self.nim.ID( 'shot' )
         
         #  Set default image, if Shot/Asset ID's have not been set yet :
-        if _type and not self.nim.ID( 'asset' ) and not self.nim.ID( 'shot' ) :
-            try :
-                self.nim.set_pic( elem=_type, widget=QtGui2.QPixmap().fromImage( QtGui2.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui2.QImage( self.pref_imgDefault ) )
-            except :
-                self.nim.set_pic( elem=_type, widget=QtGui.QPixmap().fromImage( QtGui.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui.QImage( self.pref_imgDefault ) )
-
-            try :
-                self.nim.set_pic( elem=_type, widget=self.nim.pix( _type ).scaled( self.img_size, self.img_size, QtCore.Qt.KeepAspectRatio ) )
-                self.nim.label( _type ).setPixmap( self.nim.pix( _type ) )
-            except :
-                pass
-
+        if not _type :
+            self.set_defaultImg( _type='shot' )
             return None
         
-        # Get domain name from URL
-        from urlparse import urlparse
-        #parsed_uri = urlparse( self.prefs['NIM_URL'] )
-        #updated to use global vars
-        connect_info = Api.get_connect_info()
-        nimURL = connect_info['nim_apiURL']
-        parsed_uri = urlparse(nimURL)   
-        nim_domain = '{uri.scheme}://{uri.netloc}/'.format(uri=parsed_uri)
-        #print( 'NIM Domain: %s' % nim_domain)
-
-        try:        
-            if img[0]['img_link']:
-                try :
-                    img_loc=nim_domain+img[0]['img_link']
-                    img_dir=os.path.dirname( img_loc )+'/'
-                    #print('img_loc: %s' % img_loc)
-                    #print('img_dir: %s' % img_dir)
-                except :
-                    #Failed to build img path
-                    print('Failed to build icon path')
-                    img_loc='/img/nim_logo.png'
-                    print('Using default img: %s' % img_loc)
-            else :
-                img_loc = None
-        except:
-            img_loc = None
-
-        #  Set Shot/Asset image :
-        if _type and img_loc :
-            #print("set image")
-            try :
-                myssl = ssl.create_default_context()
-                myssl.check_hostname=False
-                myssl.verify_mode=ssl.CERT_NONE
-                _data=urllib.urlopen( img_loc,context=myssl ).read()
-            except :
-                _data=urllib.urlopen( img_loc ).read()
-            
-            if _data is not None :
-                try :
-                    self.nim.pix( _type ).loadFromData( _data )
-                    self.nim.set_pic( elem=_type, widget=self.nim.pix( _type ).scaled( self.img_size, self.img_size, QtCore.Qt.KeepAspectRatio ) )
-                    self.nim.label( _type ).setPixmap( self.nim.pix( _type ) )
-                    _set=True
-                    P.debug( '%s image URL = "%s"' % (_type.upper(), img_loc) )
-                except :
-                    pass
+        #  Use a cached thumbnail, or fetch it in the background :
+        pix=self.thumbs.cached( elem=_type, itemID=itemID, size=self.img_size )
+        if pix is not None :
+            self.nim.set_pic( elem=_type, widget=pix )
+            self.nim.label( _type ).setPixmap( pix )
+        else :
+            self.thumbs.request( elem=_type, itemID=itemID, size=self.img_size )
         
-        #  Set default image :
-        if _type and not _set :
-            #print("default image")
-            try :
-                self.nim.set_pic( elem=_type, widget=QtGui2.QPixmap().fromImage( QtGui2.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui2.QImage( self.pref_imgDefault ) )
-            except :
-                self.nim.set_pic( elem=_type, widget=QtGui.QPixmap().fromImage( QtGui.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui.QImage( self.pref_imgDefault ) )
-
-            try :
-                self.nim.set_pic( elem=_type, widget=self.nim.pix( _type ).scaled( self.img_size, self.img_size, QtCore.Qt.KeepAspectRatio ) )
-                self.nim.label( _type ).setPixmap( self.nim.pix( _type ) )
-                P.debug( '%s image URL set to default : "%s"' % (_type.upper(), self.pref_imgDefault) )
-            except :
-                pass
+        return
+    
+    
+    def set_img( self, _type='shot', itemID=None, size=0, img=None ) :
+        'Receives a thumbnail loaded in the background, and displays it if it is still selected'
+        if img is not None :
+            pix=self.thumbs.store( elem=_type, itemID=itemID, size=size, img=img )
+        else :
+            pix=None
         
-        if not _type and not _set :
-            #print("default image")
-            _type = 'shot'
-            try :
-                self.nim.set_pic( elem=_type, widget=QtGui2.QPixmap().fromImage( QtGui2.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui2.QImage( self.pref_imgDefault ) )
-            except :
-                self.nim.set_pic( elem=_type, widget=QtGui.QPixmap().fromImage( QtGui.QImage( self.pref_imgDefault ) ) )
-                self.nim.pix( _type ).fromImage( QtGui.QImage( self.pref_imgDefault ) )
-
-            try :
-                self.nim.set_pic( elem=_type, widget=self.nim.pix( _type ).scaled( self.img_size, self.img_size, QtCore.Qt.KeepAspectRatio ) )
-                self.nim.label( _type ).setPixmap( self.nim.pix( _type ) )
-                P.debug( '%s image URL set to default : "%s"' % (_type.upper(), self.pref_imgDefault) )
-            except :
-                pass
-
+        #  Ignore stale results :
+        if _type=='asset' and self.nim.tab()=='ASSET' :
+            current=self.nim.ID( 'asset' )
+        elif _type=='shot' and self.nim.tab()=='SHOT' :
+            current=self.nim.ID( 'shot' )
+        else :
+            return
+        if str(current)!=str(itemID) :
+            return
+        
+        if pix is not None :
+            self.nim.set_pic( elem=_type, widget=pix )
+            self.nim.label( _type ).setPixmap( pix )
+        else :
+            self.set_defaultImg( _type=_type )
+        return
+    
+    
+    def set_defaultImg( self, _type='shot' ) :
+        'Displays the default image for a given element'
+        try :
+            self.nim.set_pic( elem=_type, widget=QtGui2.QPixmap().fromImage( QtGui2.QImage( self.pref_imgDefault ) ) )
+        except :
+            self.nim.set_pic( elem=_type, widget=QtGui.QPixmap().fromImage( QtGui.QImage( self.pref_imgDefault ) ) )
+        
+        try :
+            self.nim.set_pic( elem=_type, widget=self.nim.pix( _type ).scaled( self.img_size, self.img_size, QtCore.Qt.KeepAspectRatio ) )
+            self.nim.label( _type ).setPixmap( self.nim.pix( _type ) )
+            P.debug( '%s image URL set to default : "%s"' % (_type.upper(), self.pref_imgDefault) )
+        except :
+            pass
         return
 
     
@@ -2154,6 +2086,8 @@ class GUI(QtGui.QMainWindow) :
     def closeEvent( self, e ) :
         'Function is run every time the window is closed - writes out window preferences'
         P.debug(' ')
+        if hasattr( self, 'thumbs' ) :
+            self.thumbs.stop()
         #  Export window position :
         Prefs.update( attr='winPosX', app=self.app, value=str(self.x()) )
         Prefs.update( attr='winPosY', app=self.app, value=str(self.y()) )
@@ -2193,6 +2127,9 @@ class GUI(QtGui.QMainWindow) :
             P.debug(' ')
             self.nim.Print( debug=True )
             P.debug(' ')
+        
+        #  Write out the preference changes together :
+        Prefs.flush()
 
         # Return focus to Main Window for 3dsMax
         '''
@@ -29,11 +29,19 @@
 #    nimAPI.add_element( parent='render', parentID=result['ID'], path='/path/to/frames', name='myImage_matte.####.exr', \
 #                           startFrame=1, endFrame=128, handles=12, isPublished=False )
 #
+# Render farm tasks, and other scripts that must never prompt, can run the same calls in
+# headless mode - errors are raised as nim_client.NimError, instead of opening dialogs :
+#
+# import nim_core.nim_client as nimClient
+# with nimClient.headless() :
+#    nimAPI.add_element( parent='render', parentID=renderID, path='/path/to/frames', name='myImage.####.exr', \
+#                           startFrame=1, endFrame=128, handles=12, isPublished=False )
+#
 
 
 
 #  General Imports :
-import json, os, re, sys, traceback
+import json, os, platform, re, sys, threading, traceback
 import urllib, urllib2
 try :
     import ssl
@@ -41,23 +49,24 @@ except :
     print "NIM API: Failed to load SSL"
     pass
 
-import mimetools, mimetypes
-import email.generator as email_gen
-import cStringIO
-import stat
-
 #  NIM Imports :
-import nim as Nim
 import nim_api as Api
+import nim_client as Client
 import nim_file as F
+import nim_lazy as Lazy
 import nim_prefs as Prefs
 import nim_print as P
-import nim_tools
-import nim_win as Win
+#  Imported on first use, so scripts that only use the API don't load the GUI :
+Nim=Lazy.module( 'nim', __name__ )
+PostSave=Lazy.module( 'nim_postsave', __name__ )
+nim_tools=Lazy.module( 'nim_tools', __name__ )
+Win=Lazy.module( 'nim_win', __name__ )
 
 #  Variables :
 version='v4.0.61'
 winTitle='NIM_'+version
+#  Seconds to keep a user's ID, which doesn't change :
+user_ttl=3600.0
 
 '''
 isGUI = True
@@ -69,6 +78,8 @@ except :
     pass
 '''
 
+'''
+# Moved to inline functions
 isGUI = False
 try :
     #Validate Against DCC Environment
@@ -76,7 +87,7 @@ try :
         isGUI = True
 except :
     pass
-
+'''
 #print "isGUI: %s" % isGUI
 
 def testAPI(nimURL=None, nim_apiUser='', nim_apiKey='') :
@@ -89,9 +100,7 @@ def testAPI(nimURL=None, nim_apiUser='', nim_apiKey='') :
         request.add_header("X-NIM-API-KEY", nim_apiKey)
         request.add_header("Content-type", "application/x-www-form-urlencoded; charset=UTF-8")
         try :
-            ssl_ctx = ssl.create_default_context()
-            ssl_ctx.check_hostname=False
-            ssl_ctx.verify_mode=ssl.CERT_NONE
+            ssl_ctx = get_sslContext()
             _file = urllib2.urlopen(request,context=ssl_ctx)
         except :
             _file = urllib2.urlopen(request)
@@ -116,6 +125,9 @@ def testAPI(nimURL=None, nim_apiUser='', nim_apiKey='') :
 def get_connect_info() :
     'Returns the connection information from preferences'
 
+    if Client.is_headless() :
+        return Client.current().connect_info()
+
     isGUI = False
     try :
         #Validate Against DCC Environment
@@ -130,6 +142,8 @@ def get_connect_info() :
         nim_apiURL=_prefs['NIM_URL']
     else :
         print('"NIM_URL" not found in preferences!')
+        if not can_prompt() :
+            return False
         err_msg ='Would you like to recreate your preferences?'
         if isGUI :
             reply=Win.popup( title='NIM Error', msg=err_msg, type='okCancel' )
@@ -170,21 +184,13 @@ def get_connect_info() :
 
 #  Get API Key for user
 def get_apiKey() :
-    key = ''
-    key_fileName = 'nim.key'
-    key_path = os.path.normpath( os.path.join( Prefs.get_home(), key_fileName ) )
+    return Client.get_apiKey()
 
-    if os.path.isfile( key_path ) :
-        try :
-            #  Read NIM API KEY file :
-            with open(key_path, 'r') as f:
-                key = f.readline().strip()
-        except Exception, e :
-            P.error( 'Unable to read api key.' )
-    else :
-        # P.warning( 'API Key not found.' )
-        pass
-    return key
+
+#  Get the SSL context for API requests
+def get_sslContext() :
+    'Returns the SSL context shared by all API requests'
+    return Client.get_sslContext()
 
 
 #  DEPRECATED in 2.5 in favor of connect()
@@ -215,6 +221,10 @@ def connect( method='get', params=None, nimURL=None, apiKey=None ) :
     'Querys MySQL server and returns decoded json array'
     result=None
     
+    #  Leave errors to the caller, in headless mode :
+    if Client.is_headless() :
+        return Client.request( method=method, params=params, nimURL=nimURL, apiKey=apiKey )
+
     isGUI = False
     try :
         #Validate Against DCC Environment
@@ -223,113 +233,121 @@ def connect( method='get', params=None, nimURL=None, apiKey=None ) :
     except :
         pass
 
+    #  A client active in this thread brings its own connection information :
     connect_info = None
-    if not nimURL :
+    if not nimURL and not Client.current().nimURL :
         connect_info = get_connect_info()
     if connect_info :
         nimURL = connect_info['nim_apiURL']
         nim_apiUser = connect_info['nim_apiUser']
         nim_apiKey = connect_info['nim_apiKey']
     else :
-        nim_apiUser = ''
-        nim_apiKey = ''
+        nim_apiUser = None
+        nim_apiKey = None
     
     if apiKey :
         nim_apiKey = apiKey
 
-    if params :
-        if method == 'get':
-            cmd=urllib.urlencode(params)
-            _actionURL="".join(( nimURL, cmd ))
-        elif method == 'post':
-            cmd=urllib.urlencode(params)
-            _actionURL = re.sub('[?]', '', nimURL)
-        else :
-            P.error('Connection method not defined in request.')
+    if not params :
+        P.error( 'No SQL command provided to run.' )
+        return False
+    if method not in ['get', 'post'] :
+        P.error('Connection method not defined in request.')
+        if can_prompt() :
             Win.popup( title='NIM Connection Error', msg='NIM Connection Error:\n\n Connection method not defined in request.')
+        return False
+
+    try :
+        result = Client.request( method=method, params=params, nimURL=nimURL, apiUser=nim_apiUser, apiKey=nim_apiKey )
+        return result
+
+    except Client.NimPrefsError, e :
+        P.error( str(e) )
+        return False
+
+    except Client.NimAPIError, e :
+        # Failed API Validation
+        P.error( "API Error %s" % e.error )
+        api_keyError( error_msg=e.error, isGUI=isGUI )
+        return e.result
+
+    except Client.NimConnectionError, e :
+        P.error( '\nFailed to read URL for the following command...\n    %s' % params )
+        P.error( '   %s' % e.url )
+        url_error = e.reason
+        P.error('URL ERROR: %s' % url_error)
+        err_msg = 'NIM Connection Error:\n\n %s' %  url_error;
+
+        if not can_prompt() :
             return False
+        err_msg +='\n\n'+\
+            'Would you like to recreate your preferences?'
+        if isGUI :
+            reply=Win.popup( title='NIM Error', msg=err_msg, type='okCancel' )
+        else :
+            reply=raw_input( 'Would you like to recreate your preferences? (Y/N): ')
+            if reply == 'Y' or reply == 'y' :
+                reply = 'OK'
 
-        try :
-            if method == 'get':
-                request = urllib2.Request(_actionURL)
-            elif method == 'post':
-                request = urllib2.Request(_actionURL, cmd)
-            
-            request.add_header("X-NIM-API-USER", nim_apiUser)
-            request.add_header("X-NIM-API-KEY", nim_apiKey)
-            request.add_header("Content-type", "application/x-www-form-urlencoded; charset=UTF-8")
-            try :
-                ssl_ctx = ssl.create_default_context()
-                ssl_ctx.check_hostname=False
-                ssl_ctx.verify_mode=ssl.CERT_NONE
-                _file = urllib2.urlopen(request,context=ssl_ctx)
-            except :
-                _file = urllib2.urlopen(request)
-            fr=_file.read()
-            try : result=json.loads( fr )
-            except Exception, e :
-                P.error( traceback.print_exc() )
-            _file.close()
-
-            # Test for failed API Validation
-            if type(result)==type(list()) and len(result)==1 :
-                try :
-                    error_msg = result[0]['error']
-                    if error_msg != '':
-                        P.error( "API Error %s" % error_msg )
-                    if(error_msg == 'API Key Not Found.') :
-                        #Win.popup( title='NIM API Error', msg='NIM API Key Not Found.\n\nNIM Security is set to require the use of API Keys. \
-                        #                                        Please contact your NIM Administrator to obtain a NIM API KEY.' )
-                        api_result = Win.setApiKey()
-
-                    if(error_msg == 'Failed to validate user.') :
-                        #Win.popup( title='NIM API Error', msg='Failed to validate user.\n\nNIM Security is set to require the use of API Keys. \
-                        #                                        Please obtain a valid NIM API KEY from your NIM Administrator.' )
-                        api_result = Win.setApiKey()
-
-                    if(error_msg == 'API Key Expired.') :
-                        if isGUI :
-                            Win.popup( title='NIM API Error', msg='NIM API Key Expired.\n\nNIM Security is set to require the use of API Keys. \
-                                                                    Please contact your NIM Administrator to update your NIM API KEY expiration.' )
-                        else :
-                            print 'NIM API Key Expired.\nNIM Security is set to require the use of API Keys.\n \
-                                    Please contact your NIM Administrator to update your NIM API KEY expiration.'
-                        #return False <-- returning false loads reset prefs msgbox
-                except :
-                    pass
-            
-            return result
+        #  Re-create preferences, if prompted :
+        if reply=='OK' :
+            prefsFile=Prefs.get_path()
+            if os.path.exists( prefsFile ) :
+                os.remove( prefsFile )
+            result = Prefs.mk_default()
+            return False
+        else :
+            return
 
-        except urllib2.URLError, e :
-            P.error( '\nFailed to read URL for the following command...\n    %s' % params )
-            P.error( '   %s' % _actionURL )
-            url_error = e.reason
-            P.error('URL ERROR: %s' % url_error)
-            err_msg = 'NIM Connection Error:\n\n %s' %  url_error;
-            #P.debug( '    %s' % traceback.print_exc() )
-
-            err_msg +='\n\n'+\
-                'Would you like to recreate your preferences?'
-            #P.error( err_msg )
-            if isGUI :
-                reply=Win.popup( title='NIM Error', msg=err_msg, type='okCancel' )
-            else :
-                reply=raw_input( 'Would you like to recreate your preferences? (Y/N): ')
-                if reply == 'Y' or reply == 'y' :
-                    reply = 'OK'
-
-            #  Re-create preferences, if prompted :
-            if reply=='OK' :
-                prefsFile=Prefs.get_path()
-                if os.path.exists( prefsFile ) :
-                    os.remove( prefsFile )
-                result = Prefs.mk_default()
-                return False
-            else :
-                return
-    else :
-        P.error( 'No SQL command provided to run.' )
+
+def can_prompt() :
+    'Returns True if the user can be asked about errors - never in headless mode, or off the main thread'
+    if Client.is_headless() :
         return False
+    return isinstance( threading.current_thread(), threading._MainThread )
+
+def api_keyError( error_msg='', isGUI=False ) :
+    'Asks the user to set, or renew, their API key after an API key error'
+    if error_msg in ['API Key Not Found.', 'Failed to validate user.'] :
+        #  NIM Security is set to require the use of API Keys :
+        if can_prompt() :
+            api_result = Win.setApiKey()
+    elif error_msg == 'API Key Expired.' :
+        if isGUI and can_prompt() :
+            Win.popup( title='NIM API Error', msg='NIM API Key Expired.\n\nNIM Security is set to require the use of API Keys. \
+                                                    Please contact your NIM Administrator to update your NIM API KEY expiration.' )
+        else :
+            print 'NIM API Key Expired.\nNIM Security is set to require the use of API Keys.\n \
+                    Please contact your NIM Administrator to update your NIM API KEY expiration.'
+    return
+
+
+#  Shared API Query command
+#       Used for read-only queries that are asked repeatedly, like job, show and path information.
+#       Concurrent identical queries share a single HTTP request, and successful results are
+#       kept for "ttl" seconds (Client.query_ttl by default).  Callers get their own copy of the result.
+#
+def cached_connect( params=None, ttl=None ) :
+    'Runs a read-only GET query once for all concurrent callers, caching the result for a short time'
+    if not params :
+        return connect( method='get', params=params )
+    try :
+        return Client.cached_get( params=params, ttl=ttl )
+    except Client.NimError :
+        if Client.is_headless() :
+            raise
+        #  Run the query again, so the user is told what went wrong :
+        return connect( method='get', params=params )
+
+def cached_connect_all( queries=None, ttl=None ) :
+    'Runs several read-only queries at the same time, returning their results in order'
+    'Each query is a parameter dictionary, or a ( parameters, ttl ) pair to override the cache time'
+    return Client.cached_get_all( queries=queries, ttl=ttl )
+
+def clear_cache( **match ) :
+    'Clears cached query results - all of them, or those whose parameters match the given values'
+    Client.clear_cache( **match )
+    return
 
 
 #  API Upload command
@@ -353,6 +371,10 @@ def connect( method='get', params=None, nimURL=None, apiKey=None ) :
 #
 def upload( params=None, nimURL=None, apiKey=None ) :
 
+    #  Leave errors to the caller, in headless mode :
+    if Client.is_headless() :
+        return Client.upload( params=params, nimURL=nimURL, apiKey=apiKey )
+
     isGUI = False
     try :
         #Validate Against DCC Environment
@@ -361,212 +383,58 @@ def upload( params=None, nimURL=None, apiKey=None ) :
     except :
         pass
     
+    #  A client active in this thread brings its own connection information :
     connect_info = None
-    if not nimURL :
+    if not nimURL and not Client.current().nimURL :
         connect_info = get_connect_info()
     if connect_info :
         nimURL = connect_info['nim_apiURL']
         nim_apiUser = connect_info['nim_apiUser']
         nim_apiKey = connect_info['nim_apiKey']
     else :
-        nim_apiUser = ''
-        nim_apiKey = ''
+        nim_apiUser = None
+        nim_apiKey = None
     
     if apiKey :
         nim_apiKey = apiKey
 
-    _actionURL = nimURL.encode('ascii')
+    P.info("API URL: %s" % nimURL)
 
-    P.info("API URL: %s" % _actionURL)
-    
-    # Test for SSL Redirection
-    isRedirected = False
     try:
-        testCmd = {'q': 'testAPI'}
-        cmd=urllib.urlencode(testCmd)
-        testURL="".join(( nimURL, cmd ))
-        req = urllib2.Request(testURL)
-
-        try :
-            ssl_ctx = ssl.create_default_context()
-            ssl_ctx.check_hostname=False
-            ssl_ctx.verify_mode=ssl.CERT_NONE
-            res = urllib2.urlopen(req, context=ssl_ctx)
-        except :
-            res = urllib2.urlopen(req)
-            #pass
-        
-        finalurl = res.geturl()
-        #P.info("Request URL: %s" % finalurl)
-        if nimURL.startswith('http:') and finalurl.startswith('https'):
-            isRedirected = True
-            _actionURL = _actionURL.replace("http:","https:")
-            P.info("Redirect: %s" % _actionURL)
-    except:
-        P.error("Failed to test for redirect.")
-
-    # Create opener with extended form post support
-    try:
-        try :
-            P.info( "Opening Connection on HTTPS" )
-            ssl_ctx = ssl.create_default_context()
-            ssl_ctx.check_hostname=False
-            ssl_ctx.verify_mode=ssl.CERT_NONE
-            opener = urllib2.build_opener(urllib2.HTTPSHandler(context=ssl_ctx), FormPostHandler)
-        except :
-            P.info( "Opening Connection on HTTP" )
-            opener = urllib2.build_opener(FormPostHandler)
-
-        opener.addheaders = [('X-NIM-API-USER', nim_apiUser),('X-NIM-API-KEY', nim_apiKey)]
-    except:
-        P.error( "Failed building url opener")
-        P.error( traceback.format_exc() )
-        return False
-
-
-    try:
-        result = opener.open(_actionURL, params).read()
+        result = Client.upload( params=params, nimURL=nimURL, apiUser=nim_apiUser, apiKey=nim_apiKey )
         P.info( "Result: %s" % result )
-
-        # Test for failed API Validation
-        if type(result)==type(list()) and len(result)==1 :
-            try :
-                error_msg = result[0]['error']
-                P.error( error_msg )
-                if(error_msg == 'API Key Not Found.') :
-                    #Win.popup( title='NIM API Error', msg='NIM API Key Not Found.\n\nNIM Security is set to require the use of API Keys. \
-                    #                                        Please contact your NIM Administrator to obtain a NIM API KEY.' )
-                    api_result = Win.setApiKey()
-
-                if(error_msg == 'Failed to validate user.') :
-                    #Win.popup( title='NIM API Error', msg='Failed to validate user.\n\nNIM Security is set to require the use of API Keys. \
-                    #                                        Please obtain a valid NIM API KEY from your NIM Administrator.' )
-                    api_result = Win.setApiKey()
-
-                if(error_msg == 'API Key Expired.') :
-                    if isGUI :
-                        Win.popup( title='NIM API Error', msg='NIM API Key Expired.\n\nNIM Security is set to require the use of API Keys. \
-                                                            Please contact your NIM Administrator to update your NIM API KEY expiration.' )
-                    else :
-                        print 'NIM API Key Expired.\nNIM Security is set to require the use of API Keys.\n \
-                                Please contact your NIM Administrator to update your NIM API KEY expiration.'
-                    #return False <-- returning false loads reset prefs msgbox
-            except :
-                pass
-
-    except urllib2.HTTPError, e:
+    except Client.NimPrefsError, e :
+        P.error( str(e) )
+        return False
+    except Client.NimConnectionError, e:
         if e.code == 500:
-            P.error("Server encountered an internal error. \n%s\n(%s)\n%s\n\n" % (_actionURL, params, e))
+            P.error("Server encountered an internal error. \n%s\n(%s)\n%s\n\n" % (e.url, params, e.reason))
             return False
         else:
-            P.error("Unanticipated error occurred uploading image: %s" % (e))
+            P.error("Unanticipated error occurred uploading image: %s" % (e.reason))
             return False
 
-    '''
-    # Removing after showing false error.. 
-    # Now passing result json to calling function
-    else:
-        if params["file"] is not None:
-            if not str(result).startswith("1"):
-                P.error("Could not upload file successfully, but not sure why.\nUrl: %s\nError: %s" % (_actionURL, str(result)))
-                return False
-    '''
+    # Test for failed API Validation
+    try :
+        error_msg = Client.api_error( json.loads( result ) )
+    except :
+        error_msg = ''
+    if error_msg :
+        P.error( error_msg )
+        api_keyError( error_msg=error_msg, isGUI=isGUI )
+
     return result
 
 
-class FormPostHandler(urllib2.BaseHandler):
-    """
-    Handler for multipart form data
-    """
-    handler_order = urllib2.HTTPHandler.handler_order - 10 # needs to run first
-    
-    def http_request(self, request):
-        data = request.get_data()
-        if data is not None and not isinstance(data, basestring):
-            files = []
-            params = []
-            for key, value in data.items():
-                if isinstance(value, file):
-                    files.append((key, value))
-                else:
-                    params.append((key, value))
-            if not files:
-                data = urllib.urlencode(params, True) # sequencing on
-            else:
-                boundary, data = self.encode(params, files)
-                content_type = 'multipart/form-data; boundary=%s' % boundary
-                request.add_unredirected_header('Content-Type', content_type)
-                
-            request.add_data(data)
-        return request
-    
-    def encode(self, params, files, boundary=None, buffer=None):
-        if boundary is None:
-            #boundary = mimetools.choose_boundary()
-            boundary = email_gen._make_boundary()
-        if buffer is None:
-            buffer = cStringIO.StringIO()
-        for (key, value) in params:
-            buffer.write('--%s\r\n' % boundary)
-            buffer.write('Content-Disposition: form-data; name="%s"' % key)
-            buffer.write('\r\n\r\n%s\r\n' % value)
-        for (key, fd) in files:
-            filename = fd.name.split('/')[-1]
-            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-            file_size = os.fstat(fd.fileno())[stat.ST_SIZE]
-            buffer.write('--%s\r\n' % boundary)
-            buffer.write('Content-Disposition: form-data; name="%s"; filename="%s"\r\n' % (key, filename))
-            buffer.write('Content-Type: %s\r\n' % content_type)
-            buffer.write('Content-Length: %s\r\n' % file_size)
-            fd.seek(0)
-            buffer.write('\r\n%s\r\n' % fd.read())
-        buffer.write('--%s--\r\n\r\n' % boundary)
-        buffer = buffer.getvalue()
-        return boundary, buffer
-    
-    def https_request(self, request):
-        return self.http_request(request)
+#  Form post handler used by uploads :
+FormPostHandler = Client.FormPostHandler
 
 
 #  API Functions  #
 
 def get_app() :
     'Figure out what app is running.'
-    app=''
-    try :
-        import maya.cmds as mc
-        return 'Maya'
-    except :pass
-    try :
-        import nuke
-        return 'Nuke'
-    except : pass
-    try :
-        import c4d
-        return 'C4D'
-    except : pass
-    try :
-        import hiero.ui
-        return 'Hiero'
-    except : pass
-    try :
-        import MaxPlus
-        return '3dsMax'
-    except : pass
-    try :
-        import hou
-        return 'Houdini'
-    except : pass
-    try:
-        import cinesync
-        return 'Cinesync'
-    except : pass
-    try :
-        nim_app = os.environ.get('NIM_APP', '-1')
-        if nim_app == 'Flame':
-            return 'Flame'
-    except: pass
-    return None
+    return F.get_app()
 
 
 #  Users  #
@@ -588,7 +456,7 @@ def get_userID( user='' ) :
     if not user :
         user=get_user()
     try :
-        userID=get( {'q': 'getUserID', 'u': str(user)} )
+        userID=cached_connect( {'q': 'getUserID', 'u': str(user)}, ttl=user_ttl )
         if type(userID)==type(list()) and len(userID)==1 :
             return userID[0]['ID']
         else :
@@ -613,7 +481,7 @@ def get_jobs( userID=None, folders=False ) :
     'Builds a dictionary of all jobs for a given user'
     jobDict={}
     #  Build dictionary of jobs :
-    _jobs=get( {'q': 'getUserJobs', 'u': userID} )
+    _jobs=cached_connect( {'q': 'getUserJobs', 'u': userID} )
     try:
         for job in _jobs :
             if not folders :
@@ -745,6 +613,7 @@ def add_job( name=None, number=None, numberTemplate=None, description=None, clie
     if keywords is not None : params['keywords'] = json.dumps(keywords)
 
     result = connect( method='get', params=params )
+    clear_cache( q='getUserJobs' )
     return result
 
 def update_job( jobID=None, name=None, number=None, description=None, client=None, agency=None, producer=None, agency_producer=None, \
@@ -866,6 +735,9 @@ def update_job( jobID=None, name=None, number=None, description=None, client=Non
     if keywords is not None : params['keywords'] = json.dumps(keywords)
 
     result = connect( method='get', params=params )
+    clear_cache( q='getJobInfo', ID=jobID )
+    clear_cache( q='getPaths', type='job', ID=jobID )
+    clear_cache( q='getUserJobs' )
     return result
 
 def delete_job( jobID=None) :
@@ -883,6 +755,9 @@ def delete_job( jobID=None) :
     if jobID is not None : params['jobID'] = jobID
 
     result = connect( method='get', params=params )
+    clear_cache( q='getJobInfo', ID=jobID )
+    clear_cache( q='getPaths', type='job', ID=jobID )
+    clear_cache( q='getUserJobs' )
     return result
 
 def upload_jobIcon( jobID=None, img=None, nimURL=None, apiKey=None ) :
@@ -918,14 +793,14 @@ def upload_jobIcon( jobID=None, img=None, nimURL=None, apiKey=None ) :
 
 def get_jobInfo( jobID=None ) :
     'Builds a dictionary of job information including ID, number, jobname, and folder'
-    return get( {'q': 'getJobInfo', 'ID': str(jobID)} )
+    return cached_connect( {'q': 'getJobInfo', 'ID': str(jobID)} )
 
 
 #  Servers & Project Stuctures  #
 
 def get_allServers( locationID='' ) :
     'Retrieves all servers optionally filtered by locationID'
-    servers=get( {'q':'getServers', 'ID':locationID} )
+    servers=cached_connect( {'q':'getServers', 'ID':locationID} )
     return servers
 
 def get_servers( ID=None ) :
@@ -937,19 +812,19 @@ def get_servers( ID=None ) :
 def get_jobServers( ID=None ) :
     'Retrieves servers associated with a specified job ID - matches phpAPI'
     if ID :
-        servers=get( {'q':'getJobServers', 'ID':ID} )
+        servers=cached_connect( {'q':'getJobServers', 'ID':ID} )
         return servers
 
 def get_serverInfo( ID=None ) :
     'Retrieves servers information'
     if ID :
-        serverInfo=get( {'q':'getServerInfo', 'ID':ID} )
+        serverInfo=cached_connect( {'q':'getServerInfo', 'ID':ID} )
         return serverInfo
 
 def get_serverOSPath( ID=None, os='' ) :
     'Retrieves server path based on OS'
     if ID :
-        serverOSPath=get( {'q':'get_serverOSPath', 'ID':ID, 'os':os} )
+        serverOSPath=cached_connect( {'q':'get_serverOSPath', 'ID':ID, 'os':os} )
         return serverOSPath
     else:
         return "Server ID Missing"
@@ -966,7 +841,7 @@ def get_osPath( fileID=None, os='' ) :
 def get_paths( item='', ID=None) :
     'Retrieves nim path for project structure - items options: job / show / shot / asset'
     if ID :
-        path=get( {'q':'getPaths', 'type':item, 'ID':ID} )
+        path=cached_connect( {'q':'getPaths', 'type':item, 'ID':ID} )
         return path
     else:
         P.error ('get_paths: Missing ID')
@@ -1144,7 +1019,7 @@ def get_shows( jobID=None ) :
 
 def get_showInfo( showID=None ) :
     'Builds a dictionary of all shows for a given show'
-    return get( {'q': 'getShowInfo', 'ID': str(showID)} )
+    return cached_connect( {'q': 'getShowInfo', 'ID': str(showID)} )
 
 def add_show( jobID=None, name=None, trt=None, has_previs=None) :
     '''
@@ -1190,6 +1065,8 @@ def update_show( showID=None, name=None, trt=None) :
     if trt is not None : params['trt'] = trt
 
     result = connect( method='get', params=params )
+    clear_cache( q='getShowInfo', ID=showID )
+    clear_cache( q='getPaths', type='show', ID=showID )
     return result
 
 def delete_show( showID=None ) :
@@ -1206,6 +1083,8 @@ def delete_show( showID=None ) :
     if showID is not None : params['showID'] = showID
 
     result = connect( method='get', params=params )
+    clear_cache( q='getShowInfo', ID=showID )
+    clear_cache( q='getPaths', type='show', ID=showID )
     return result
 
 
@@ -1370,6 +1249,7 @@ def update_shot( shotID=None, shotStatusID=None, shotStatus=None, description=No
     if customKeys is not None : params['customKeys'] = json.dumps(customKeys)
 
     result = connect( method='get', params=params )
+    clear_cache( q='getPaths', type='shot', ID=shotID )
     return result
 
 def delete_shot( shotID=None) :
@@ -1387,6 +1267,7 @@ def delete_shot( shotID=None) :
     if shotID is not None : params['shotID'] = shotID
 
     result = connect( method='get', params=params )
+    clear_cache( q='getPaths', type='shot', ID=shotID )
     return result
 
 def upload_shotIcon( shotID=None, img=None, nimURL=None, apiKey=None ) :
@@ -1663,14 +1544,14 @@ def to_nimDir( nim=None ) :
         if nim.ID('shot') :
             
             #  Asset Information :
-            shotInfo=Api.get( {'q': 'getPaths', 'type': 'shot', 'ID' : str(nim.ID('shot'))} )
+            shotInfo=get_paths( item='shot', ID=str(nim.ID('shot')) )
             if shotInfo and type(shotInfo)==type(dict()) and 'root' in shotInfo :
                 shotPath=os.path.normpath( os.path.join( nim.server(), shotInfo['root'] ) )
                 shotPlates=os.path.normpath( os.path.join( nim.server(), shotInfo['plates'] ) )
                 shotRenders=os.path.normpath( os.path.join( nim.server(), shotInfo['renders'] ) )
                 shotComps=os.path.normpath( os.path.join( nim.server(), shotInfo['comps'] ) )
             #  Task Information :
-            taskDict=Api.get( {'q': 'getTaskTypes', 'app': nim.app().upper()} )
+            taskDict=cached_connect( {'q': 'getTaskTypes', 'app': nim.app().upper()} )
             if taskDict and type(taskDict)==type(list()) :
                 for task in taskDict :
                     if 'name' in task.keys() and nim.name('task')==task['name'] :
@@ -1692,11 +1573,11 @@ def to_nimDir( nim=None ) :
     elif nim.tab()=='ASSET' :
         if nim.ID('asset') :
             #  Asset Information :
-            assetInfo=Api.get( {'q': 'getPaths', 'type': 'asset', 'ID' : str(nim.ID('asset'))} )
+            assetInfo=get_paths( item='asset', ID=str(nim.ID('asset')) )
             if assetInfo and type(assetInfo)==type(dict()) and 'root' in assetInfo :
                 assetPath=assetInfo['root']
             #  Task Information :
-            taskDict=Api.get( {'q': 'getTaskTypes', 'app': nim.app().upper()} )
+            taskDict=cached_connect( {'q': 'getTaskTypes', 'app': nim.app().upper()} )
             if taskDict and type(taskDict)==type(list()) :
                 for task in taskDict :
                     if 'name' in task.keys() and nim.name('task')==task['name'] :
@@ -1843,6 +1724,47 @@ def to_filePath( nim=None, padding=2, pub=False ) :
         P.error( 'Function api.to_filePath() was unable to derive a file path' )
         return False
 
+def get_verUpContext( nim=None, basename='' ) :
+    '''
+    Fetches the API information a version up needs in one concurrent round of queries.
+
+    The server path, server info, project paths, task types and item info are served from,
+    and kept in, the query cache, so the to_nimDir() / to_fileDir() / os_filePath() calls
+    made while versioning up don't go back to the server.  The basename version is always
+    fetched fresh.  Returns a dictionary keyed by query name.
+    '''
+    context={}
+    if not nim :
+        P.error( 'Please pass api.get_verUpContext() a NIM dictionary.' )
+        return context
+    
+    if nim.tab()=='SHOT' :
+        itemType, itemID, infoQuery='shot', nim.ID('shot'), 'getShotInfo'
+    else :
+        itemType, itemID, infoQuery='asset', nim.ID('asset'), 'getAssetInfo'
+    serverID=nim.server(get='ID')
+    
+    names, queries=[], []
+    if serverID :
+        names.extend( ['serverOSPath', 'serverInfo'] )
+        queries.extend( [{'q': 'get_serverOSPath', 'ID': serverID, 'os': platform.system()},
+            {'q': 'getServerInfo', 'ID': serverID}] )
+    if itemID :
+        names.extend( ['paths', 'itemInfo'] )
+        queries.extend( [{'q': 'getPaths', 'type': itemType, 'ID': str(itemID)},
+            {'q': infoQuery, 'ID': itemID}] )
+        if basename :
+            names.append( 'baseVer' )
+            queries.append( ({'q': 'getBasenameVersion', 'class': itemType.upper(), 'itemID': itemID,
+                'basename': basename}, 0) )
+    if nim.app() :
+        names.append( 'taskTypes' )
+        queries.append( {'q': 'getTaskTypes', 'app': nim.app().upper()} )
+    
+    for name, result in zip( names, cached_connect_all( queries ) ) :
+        context[name]=result
+    return context
+
 
 def get_bases( shotID=None, assetID=None, showID=None, task='', taskType=None, taskID=None, taskTypeID=None, pub=False ) :
     '''
@@ -2094,8 +2016,21 @@ def get_verInfo( verID=None, username=None ) :
     result = connect( method='get', params=params )
     return result
 
-def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False, symLink=True ) :
+def postsave_failed() :
+    'Tells the user about background post-save jobs that ran out of retries - call from the main thread'
+    failed=PostSave.failed()
+    if not failed :
+        return []
+    msg='These files were saved, but couldn\'t be added to NIM:\n\n    %s\n\n' % '\n    '.join( failed )+\
+        'Their jobs were kept in %s' % PostSave.get_dir()
+    P.error( msg )
+    if can_prompt() :
+        Win.popup( title=winTitle+' - Post-Save Error', msg=msg )
+    return failed
+
+def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False, symLink=True, background=True ) :
     'NIM Connector Function used to save/publish/version up files'
+    'Adding the file to NIM and publishing run in the background, unless background is False'
     user, job, asset, show, shot, basename, task='', '', '', '', '', '', ''
     userID, jobID, assetID, showID, shotID='', '', '', '', ''
     shotCheck, assetCheck=False, False
@@ -2110,6 +2045,9 @@ def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False,
         if pub : nim.set_name( elem='filter', name='Published' )
         else : nim.set_name( elem='filter', name='Work' )
     
+    #  Tell the user about earlier saves that couldn't be added to NIM in the background :
+    postsave_failed()
+    
     #  Print :
     action=''
     if nim.mode().lower() in ['pub', 'publish'] :
@@ -2163,7 +2101,11 @@ def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False,
     
     #  Version Up File :
     #  [AS] returning nim object from verUp to update if loading exported file
-    verUpResult=F.verUp( nim=nim, padding=padding, selected=selected, win_launch=win_launch, pub=pub, symLink=symLink )
+    verUpResult=F.verUp( nim=nim, padding=padding, selected=selected, win_launch=win_launch, pub=pub, symLink=symLink,
+        copyPub=False )
+    if not verUpResult :
+        P.error( 'File NOT saved.' )
+        return False
     filePath = verUpResult['filepath']
     verUpNim = verUpResult['nim']
     P.info('Filepath: %s' % filePath)
@@ -2172,7 +2114,14 @@ def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False,
     
     #  Add file to API :
     if filePath and os.path.isfile( filePath ) :
-        result_addFile=add_file( nim=nim, filePath=filePath, comment=nim.name( 'comment' ), pub=pub )
+        #  Register, resolve the file ID and publish - in the background, once the file is on disk :
+        result_addFile=False
+        job=PostSave.mk_job( nim=nim, filePath=filePath, pub=pub, symLink=symLink, pubPath=verUpResult['pubPath'] )
+        if job and background :
+            PostSave.submit( job )
+            result_addFile=True
+        elif job :
+            result_addFile=PostSave.run_job( job )
         if result_addFile :
             action=''
             if nim.mode().lower() in ['pub', 'publish'] :
@@ -2182,40 +2131,19 @@ def versionUp( nim=None, padding=2, selected=False, win_launch=False, pub=False,
             elif nim.mode().lower() in ['ver', 'verup', 'version', 'versionup'] :
                 action='Versioned Up'
             P.info( 'File has been %s successfully.\n' % action )
+            #  In the background, the file is only queued to be added to NIM :
+            queued=''
+            if background :
+                queued='\n\nIt will be added to NIM in the background.'
             if not pub :
                 if nim.mode().lower() in ['save', 'saveas'] :
-                    Win.popup( title=winTitle+' - Versioned Up', msg='File has been Saved successfully.' )
+                    Win.popup( title=winTitle+' - Versioned Up', msg='File has been Saved successfully.'+queued )
                 elif nim.mode().lower() in ['ver', 'verup', 'version', 'versionup'] :
-                    Win.popup( title=winTitle+' - Versioned Up', msg='File has been Versioned Up successfully.' )
+                    Win.popup( title=winTitle+' - Versioned Up', msg='File has been Versioned Up successfully.'+queued )
             else :
                 #Win.popup( title=winTitle+' - Version\'ed Up', msg='File has been Published successfully.' )
                 pass
             
-            #  Publish Sym-Links :
-            if pub and symLink :
-                P.info( 'Initiating Sym-Link Publish...' )
-                fileID, versInfo=None, None
-                basename=to_basename( nim=nim )
-                if nim.tab()=='SHOT' :
-                    versInfo=get_vers( shotID=nim.ID( 'shot' ), basename=basename, pub=True )
-                elif nim.tab()=='ASSET' :
-                    versInfo=get_vers( assetID=nim.ID( 'asset' ), basename=basename, pub=True )
-                for verInfo in versInfo :
-                    temp_path=os.path.normpath( os.path.join( verInfo['filepath'], verInfo['filename'] ) )
-                    if temp_path==filePath :
-                        fileID=verInfo['fileID']
-                        P.info( 'File ID = %s' % fileID )
-                        P.info( 'Publishing Sym-Link...' )
-                        #  Publish sym link, if necessary :
-                        if fileID :
-                            result=get( {'q': 'publishSymlink', 'fileID': str(fileID)} )
-                            P.info( '    Sym-Link Published!' )
-                            #Win.popup( title=winTitle+' - Publish', msg='Sym-Link Published!' )
-                        else :
-                            Win.popup( title=winTitle+' - Publish Error', msg='Problem publishing Sym-Link!!!' )
-                            P.error( 'Sorry!  Problem retrieving File ID.' )
-                        break
-            
             #  Prompt to open exported file :
             if selected :
                 result=Win.popup( title='NIM - Open Export?', type='okCancel', \
@@ -2398,8 +2326,12 @@ def publish_symLink( fileID=None, elementID=None, forceLink=1 ) :
     return result
 
 
-def add_file( nim=None, filePath='', comment='', pub=False ) :
-    'Adds a file to the NIM API'
+def get_addFileQuery( nim=None, filePath='', comment='', pub=False ) :
+    '''
+    Builds the API queries that add a file to NIM, without running them.
+    Returns a dictionary holding the "addFile" query parameters, and the "clearPub"
+    arguments for clear_pubFlags() when publishing - or False if the file can't be added.
+    '''
     
     #  Get nim info from filepath :
     if filePath and not nim :
@@ -2465,12 +2397,10 @@ def add_file( nim=None, filePath='', comment='', pub=False ) :
     #  Get Asset information :
     if nim.ID( 'asset' ) and nim.ID( 'asset' ) != 'None' :
         P.info('Retrieving Asset Information')
-        assetInfo=get( {'q': 'getAssetInfo', 'ID': nim.ID( 'asset' )} )
-        basenameInfo=get( {'q':'getBasenameVersion', 'class':'ASSET', \
-            'itemID': nim.ID( 'asset' ), 'basename': nim.name( 'base' )} )
+        assetInfo=cached_connect( {'q': 'getAssetInfo', 'ID': nim.ID( 'asset' )} )
         #  Error check dictionaries :
-        if not assetInfo or not basenameInfo or not len(assetInfo) or not len(basenameInfo) :
-            P.warning( 'Problem retrieving Asset/Basename information from the database.' )
+        if not assetInfo or not len(assetInfo) :
+            P.warning( 'Problem retrieving Asset information from the database.' )
         if assetInfo[0]['jobFolder']=='NULL' :
             P.error( 'Selected Job is not online, sorry.' )
             return False
@@ -2485,16 +2415,7 @@ def add_file( nim=None, filePath='', comment='', pub=False ) :
     #  Get Shot information :
     elif nim.ID( 'shot' ) and nim.ID( 'shot' ) != 'None' :
         P.info('Retrieving Shot Information')
-        shotInfo=get( {'q': 'getShotInfo', 'ID':nim.ID( 'shot' )} )
-        basenameInfo=get( {'q': 'getBasenameVersion', 'class': 'SHOT', \
-            'itemID': nim.ID( 'shot' ), 'basename': nim.name('base')} )
-        '''
-        #  Error check dictionaries :
-        if not shotInfo or not basenameInfo or not len(shotInfo) or not len(basenameInfo) :
-            P.warning( '\nProblem retrieving Shot/Basename information from the database.' )
-            P.warning( 'Shot Info = %s' % shotInfo )
-            P.warning( 'Basename Info = %s' % basenameInfo )
-        '''
+        shotInfo=cached_connect( {'q': 'getShotInfo', 'ID':nim.ID( 'shot' )} )
         if shotInfo[0]['jobFolder']=='NULL' or shotInfo[0]['showFolder']=='NULL' :
             P.error( 'Specified Job/Show is not online, sorry.' )
             return False
@@ -2508,49 +2429,97 @@ def add_file( nim=None, filePath='', comment='', pub=False ) :
         showFolder=shotInfo[0]['showFolder']
         shotName=shotInfo[0]['shotName']
     
-    #  API call :
+    #  API query :
     if nim.tab()=='ASSET' :
-        _task=F.task_toAbbrev( nim.name( 'task' ) )
-        
+        _class, itemID='ASSET', nim.ID( 'asset' )
         print 'Task Folder = %s' % nim.taskFolder()
-        
-        if not pub :
-            result=get( {'q': 'addFile', 'class': 'ASSET', 'itemID': nim.ID( 'asset' ), 
-                'task_type_ID': str(nim.ID('task')), 'task_type_folder': nim.taskFolder(),
-                'userID': str(usrID), 'basename': fileBase, 'filename': os.path.basename(filePath),
-                'filepath': fileDir, 'ext': ext, 'version': str(ver), 'note': nim.name( 'comment' ),
-                'serverID': str(nim.server( get='ID' ))} )
-        elif pub :
-            clear_pubFlags( assetID=nim.ID( 'asset' ), basename=fileBase )
-            result=get( {'q': 'addFile', 'class': 'ASSET', 'itemID': nim.ID( 'asset' ),
-                'task_type_ID': str(nim.ID('task')), 'task_type_folder': nim.taskFolder(),
-                'userID': str(usrID), 'basename': fileBase, 'filename': os.path.basename(filePath),
-                'filepath': fileDir, 'ext': ext, 'version': str(ver), 'note': nim.name( 'comment' ),
-                'serverID': str(nim.server( get='ID' )), 'isPub': 1, 'isWork': 0} )
     elif nim.tab()=='SHOT' :
-        if not pub :
-            result=get( {'q': 'addFile', 'class': 'SHOT', 'itemID': nim.ID( 'shot' ),
-                'task_type_ID': str(nim.ID('task')), 'task_type_folder': nim.taskFolder(),
-                'userID': str(usrID), 'basename': fileBase, 'filename': os.path.basename(filePath),
-                'filepath': fileDir, 'ext': ext, 'version': str(ver), 'note': nim.name( 'comment' ),
-                'serverID': str(nim.server( get='ID' ))} )
-        elif pub :
-            clear_pubFlags( shotID=nim.ID( 'shot' ), basename=fileBase )
-            result=get( {'q': 'addFile', 'class': 'SHOT', 'itemID': nim.ID( 'shot' ),
-                'task_type_ID': str(nim.ID('task')), 'task_type_folder': nim.taskFolder(),
-                'userID': str(usrID), 'basename': fileBase, 'filename': os.path.basename(filePath),
-                'filepath': fileDir, 'ext': ext, 'version': str(ver), 'note': nim.name( 'comment' ),
-                'serverID': str(nim.server( get='ID' )), 'isPub': 1, 'isWork': 0} )
-    if  not result :
+        _class, itemID='SHOT', nim.ID( 'shot' )
+    else :
+        P.error( 'api.add_file function needs to be given either a shot, or asset, ID number...  Exiting.' )
+        return False
+    params={'q': 'addFile', 'class': _class, 'itemID': itemID,
+        'task_type_ID': str(nim.ID('task')), 'task_type_folder': nim.taskFolder(),
+        'userID': str(usrID), 'basename': fileBase, 'filename': os.path.basename(filePath),
+        'filepath': fileDir, 'ext': ext, 'version': str(ver), 'note': nim.name( 'comment' ),
+        'serverID': str(nim.server( get='ID' ))}
+    clearPub=None
+    if pub :
+        params['isPub'], params['isWork']=1, 0
+        if _class=='ASSET' :
+            clearPub={'assetID': itemID, 'basename': fileBase}
+        else :
+            clearPub={'shotID': itemID, 'basename': fileBase}
+    
+    return {'addFile': params, 'clearPub': clearPub}
+
+def add_file( nim=None, filePath='', comment='', pub=False ) :
+    'Adds a file to the NIM API'
+    query=get_addFileQuery( nim=nim, filePath=filePath, comment=comment, pub=pub )
+    if not query :
+        return False
+    
+    #  API call :
+    if query['clearPub'] :
+        clear_pubFlags( **query['clearPub'] )
+    result=get( query['addFile'] )
+    fileID=get_fileID( result )
+    if not fileID :
         P.error( 'File saved, but there was a problem writing to the NIM database.' )
         P.error( '    Database has not been populated with your file.' )
         P.error( str(result) )
         return False
     else :
         P.info( 'NIM API updated with new file.' )
-        P.info( '      File ID = %s' % result )
+        P.info( '      File ID = %s' % fileID )
     
-    return True
+    #  Return the new file's ID and path along with the API result :
+    if isinstance( result, dict ) :
+        fileResult=dict( result )
+    else :
+        fileResult={'success': 'true'}
+    fileResult['ID'], fileResult['filePath']=fileID, filePath
+    return fileResult
+
+def get_fileID( result=None ) :
+    'Returns the new file ID from the result of an addFile query, or None if it failed'
+    if isinstance( result, list ) and len(result)==1 :
+        result=result[0]
+    if isinstance( result, dict ) :
+        if str(result.get( 'success', 'true' )).lower()=='false' :
+            return None
+        return result.get( 'ID' ) or result.get( 'fileID' )
+    if result and not isinstance( result, (bool, list) ) :
+        return result
+    return None
+
+def find_fileID( parent='shot', parentID=None, filePath='', basename='', pub=False ) :
+    'Looks up the ID of a file already in NIM by its name and location'
+    filePath=os.path.normpath( filePath )
+    fileName=os.path.basename( filePath )
+    
+    #  Query the files with this name :
+    files=find_files( parent=parent, parentID=parentID, name=fileName, path=None, metadata=None )
+    if files and isinstance( files, list ) :
+        for fileInfo in files :
+            if not isinstance( fileInfo, dict ) :
+                continue
+            fileDir=fileInfo.get( 'filepath' ) or fileInfo.get( 'path' ) or ''
+            if fileInfo.get( 'filename' , fileName )==fileName and \
+                os.path.normpath( os.path.join( fileDir, fileName ) )==filePath :
+                return fileInfo.get( 'ID' ) or fileInfo.get( 'fileID' )
+    
+    #  Fall back to the basename's version list :
+    if parent.lower()=='shot' :
+        versInfo=get_vers( shotID=parentID, basename=basename, pub=pub )
+    elif parent.lower()=='asset' :
+        versInfo=get_vers( assetID=parentID, basename=basename, pub=pub )
+    else :
+        versInfo=get_vers( showID=parentID, basename=basename, pub=pub )
+    for verInfo in versInfo or [] :
+        if os.path.normpath( os.path.join( verInfo['filepath'], verInfo['filename'] ) )==filePath :
+            return verInfo['fileID']
+    return None
 
 def save_file( parent='SHOW', parentID=0, task_type_ID=0, task_folder='', userID=0, basename='', filename='', \
     path='', ext='', version='', comment='', serverID=0, pub=False, forceLink=1, work=True, metadata=None, customKeys=None ) :
@@ -2656,6 +2625,8 @@ def save_file( parent='SHOW', parentID=0, task_type_ID=0, task_folder='', userID
     else :
         P.info( 'NIM API updated with new file.' )
         P.info( '      File ID = %s' % result['ID'] )
+        if path is not None and filename is not None :
+            result['filePath']=os.path.join( path, filename )
 
         if pub:
             ID = result['ID']
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_batch.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import threading, traceback
+
+#  NIM Imports :
+import nim_client as Client
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+#  Number of worker threads - enough to hide the server's latency without flooding it :
+max_workers=8
+#  Seconds between calls to a batch's progress function while it waits :
+progress_interval=0.1
+
+
+class BatchJob( object ) :
+    'A call queued in a batch, and what came of it'
+
+    def __init__( self, key=None, func=None, args=(), kwargs=None, after=None ) :
+        self.key=key
+        self.func=func
+        self.args=args
+        self.kwargs=kwargs or {}
+        self.after=after or []
+        #  One of "pending", "running", "done", "failed" or "skipped" :
+        self.state='pending'
+        self.result=None
+        self.error=None
+        return
+
+
+class Batch( object ) :
+    '''
+    Runs a set of NIM calls on a pool of worker threads.
+
+    Jobs can name other jobs they depend on with "after" - a job only starts once those have
+    finished, and is skipped if any of them failed, or returned False or None.  The calling
+    thread waits in run(), calling a progress function so it can keep its UI up to date :
+
+        batch=nim_batch.Batch()
+        for shot in shots :
+            batch.add( shot['name'], nimAPI.add_shot, kwargs={'showID': showID, 'name': shot['name']} )
+            batch.add( shot['name']+'_icon', upload_icon, args=(shot,), after=[shot['name']] )
+        batch.run( progress=lambda done, total : progressBar.setValue( done ) )
+
+    Workers send their calls through the client active in the calling thread, and never prompt.
+    '''
+
+    def __init__( self, workers=None ) :
+        self.workers=workers or max_workers
+        self._jobs={}
+        self._order=[]
+        self._cond=threading.Condition()
+        self._cancelled=False
+        return
+
+    def add( self, key=None, func=None, args=(), kwargs=None, after=None ) :
+        'Queues a call to func - key names the job, and must be unique within the batch'
+        if key in self._jobs :
+            raise ValueError( 'Job "%s" is already in the batch' % key )
+        for dependency in after or [] :
+            if dependency not in self._jobs :
+                raise ValueError( 'Job "%s" depends on unknown job "%s"' % (key, dependency) )
+        self._jobs[key]=BatchJob( key=key, func=func, args=args, kwargs=kwargs, after=after )
+        self._order.append( key )
+        return key
+
+    def __len__(self) :
+        return len(self._order)
+
+    def __contains__( self, key ) :
+        return key in self._jobs
+
+    def job( self, key=None ) :
+        'Returns the BatchJob with the given key'
+        return self._jobs[key]
+
+    def result( self, key=None, default=None ) :
+        'Returns the result of a job, or the default if it didn\'t finish'
+        job=self._jobs.get( key )
+        if job is None or job.state!='done' :
+            return default
+        return job.result
+
+    def cancel(self) :
+        'Stops jobs that haven\'t started yet from running - they are marked as skipped'
+        with self._cond :
+            self._cancelled=True
+            self._cond.notify_all()
+        return
+
+    def run( self, progress=None ) :
+        '''
+        Runs every job and waits for them all to finish.  progress is called in the calling
+        thread with the number of finished jobs and the total - return False from it to cancel.
+        Returns True if every job succeeded.
+        '''
+        total=len(self._order)
+        if not total :
+            return True
+        client=Client.current()
+        threads=[]
+        for index in range( min( self.workers, total ) ) :
+            thread=threading.Thread( target=self._work, args=(client,), name='NIM_Batch' )
+            thread.daemon=True
+            thread.start()
+            threads.append( thread )
+
+        with self._cond :
+            while True :
+                if progress :
+                    #  Let the caller update its UI without holding up the workers :
+                    done=self._count_finished()
+                    self._cond.release()
+                    try :
+                        keepGoing=progress( done, total )
+                    finally :
+                        self._cond.acquire()
+                    if keepGoing is False and not self._cancelled :
+                        self._cancelled=True
+                        self._cond.notify_all()
+                if self._count_finished()==total :
+                    break
+                self._cond.wait( progress_interval if progress else None )
+        for thread in threads :
+            thread.join()
+        return all( [self._jobs[key].state=='done' for key in self._order] )
+
+    def cancelled(self) :
+        'Returns True if the batch was cancelled'
+        return self._cancelled
+
+    def jobs(self) :
+        'Returns every job, in the order they were added'
+        return [self._jobs[key] for key in self._order]
+
+    def failed(self) :
+        'Returns the jobs that failed or were skipped, in the order they were added'
+        return [self._jobs[key] for key in self._order if self._jobs[key].state in ['failed', 'skipped']]
+
+    def _count_finished(self) :
+        return len( [key for key in self._order if self._jobs[key].state in ['done', 'failed', 'skipped']] )
+
+    def _next(self) :
+        '''
+        Returns the first job that is ready to run, skipping those whose dependencies failed.
+        Returns None once no job is left, or False while jobs are waiting on others - call
+        with the condition held.
+        '''
+        waiting=False
+        for key in self._order :
+            job=self._jobs[key]
+            if job.state!='pending' :
+                continue
+            if self._cancelled :
+                job.state='skipped'
+                job.error='Cancelled'
+                continue
+            states=[self._jobs[dependency] for dependency in job.after]
+            if [dependency for dependency in states if dependency.state in ['failed', 'skipped']] :
+                job.state='skipped'
+                job.error='A job it depends on failed'
+                continue
+            if [dependency for dependency in states if dependency.state!='done'] :
+                waiting=True
+                continue
+            return job
+        if waiting :
+            return False
+        return None
+
+    def _work( self, client=None ) :
+        'Worker loop - runs jobs until none are left'
+        with client, Client.headless() :
+            while True :
+                with self._cond :
+                    job=self._next()
+                    while job is False :
+                        self._cond.wait()
+                        job=self._next()
+                    if job is None :
+                        self._cond.notify_all()
+                        return
+                    job.state='running'
+
+                try :
+                    result=job.func( *job.args, **job.kwargs )
+                    state='done' if result is not False and result is not None else 'failed'
+                    error=None if state=='done' else 'Returned %r' % (result,)
+                except Client.NimError, e :
+                    result, state, error=None, 'failed', str(e)
+                except Exception :
+                    result, state, error=None, 'failed', traceback.format_exc()
+                if state=='failed' :
+                    P.error( 'NIM batch job "%s" failed - %s' % (job.key, error) )
+
+                with self._cond :
+                    job.result, job.state, job.error=result, state, error
+                    self._cond.notify_all()
+
+
+#  End
+
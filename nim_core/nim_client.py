@@ -0,0 +1,538 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_client.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import contextlib, copy, json, mimetypes, os, stat, threading, time, weakref
+import urllib, urllib2, urlparse
+try :
+    import ssl
+except ImportError :
+    ssl=None
+
+#  NIM Imports :
+import nim_lazy as Lazy
+#  Loaded on first use, as nim_prefs imports nim_api, which needs this module to be complete :
+Prefs=Lazy.module( 'nim_prefs', __name__ )
+P=Lazy.module( 'nim_print', __name__ )
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+#  Seconds to wait for the NIM server before giving up on a request :
+request_timeout=120.0
+#  Seconds to keep the results of cached read-only queries :
+query_ttl=60.0
+_sslContext=None
+_sslLock=threading.Lock()
+_redirects={}
+_redirectLock=threading.Lock()
+_clients=weakref.WeakSet()
+_local=threading.local()
+#  Uploads sent to one NIM server at the same time, across all threads :
+max_uploads_per_host=3
+_uploadSlots={}
+_uploadSlotLock=threading.Lock()
+
+
+#  Exceptions :
+
+class NimError( Exception ) :
+    'Base class for errors raised by the NIM client'
+    pass
+
+class NimPrefsError( NimError ) :
+    'The NIM preferences are missing, or don\'t have a NIM URL and user'
+    pass
+
+class NimConnectionError( NimError ) :
+    'The NIM server couldn\'t be reached, or didn\'t complete the request'
+    def __init__( self, reason='', url='', code=None ) :
+        NimError.__init__( self, 'NIM Connection Error: %s' % reason )
+        self.reason=reason
+        self.url=url
+        self.code=code
+
+class NimAPIError( NimError ) :
+    'The NIM server answered with an error, or with something that isn\'t JSON'
+    def __init__( self, error='', result=None ) :
+        NimError.__init__( self, 'NIM API Error: %s' % error )
+        self.error=error
+        self.result=result
+
+
+#  Headless mode :
+#       Code that must never prompt - worker threads, render farm tasks - runs inside
+#       "with headless() :", or uses a NimClient made with headless=True, and the
+#       interactive nim_api functions raise NimError instead.
+
+@contextlib.contextmanager
+def headless() :
+    'Makes nim_api raise NimError, instead of prompting the user, in the current thread'
+    previous=getattr( _local, 'headless', False )
+    _local.headless=True
+    try :
+        yield
+    finally :
+        _local.headless=previous
+
+def is_headless() :
+    'Returns True if the current thread is running in headless mode'
+    return getattr( _local, 'headless', False ) or current().headless
+
+
+#  Connection Information :
+
+def get_sslContext() :
+    'Returns the SSL context shared by all requests, or None if SSL contexts aren\'t available'
+    global _sslContext
+    with _sslLock :
+        if _sslContext is None :
+            try :
+                ssl_ctx=ssl.create_default_context()
+                ssl_ctx.check_hostname=False
+                ssl_ctx.verify_mode=ssl.CERT_NONE
+                _sslContext=ssl_ctx
+            except AttributeError :
+                _sslContext=False
+    return _sslContext or None
+
+def get_apiKey() :
+    'Returns the user\'s API key from the NIM home directory, or an empty string'
+    key_path=os.path.normpath( os.path.join( Prefs.get_home(), 'nim.key' ) )
+    if not os.path.isfile( key_path ) :
+        return ''
+    try :
+        with open( key_path, 'r' ) as keyFile :
+            return keyFile.readline().strip()
+    except (IOError, OSError) :
+        P.error( 'Unable to read api key.' )
+        return ''
+
+def get_connect_info() :
+    'Returns the NIM URL, user and API key from the preferences - raises NimPrefsError if missing'
+    if not os.path.isfile( Prefs.get_path() ) :
+        raise NimPrefsError( 'NIM preferences not found - %s' % Prefs.get_path() )
+    prefs=Prefs.read()
+    if not prefs or not prefs.get( 'NIM_URL' ) :
+        raise NimPrefsError( '"NIM_URL" not found in preferences!' )
+    if not prefs.get( 'NIM_User' ) :
+        raise NimPrefsError( '"NIM_User" not found in preferences!' )
+    return {'nim_apiURL': prefs['NIM_URL'], 'nim_apiUser': prefs['NIM_User'], 'nim_apiKey': get_apiKey()}
+
+
+def _urlopen( request=None, timeout=None ) :
+    'Opens a request with the shared SSL context, where the server accepts it'
+    if timeout is None :
+        timeout=request_timeout
+    ssl_ctx=get_sslContext()
+    if ssl_ctx is not None :
+        try :
+            return urllib2.urlopen( request, timeout=timeout, context=ssl_ctx )
+        except TypeError :
+            #  Python versions before 2.7.9 don't take a context :
+            pass
+    return urllib2.urlopen( request, timeout=timeout )
+
+def api_error( result=None ) :
+    'Returns the error message of an API error result, or an empty string'
+    if type(result)==type(list()) and len(result)==1 and isinstance( result[0], dict ) :
+        return result[0].get( 'error' ) or ''
+    return ''
+
+
+#  Uploads :
+
+class FormPostHandler( urllib2.BaseHandler ) :
+    'Encodes requests that include open files as multipart form data'
+    handler_order=urllib2.HTTPHandler.handler_order-10 # needs to run first
+
+    def http_request( self, request ) :
+        data=request.get_data()
+        if data is not None and not isinstance( data, basestring ) :
+            files, params=[], []
+            for key, value in data.items() :
+                if isinstance( value, file ) :
+                    files.append( (key, value) )
+                else :
+                    params.append( (key, value) )
+            if not files :
+                data=urllib.urlencode( params, True ) # sequencing on
+            else :
+                boundary, data=self.encode( params, files )
+                content_type='multipart/form-data; boundary=%s' % boundary
+                request.add_unredirected_header( 'Content-Type', content_type )
+            request.add_data( data )
+        return request
+
+    def encode( self, params, files, boundary=None, buffer=None ) :
+        import email.generator as email_gen
+        import cStringIO
+        if boundary is None :
+            boundary=email_gen._make_boundary()
+        if buffer is None :
+            buffer=cStringIO.StringIO()
+        for (key, value) in params :
+            buffer.write( '--%s\r\n' % boundary )
+            buffer.write( 'Content-Disposition: form-data; name="%s"' % key )
+            buffer.write( '\r\n\r\n%s\r\n' % value )
+        for (key, fd) in files :
+            filename=fd.name.split( '/' )[-1]
+            content_type=mimetypes.guess_type( filename )[0] or 'application/octet-stream'
+            file_size=os.fstat( fd.fileno() )[stat.ST_SIZE]
+            buffer.write( '--%s\r\n' % boundary )
+            buffer.write( 'Content-Disposition: form-data; name="%s"; filename="%s"\r\n' % (key, filename) )
+            buffer.write( 'Content-Type: %s\r\n' % content_type )
+            buffer.write( 'Content-Length: %s\r\n' % file_size )
+            fd.seek(0)
+            buffer.write( '\r\n%s\r\n' % fd.read() )
+        buffer.write( '--%s--\r\n\r\n' % boundary )
+        return boundary, buffer.getvalue()
+
+    def https_request( self, request ) :
+        return self.http_request( request )
+
+def _uploadURL( nimURL='', timeout=None ) :
+    'Returns the URL to upload to, following an http to https redirect - checked once per URL'
+    with _redirectLock :
+        if nimURL in _redirects :
+            return _redirects[nimURL]
+    _actionURL=nimURL.encode( 'ascii' )
+    try :
+        res=_urlopen( urllib2.Request( ''.join(( nimURL, urllib.urlencode( {'q': 'testAPI'} ) )) ), timeout=timeout )
+        finalurl=res.geturl()
+        res.close()
+        if nimURL.startswith( 'http:' ) and finalurl.startswith( 'https' ) :
+            _actionURL=_actionURL.replace( 'http:', 'https:' )
+            P.info( 'Redirect: %s' % _actionURL )
+    except Exception :
+        P.error( 'Failed to test for redirect.' )
+        return _actionURL
+    with _redirectLock :
+        _redirects[nimURL]=_actionURL
+    return _actionURL
+
+
+def _uploadSlot( actionURL='' ) :
+    'Returns the semaphore that limits the uploads sent to a server at once'
+    host=urlparse.urlsplit( actionURL ).netloc.lower()
+    with _uploadSlotLock :
+        slot=_uploadSlots.get( host )
+        if slot is None :
+            slot=_uploadSlots[host]=threading.BoundedSemaphore( max_uploads_per_host )
+    return slot
+
+
+#  Shared Queries :
+#       Used for read-only queries that are asked repeatedly, like job, show and path information.
+#       Concurrent identical queries share a single HTTP request, and successful results are
+#       kept for "ttl" seconds (query_ttl by default).  Callers get their own copy of the result.
+
+class _QueryFlight( object ) :
+    'A query that is in progress, shared by every caller asking for it'
+    def __init__(self) :
+        self.done=threading.Event()
+        self.result=None
+        self.error=None
+
+def _queryKey( params=None ) :
+    'Returns a hashable key for a dictionary of query parameters'
+    return tuple( sorted( [(str(k), str(v)) for k, v in params.items()] ) )
+
+
+class NimClient( object ) :
+    '''
+    A connection to the NIM API, holding its own URL, user, API key and query cache.
+
+    Clients don't prompt, and are safe to share between threads - the cache is locked, and
+    nothing else changes after the client is made.  A client made without a URL reads the
+    connection information from the preferences on each request, as the default client does.
+    Use "with client :" to send the nim_api calls made in the current thread through it :
+
+        client=nim_client.NimClient( headless=True )
+        with client :
+            nimAPI.add_shot( showID=showID, name=name, frames=frames )
+    '''
+
+    def __init__( self, nimURL=None, apiUser=None, apiKey=None, timeout=None, headless=False ) :
+        self.nimURL=nimURL
+        self.apiUser=apiUser
+        self.apiKey=apiKey
+        self.timeout=timeout
+        self.headless=headless
+        self._cache={}
+        self._flights={}
+        self._lock=threading.Lock()
+        self._openers={}
+        _clients.add( self )
+        return
+
+    @classmethod
+    def from_prefs( cls, **kwargs ) :
+        'Returns a client fixed to the connection information in the preferences'
+        connect_info=get_connect_info()
+        return cls( nimURL=connect_info['nim_apiURL'], apiUser=connect_info['nim_apiUser'],
+            apiKey=connect_info['nim_apiKey'], **kwargs )
+
+    def __enter__(self) :
+        stack=getattr( _local, 'clients', None )
+        if stack is None :
+            stack=_local.clients=[]
+        stack.append( self )
+        return self
+
+    def __exit__( self, *args ) :
+        _local.clients.pop()
+        return False
+
+    def connect_info(self) :
+        'Returns the URL, user and API key this client connects with'
+        nimURL, apiUser, apiKey=self._resolve()
+        return {'nim_apiURL': nimURL, 'nim_apiUser': apiUser, 'nim_apiKey': apiKey}
+
+    def _resolve( self, nimURL=None, apiUser=None, apiKey=None ) :
+        'Fills in the URL, user and API key that weren\'t given from the client, then the preferences'
+        if not nimURL :
+            nimURL=self.nimURL
+            if apiUser is None :
+                apiUser=self.apiUser
+            if not apiKey :
+                apiKey=self.apiKey
+            if not nimURL :
+                connect_info=get_connect_info()
+                nimURL=connect_info['nim_apiURL']
+                if apiUser is None :
+                    apiUser=connect_info['nim_apiUser']
+                if not apiKey :
+                    apiKey=connect_info['nim_apiKey']
+        return nimURL, apiUser or '', apiKey or ''
+
+    def request( self, method='get', params=None, nimURL=None, apiKey=None, apiUser=None, timeout=None ) :
+        '''
+        Runs an API query and returns the decoded JSON result, without prompting.
+        Raises NimPrefsError, NimConnectionError, or NimAPIError - whose "result" is the
+        server's answer.
+        '''
+        if not params :
+            raise NimError( 'No SQL command provided to run.' )
+        if method not in ['get', 'post'] :
+            raise NimError( 'Connection method not defined in request.' )
+        nimURL, apiUser, apiKey=self._resolve( nimURL, apiUser, apiKey )
+
+        cmd=urllib.urlencode( params )
+        if method=='get' :
+            _actionURL=''.join(( nimURL, cmd ))
+            req=urllib2.Request( _actionURL )
+        else :
+            _actionURL=nimURL.replace( '?', '' )
+            req=urllib2.Request( _actionURL, cmd )
+        req.add_header( 'X-NIM-API-USER', apiUser )
+        req.add_header( 'X-NIM-API-KEY', apiKey )
+        req.add_header( 'Content-type', 'application/x-www-form-urlencoded; charset=UTF-8' )
+
+        try :
+            _file=_urlopen( req, timeout=timeout or self.timeout )
+            try :
+                data=_file.read()
+            finally :
+                _file.close()
+        except urllib2.HTTPError, e :
+            raise NimConnectionError( reason=e, url=_actionURL, code=e.code )
+        except urllib2.URLError, e :
+            raise NimConnectionError( reason=e.reason, url=_actionURL )
+        except (IOError, OSError), e :
+            raise NimConnectionError( reason=e, url=_actionURL )
+
+        try :
+            result=json.loads( data )
+        except ValueError :
+            raise NimAPIError( error='Unable to decode the server\'s response', result=None )
+        error=api_error( result )
+        if error :
+            raise NimAPIError( error=error, result=result )
+        return result
+
+    def get( self, params=None, **kwargs ) :
+        'Runs a GET query - see request()'
+        return self.request( method='get', params=params, **kwargs )
+
+    def post( self, params=None, **kwargs ) :
+        'Runs a POST query - see request()'
+        return self.request( method='post', params=params, **kwargs )
+
+    def _opener( self, apiUser='', apiKey='' ) :
+        'Returns the client\'s upload opener for a user and API key, building it once'
+        with self._lock :
+            opener=self._openers.get( (apiUser, apiKey) )
+            if opener is None :
+                ssl_ctx=get_sslContext()
+                if ssl_ctx is not None :
+                    opener=urllib2.build_opener( urllib2.HTTPSHandler( context=ssl_ctx ), FormPostHandler )
+                else :
+                    opener=urllib2.build_opener( FormPostHandler )
+                opener.addheaders=[ ('X-NIM-API-USER', apiUser), ('X-NIM-API-KEY', apiKey) ]
+                self._openers[(apiUser, apiKey)]=opener
+        return opener
+
+    def upload( self, params=None, nimURL=None, apiKey=None, apiUser=None, timeout=None ) :
+        '''
+        Posts a query that includes files - params values that are open files are sent as
+        multipart form data.  Returns the server's response, without prompting.  Raises
+        NimPrefsError or NimConnectionError.
+        '''
+        nimURL, apiUser, apiKey=self._resolve( nimURL, apiUser, apiKey )
+        timeout=timeout or self.timeout
+        _actionURL=_uploadURL( nimURL, timeout=timeout )
+        try :
+            with _uploadSlot( _actionURL ) :
+                response=self._opener( apiUser, apiKey ).open( _actionURL, params, timeout or request_timeout )
+                try :
+                    return response.read()
+                finally :
+                    response.close()
+        except urllib2.HTTPError, e :
+            raise NimConnectionError( reason=e, url=_actionURL, code=e.code )
+        except urllib2.URLError, e :
+            raise NimConnectionError( reason=e.reason, url=_actionURL )
+        except (IOError, OSError), e :
+            raise NimConnectionError( reason=e, url=_actionURL )
+
+    def cached_get( self, params=None, ttl=None ) :
+        'Runs a read-only GET query once for all concurrent callers, caching the result for a short time'
+        if ttl is None :
+            ttl=query_ttl
+        key=_queryKey( params or {} )
+
+        with self._lock :
+            cached=self._cache.get( key )
+            if cached and cached[0] > time.time() :
+                return copy.deepcopy( cached[1] )
+            flight=self._flights.get( key )
+            leader=flight is None
+            if leader :
+                flight=_QueryFlight()
+                self._flights[key]=flight
+
+        #  Wait for the caller that is already running this query :
+        if not leader :
+            flight.done.wait()
+            if flight.error is not None :
+                raise flight.error
+            return copy.deepcopy( flight.result )
+
+        result=None
+        try :
+            result=self.get( params=params )
+        except NimError, e :
+            flight.error=e
+            raise
+        finally :
+            with self._lock :
+                if result and flight.error is None :
+                    self._cache[key]=( time.time()+ttl, result )
+                self._flights.pop( key, None )
+            flight.result=result
+            flight.done.set()
+        return copy.deepcopy( result )
+
+    def cached_get_all( self, queries=None, ttl=None ) :
+        '''
+        Runs several read-only queries at the same time, returning their results in order.
+        Each query is a parameter dictionary, or a ( parameters, ttl ) pair to override the
+        cache time.  A query that fails is logged, and its result is None.
+        '''
+        results=[None]*len( queries or [] )
+
+        def _run( index, params, _ttl ) :
+            try :
+                results[index]=self.cached_get( params=params, ttl=_ttl )
+            except NimError, e :
+                P.error( 'Failed to run query %s - %s' % (params, e) )
+
+        threads=[]
+        for index, query in enumerate( queries or [] ) :
+            if isinstance( query, tuple ) :
+                params, _ttl=query
+            else :
+                params, _ttl=query, ttl
+            thread=threading.Thread( target=_run, args=(index, params, _ttl), name='NIM_Query' )
+            thread.daemon=True
+            thread.start()
+            threads.append( thread )
+        for thread in threads :
+            thread.join()
+        return results
+
+    def clear_cache( self, **match ) :
+        'Clears this client\'s cached results - all of them, or those whose parameters match the given values'
+        with self._lock :
+            if not match :
+                self._cache.clear()
+                return
+            match=dict( [(str(k), str(v)) for k, v in match.items()] )
+            for key in list( self._cache.keys() ) :
+                params=dict( key )
+                if all( [params.get(k)==v for k, v in match.items()] ) :
+                    del self._cache[key]
+        return
+
+
+#  The client used when none is active in the current thread :
+_default=NimClient()
+
+def current() :
+    'Returns the client active in the current thread, or the default client'
+    stack=getattr( _local, 'clients', None )
+    if stack :
+        return stack[-1]
+    return _default
+
+
+#  Module Functions :
+#       Run through the current thread's client - see NimClient for details.
+
+def request( method='get', params=None, nimURL=None, apiKey=None, apiUser=None, timeout=None ) :
+    'Runs an API query without prompting - see NimClient.request()'
+    return current().request( method=method, params=params, nimURL=nimURL, apiKey=apiKey,
+        apiUser=apiUser, timeout=timeout )
+
+def get( params=None, **kwargs ) :
+    'Runs a GET query - see NimClient.request()'
+    return current().request( method='get', params=params, **kwargs )
+
+def post( params=None, **kwargs ) :
+    'Runs a POST query - see NimClient.request()'
+    return current().request( method='post', params=params, **kwargs )
+
+def upload( params=None, nimURL=None, apiKey=None, apiUser=None, timeout=None ) :
+    'Posts a query that includes files, without prompting - see NimClient.upload()'
+    return current().upload( params=params, nimURL=nimURL, apiKey=apiKey, apiUser=apiUser, timeout=timeout )
+
+def cached_get( params=None, ttl=None ) :
+    'Runs a shared, cached read-only query - see NimClient.cached_get()'
+    return current().cached_get( params=params, ttl=ttl )
+
+def cached_get_all( queries=None, ttl=None ) :
+    'Runs several read-only queries at the same time - see NimClient.cached_get_all()'
+    return current().cached_get_all( queries=queries, ttl=ttl )
+
+def clear_cache( **match ) :
+    'Clears cached query results from every client, after a change to the NIM database'
+    for client in list( _clients ) :
+        client.clear_cache( **match )
+    return
+
+
+#  End
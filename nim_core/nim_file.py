@@ -14,12 +14,20 @@
 
 
 #  General Imports :
-import os, platform, re, shutil, stat, traceback, time
+import errno, os, platform, re, socket, stat, traceback, time
+try :
+    from os import scandir as _scandir
+except ImportError :
+    try : from scandir import scandir as _scandir
+    except ImportError : _scandir=None
 #  NIM Imports :
 import nim_api as Api
+import nim_lazy as Lazy
+import nim_paths as Paths
 import nim_print as P
-import nim_win as Win
-import nim as Nim
+Publish=Lazy.module( 'nim_publish', __name__ )
+Win=Lazy.module( 'nim_win', __name__ )
+Nim=Lazy.module( 'nim', __name__ )
 
 
 #  Variables :
@@ -30,6 +38,22 @@ _os=platform.system().lower()
 ext_srch=re.compile( '\.[a-zA-Z0-9]+$' )
 end_srch=re.compile( '_[vV]?[0-9]+(_PUB)?\.[a-zA-Z0-9]+$' )
 num_srch=re.compile( '[0-9]+' )
+file_srch=re.compile( '^(?P<base>.+?)(?:_[vV](?P<ver>[0-9]+))?(?P<pub>_PUB)?(?P<ext>\.[a-zA-Z0-9]+)$' )
+#  Scene file extensions, by application :
+app_exts={
+    'Maya': ['.ma', '.mb'],
+    'Nuke': ['.nk', '.nknc'],
+    'C4D': ['.c4d'],
+    '3dsMax': ['.max'],
+    'Houdini': ['.hip']
+}
+#  Directory scan cache :
+dirCache_ttl=5.0
+_dirCache={}
+#  Seconds before an unreleased version reservation is treated as abandoned :
+reserve_ttl=3600.0
+#  Result of the application import probe - False until it has run :
+_app=False
 
 
 def get_user() :
@@ -48,6 +72,20 @@ def get_user() :
 def get_app() :
     'Gets the application by attempting various import statements'
     # TODO: Check if this function can be removed as redundant
+    global _app
+    #  Failed imports search the whole path, so only probe once per session :
+    if _app is False :
+        _app=_probe_app()
+    if _app is None :
+        try :
+            nim_app = os.environ.get('NIM_APP', '-1')
+            if nim_app == 'Flame':
+                return 'Flame'
+        except: pass
+    return _app
+
+def _probe_app() :
+    'Returns the application whose modules can be imported, or None'
     try :
         import maya.cmds as mc
         return 'Maya'
@@ -76,11 +114,6 @@ def get_app() :
         import cinesync
         return 'Cinesync'
     except: pass
-    try :
-        nim_app = os.environ.get('NIM_APP', '-1')
-        if nim_app == 'Flame':
-            return 'Flame'
-    except: pass
     return None
 
 def get_apps() :
@@ -200,94 +233,44 @@ def get_filePath() :
 
 def os_filePath( path='', nim=None, serverID=None ) :
     'Returns the platform specific path to a filepath.'
-    filePath, fp_noServer, server='', '', ''
+    fp_noServer=''
     
-    #P.info("os_filePath PATH: %s" % path)
     #  Error Checking :
     if not nim.ID('job') :
         P.warning('Unable to find a platform specific OS path')
         return path
 
     if not serverID :
-        serverDict=Api.get_serverInfo( nim.server(get='ID') )
-    else :
-        serverDict=Api.get_serverInfo( serverID )
-    #P.info("serverDict: %s" % serverDict)
-
-    if not serverDict or not len(serverDict) :
+        serverID=nim.server(get='ID')
+    #  Without a server ID there is no server to translate against - get_translator()
+    #  would load every server :
+    if not serverID :
         P.warning('Unable to find a platform specific OS path')
         return path
+    translator=Paths.get_translator( serverID=serverID )
     
-    if nim.server() :
-        fp_noServer=path[len(nim.server()):]
-
-    # The following removed - redundant
-    '''
-    if nim.tab()=='SHOT' :
-        serverDict=Api.get_jobServers( nim.ID('job') )
-    elif nim.tab()=='ASSET' :
-        serverDict=Api.get_jobServers( nim.ID('job') )
-    '''
-    
-    #if serverDict and len(serverDict)>0 :      # removed to only compare to single server  
-    if serverDict and len(serverDict)==1 :      # failed if more than one server found in serverDict
-
-        #  Substitute Windows Paths :
-        if serverDict[0]['winPath']:
-            #P.info('Reading Window Path...')
-            if re.search( '^'+serverDict[0]['winPath'], path ) :
-                fp_noServer=path[len(serverDict[0]['winPath']):]
-            elif re.search( '^'+serverDict[0]['winPath'], path.replace('\\', '/') ) :
-                fp_noServer=path[len(serverDict[0]['winPath']):]
-            elif re.search( '^'+serverDict[0]['winPath'], path.replace('/', '\\') ) :
-                fp_noServer=path[len(serverDict[0]['winPath']):]
-        
-        #  Substitute Mac paths :
-        if serverDict[0]['osxPath']:
-            #P.info('Reading OSX Path...')
-            if re.search( '^'+serverDict[0]['osxPath'], path ) :
-                fp_noServer=path[len(serverDict[0]['osxPath']):]
-            elif re.search( '^'+serverDict[0]['osxPath'], path.replace('\\', '/') ) :
-                fp_noServer=path[len(serverDict[0]['osxPath']):]
-            elif re.search( '^'+serverDict[0]['osxPath'], path.replace('/', '\\') ) :
-                fp_noServer=path[len(serverDict[0]['osxPath']):]
-        
-        #  Substitute Linux Paths :
-        if serverDict[0]['path']:
-            #P.info('Reading Linux Path...')
-            if re.search( '^'+serverDict[0]['path'], path ) :
-                fp_noServer=path[len(serverDict[0]['path']):]
-            elif re.search( '^'+serverDict[0]['path'], path.replace('\\', '/') ) :
-                fp_noServer=path[len(serverDict[0]['path']):]
-            elif re.search( '^'+serverDict[0]['path'], path.replace('/', '\\') ) :
-                fp_noServer=path[len(serverDict[0]['path']):]
-        
-        #  Store file path :
-        if _os.lower() in ['windows', 'win32'] :
-            server=serverDict[0]['winPath']
-            path=server+fp_noServer
-            filePath=path.replace('/', '\\')
-            return filePath
-        elif _os.lower() in ['darwin', 'mac'] :
-            server=serverDict[0]['osxPath']
-            path=server+fp_noServer
-            filePath=path.replace('\\', '/')
-            return filePath
-        elif _os.lower() in ['linux', 'linux2'] :
-            server=serverDict[0]['path']
-            path=server+fp_noServer
-            filePath=path.replace('\\', '/')
-            return filePath
-        else :
-            P.info( 'Operating system, %s, not in valid list of operating systems' %_os )
-            return False
-        
-        P.info( 'Filepath set to - %s' % filePath )
-    
-    else :
+    if not translator.servers :
+        P.warning('Unable to find a platform specific OS path')
+        return path
+    if len(translator.servers)!=1 :
+        #  Only convert against a single server :
         P.error('Unable to convert filepath by platform!')
         return False
     
+    osName=Paths.get_osName( _os )
+    if not osName :
+        P.info( 'Operating system, %s, not in valid list of operating systems' %_os )
+        return False
+    
+    #  Strip the server root, on whichever platform the path was written :
+    result=translator.match( path )
+    if result :
+        fp_noServer=result[2]
+    elif nim.server() :
+        fp_noServer=path[len(nim.server()):].lstrip('/\\')
+    
+    #  Store file path :
+    filePath=Paths.join_root( Paths.get_root( translator.servers[0], osName ), fp_noServer, osName )
     return filePath
 
 #DEPRICATED
@@ -306,84 +289,258 @@ def task_toAbbrev( task='' ) :
     '''
     return return_task
 
-def verUp( nim=None, padding=2, selected=False, win_launch=False, pub=False, symLink=True ) :
-    'Versions up a file - Does NOT add it to the NIM API'
+
+#  Directory Scanning :
+#===--------------------
+
+class DirIndex( object ) :
+    'Single pass index of the files in a directory, bucketed by basename, version and extension'
+
+    def __init__( self, fileDir='', mtime=None ) :
+        self.fileDir=fileDir
+        self.mtime=mtime
+        self.stamp=time.time()
+        self.files=[]
+        #  { basename : [ (fileName, version, isPub, ext), ... ] }
+        self.bases={}
+        return
+
+    def add( self, fileName='' ) :
+        'Adds a file name to the index'
+        self.files.append( fileName )
+        result=file_srch.match( fileName )
+        if not result :
+            return
+        ver=result.group('ver')
+        if ver is not None :
+            ver=int(ver)
+        entry=( fileName, ver, bool(result.group('pub')), result.group('ext') )
+        self.bases.setdefault( result.group('base'), [] ).append( entry )
+        return
+
+    def find( self, basename='', exts=None, versioned=None ) :
+        'Returns the file names matching a basename, optionally filtered by extension and versioning'
+        files=[]
+        for fileName, ver, isPub, ext in self.bases.get( basename, [] ) :
+            if exts and ext not in exts :
+                continue
+            if versioned is True and ver is None :
+                continue
+            if versioned is False and ver is not None :
+                continue
+            files.append( fileName )
+        return sorted( files )
+
+    def max_ver( self, basename='' ) :
+        'Returns the highest version number found on disk for a basename, or 0'
+        vers=[ver for fileName, ver, isPub, ext in self.bases.get( basename, [] ) if ver is not None]
+        if vers :
+            return max( vers )
+        return 0
+
+
+def _dir_mtime( fileDir='' ) :
+    'Returns the modification time of a directory, or None if it can\'t be read'
+    try :
+        return os.stat( fileDir ).st_mtime
+    except OSError :
+        return None
+
+def scan_dir( fileDir='', useCache=True ) :
+    'Indexes the files in a directory, re-using a recent scan if the directory hasn\'t changed'
+    if not fileDir :
+        return DirIndex()
+    fileDir=os.path.normpath( fileDir )
+    mtime=_dir_mtime( fileDir )
+    if mtime is None :
+        return DirIndex( fileDir=fileDir )
+
+    #  Re-use cached index :
+    if useCache and fileDir in _dirCache :
+        index=_dirCache[fileDir]
+        if index.mtime==mtime and time.time()-index.stamp < dirCache_ttl :
+            return index
+
+    #  Scan directory :
+    index=DirIndex( fileDir=fileDir, mtime=mtime )
+    try :
+        if _scandir is not None :
+            for entry in _scandir( fileDir ) :
+                try :
+                    if entry.is_file() :
+                        index.add( entry.name )
+                except OSError : pass
+        else :
+            for fileName in os.listdir( fileDir ) :
+                if os.path.isfile( os.path.join( fileDir, fileName ) ) :
+                    index.add( fileName )
+    except OSError :
+        P.debug( 'Unable to scan directory - %s' % fileDir )
+        return index
+
+    _dirCache[fileDir]=index
+    return index
+
+def clear_dirCache( fileDir='' ) :
+    'Clears the cached scan of a directory, or of all directories if none is given'
+    if fileDir :
+        _dirCache.pop( os.path.normpath( fileDir ), None )
+    else :
+        _dirCache.clear()
+    return
+
+def find_files( fileDir='', basename='', exts=None, versioned=None ) :
+    'Returns the file names in a directory that match a basename'
+    return scan_dir( fileDir ).find( basename=basename, exts=exts, versioned=versioned )
+
+def get_maxVer( fileDir='', basename='' ) :
+    'Returns the highest version of a basename saved in a directory, or 0'
+    return scan_dir( fileDir ).max_ver( basename=basename )
+
+
+def _reservePath( fileDir='', fileName='' ) :
+    'Returns the path of the lock file that reserves a file name'
+    return os.path.join( fileDir, '.nim_'+fileName+'.lock' )
+
+def _claim( lockPath='' ) :
+    'Atomically creates a reservation lock file, taking over abandoned ones - returns True if claimed'
+    for attempt in range(2) :
+        try :
+            fd=os.open( lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666 )
+        except OSError, e :
+            if e.errno!=errno.EEXIST :
+                P.debug( 'Unable to create reservation - %s' % lockPath )
+                return False
+            #  Take over reservations left behind by a crashed save :
+            try :
+                if time.time()-os.stat( lockPath ).st_mtime < reserve_ttl :
+                    return False
+                os.remove( lockPath )
+            except OSError :
+                return False
+            continue
+        #  Record the owner, for anyone inspecting a stuck reservation :
+        try :
+            os.write( fd, '%s@%s pid %s %s\n' % ( os.getenv('USER') or os.getenv('USERNAME') or '',
+                socket.gethostname(), os.getpid(), time.strftime('%Y-%m-%d %H:%M:%S') ) )
+        except OSError :
+            pass
+        finally :
+            os.close( fd )
+        return True
+    return False
+
+def reserve_ver( fileDir='', basename='', verNum=1, ext='', padding=2, attempts=100 ) :
+    '''
+    Reserves the first free version of a basename, at or above verNum.
+
+    A version is free when its file doesn't exist and no other save holds its lock file.
+    The lock file is created with O_EXCL next to the scene files, so concurrent saves from
+    different machines on the shared file system each get a different version.  Returns
+    ( verNum, lockPath ) - lockPath is None if the directory couldn't be written to, in
+    which case the version is unreserved.  Release it with release_ver() once saved.
+    '''
+    if not os.path.isdir( fileDir ) :
+        try :
+            og_umask=os.umask(0)
+            try : os.makedirs( fileDir )
+            finally : os.umask(og_umask)
+        except OSError :
+            if not os.path.isdir( fileDir ) :
+                P.warning( 'Unable to reserve a version - %s' % fileDir )
+                return verNum, None
+    
+    for attempt in range( attempts ) :
+        fileName='%s_v%s%s' % ( basename, str(verNum).zfill(int(padding)), ext )
+        filePath=os.path.join( fileDir, fileName )
+        if not os.path.exists( filePath ) :
+            lockPath=_reservePath( fileDir, fileName )
+            if _claim( lockPath ) :
+                #  Re-check, in case another save wrote and released this version meanwhile :
+                if not os.path.exists( filePath ) :
+                    P.debug( 'Reserved version %s - %s' % (verNum, fileName) )
+                    return verNum, lockPath
+                release_ver( lockPath )
+            elif not os.path.exists( lockPath ) and not os.path.exists( filePath ) :
+                #  Lock file couldn't be created, rather than being held by another save :
+                P.warning( 'Unable to reserve a version - %s' % fileDir )
+                return verNum, None
+        verNum +=1
+    
+    P.warning( 'Unable to reserve a version of %s after %s attempts' % (basename, attempts) )
+    return verNum, None
+
+def release_ver( lockPath='' ) :
+    'Removes a version reservation lock file'
+    if not lockPath :
+        return
+    try :
+        os.remove( lockPath )
+    except OSError :
+        pass
+    return
+
+
+def plan_verUp( nim=None, padding=2, pub=False ) :
+    '''
+    Works out the directories, version number and OS specific paths for a version up.
+
+    The API information is fetched in one concurrent round by nim_api.get_verUpContext(),
+    and the directory lookups that follow are answered from the query cache.  Returns a
+    dictionary of the planned values - "fileName" and "filePath" are empty if the file
+    directory or basename couldn't be derived.  When versioning up, the version is reserved
+    with reserve_ver() and "reservation" holds the lock file to release once saved.
+    '''
+    plan={'basename': '', 'fileDir': '', 'projDir': '', 'verNum': None, 'ext': '',
+        'fileName': '', 'filePath': '', 'renDir': '', 'compPath': '', 'context': {}, 'reservation': None}
+    cur_fileDir, fileDir, pathInfo='', '', None
     
-    #  Variables :
-    cur_filePath, cur_fileDir, cur_fileName='', '', ''
-    scenePath, assetName, shotName='', '', ''
-    server, fileBase, nimDir, fileDir, ext, verNum='', '', '', '', '', None
-    renDir, compPath='', ''
+    #  Basename :
+    nim.set_name( elem='base', name=Api.to_basename( nim=nim ) )
+    basename=nim.name('base')
+    plan['basename']=basename
     
-    #  Get current file information :
-    if not nim :
-        #  Initialize NIM dictionary :
-        nim=Nim.NIM()
-        nim.ingest_prefs()
-        if pub : nim.set_name( elem='filter', name='Published' )
-        else : nim.set_name( elem='filter', name='Work' )
+    #  API information :
+    context=Api.get_verUpContext( nim=nim, basename=basename )
+    plan['context']=context
     
-
-    #P.info("SERVER ID: %s" % str(nim.server(get='ID')))
     # Get Server OS Path from server ID
-    serverOsPathInfo = Api.get_serverOSPath( nim.server(get='ID'), platform.system() )
+    serverOsPathInfo=context.get('serverOSPath')
     P.info("Server OS Path: %s" % serverOsPathInfo)
-    serverOSPath = serverOsPathInfo[0]['serverOSPath']
-    nim.set_server( path=serverOSPath )
-
-
+    if serverOsPathInfo and type(serverOsPathInfo)==type(list()) :
+        nim.set_server( path=serverOsPathInfo[0]['serverOSPath'] )
+    
     #  Attempt to get current file information :
     if nim.filePath() :
-        cur_filePath=nim.filePath()
         cur_fileDir=nim.fileDir()
-        cur_fileName=nim.fileName()
-    
-    #  Basename :
-    nim.set_name( elem='base', name=Api.to_basename( nim=nim ) )
-    basename=nim.name('base')
     
     #  Directory to save to :
     api_fileDir=Api.to_fileDir( nim )
-    if api_fileDir and not cur_fileDir :
+    if api_fileDir :
         fileDir=api_fileDir
-    elif not api_fileDir and cur_fileDir :
+    elif cur_fileDir :
         fileDir=cur_fileDir
-    elif api_fileDir and cur_fileDir :
-        fileDir=api_fileDir
-   
+    
     #  Project Directory :
     if fileDir[-6:]=='scenes' : projDir=fileDir[:-6]
     else : projDir=fileDir
     
-    
     #  Convert file directory :
-    #P.info("fileDir: %s" % fileDir)
     fileDir=os_filePath( path=fileDir, nim=nim )
     P.info( 'File Directory = %s' %  fileDir )
     projDir=os_filePath( path=projDir, nim=nim )
     P.info( 'Project Directory = %s' %  projDir )
-    
+    plan['fileDir'], plan['projDir']=fileDir, projDir
     
     #  Version Number :
-    baseInfo=''
-    if nim.tab()=='SHOT' :
-        baseInfo=Api.get_baseVer( shotID=nim.ID('shot'), basename=nim.name('base') )
-    elif nim.tab()=='ASSET' :
-        baseInfo=Api.get_baseVer( assetID=nim.ID('asset'), basename=nim.name('base') )
+    baseInfo=context.get('baseVer')
     if baseInfo :
-        ver_baseInfo=baseInfo[0]['version']
-        verNum=int(ver_baseInfo)+1
+        verNum=int(baseInfo[0]['version'])+1
     else :
         verNum=1
-    try :
-        for f in [f for f in os.listdir(fileDir) if os.path.isfile(os.path.join(fileDir, f))] :
-            verSrch=re.search( basename+'_v[0-9]+', f )
-            if verSrch :
-                numSrch=re.search( '[0-9]+$', verSrch.group() )
-                if numSrch :
-                    if int(numSrch.group()) >verNum :
-                        verNum=int(numSrch.group())
-    except : pass
+    diskVer=get_maxVer( fileDir=fileDir, basename=basename )
+    if diskVer > verNum :
+        verNum=diskVer
     nim.set_version( version=str(verNum) )
     
     #  Set Extension :
@@ -391,304 +548,358 @@ def verUp( nim=None, padding=2, selected=False, win_launch=False, pub=False, sym
     if not ext :
         P.debug('Getting Extension')
         ext=get_ext()
-
     P.debug('Extension = %s' % ext)
+    plan['ext']=ext
     
-    #  Error Checking :
     if not fileDir or not basename :
-        msg='Sorry, you must either: Save the file from the NIM File GUI, or\n'+\
-            '    save the file in the appropriate folders, with the correct name.\n\n'+\
-            'File NOT saved.'
-        P.error( msg )
-        Win.popup( title='NIM - Version Up Error', msg=msg )
-        return False
+        plan['verNum']=verNum
+        return plan
     
     #  Construct new File Name :
     if not pub :
+        #  Claim the version, so concurrent saves don't write the same file :
+        verNum, plan['reservation']=reserve_ver( fileDir=fileDir, basename=basename, verNum=verNum,
+            ext=ext, padding=padding )
+        nim.set_version( version=str(verNum) )
         new_fileName='%s_v%s%s' % ( basename, str(verNum).zfill(int(padding)), ext )
-    elif pub :
+    else :
         verNum -=1
         new_fileName='%s_v%s_PUB%s' % ( basename, str(verNum).zfill(int(padding)), ext )
-    
+    plan['verNum'], plan['fileName']=verNum, new_fileName
     
     #  Construct new File Path :
     temp_filePath=os.path.normpath( os.path.join( fileDir, new_fileName ) )
-    new_filePath=os_filePath( path=temp_filePath, nim=nim )
-    
+    plan['filePath']=os_filePath( path=temp_filePath, nim=nim )
     
     #  Construct Render Directory :
-    if nim.tab()=='SHOT' and nim.ID('shot') :
-        pathInfo=Api.get( {'q': 'getPaths', 'type': 'shot', 'ID' : str(nim.ID('shot'))} )
-    elif nim.tab()=='ASSET' and nim.ID('asset') :
-        pathInfo=Api.get( {'q': 'getPaths', 'type': 'asset', 'ID' : str(nim.ID('asset'))} )
+    if nim.tab() in ['SHOT', 'ASSET'] :
+        pathInfo=context.get('paths')
     if pathInfo and type(pathInfo)==type(dict()) and 'renders' in pathInfo :
         renDir=os.path.normpath( os.path.join( nim.server(), pathInfo['renders'] ) )
     else :
         #  Use old method, if path information can't be derived :
         renDir=Api.to_renPath( nim )
-    renDir=os_filePath( path=renDir, nim=nim )
+    plan['renDir']=os_filePath( path=renDir, nim=nim )
     
     #  Comp Path :
+    compPath=''
     if pathInfo and type(pathInfo)==type(dict()) and 'comps' in pathInfo :
         compPath=os.path.normpath( os.path.join( nim.server(), pathInfo['comps'] ) )
         nim.set_compPath( compPath=compPath )
-    compPath=os_filePath( path=compPath, nim=nim )
-    
-    P.info( '\nVariables:' )
-    P.info( '  Initial File Path = %s' % cur_filePath )
-    P.info( '  Basename = %s' % basename )
-    P.info( '  Project Directory = %s' % projDir )
-    P.info( '  New File Path = %s' % new_filePath )
-    P.info( '  Render Directory = %s' % renDir )
-    P.info( '  Comp Directory = %s\n' % compPath )
-    
-    
-    #  Directories :
-    #===---------------
-    
-    #  Make basename directory :
-    if projDir and not os.path.isdir( projDir ) :
-        P.info( 'Creating basename directory within...\n    %s' % projDir )
-        og_umask=os.umask(0)
-        os.makedirs( projDir )
-        os.umask(og_umask)
-        if os.path.isdir( projDir ) :
-            P.info( '  Successfully created the basename directory!' )
-        else :
-            P.warning( '  Unable to create basename directory' )
+    plan['compPath']=os_filePath( path=compPath, nim=nim )
     
-    #  Make render directory :
-    if renDir and not os.path.isdir( renDir ) :
-        P.info( 'Creating render directory...\n      %s' % renDir )
-        
-        og_umask=os.umask(0)
-        os.makedirs( renDir )
-        os.umask(og_umask)
-        
-        if os.path.isdir( renDir ) :
-            P.info( '    Successfully created the render directory!' )
-        else :
-            P.warning( '    Unable to create project directories.' )
-    elif renDir :
-        P.debug( 'Render directory already exists.\n' )
-    
-    #  Make Maya Project directory :
-    if os.path.isdir( projDir ) and nim.app()=='Maya' :
-        import nim_maya as M
-        if M.makeProject( projectLocation=projDir, renderPath=renDir ) :
-            P.info( 'Created Maya project directorires within...\n    %s' % projDir )
-        else :
-            P.warning( '    Unable to create Maya project directories.' )
-    elif nim.app()=='Maya' :
-        P.warning( 'Didn\'t create Maya project directories.' )
-
-    #  Make 3dsMax Project directory :
-    if os.path.isdir( projDir ) and nim.app()=='3dsMax' :
-        import nim_3dsmax as Max
-        if Max.mk_proj( path=projDir, renPath=renDir ) :
-            P.info( 'Created 3dsMax project directorires within...\n    %s' % projDir )
-        else :
-            P.warning( '    Unable to create 3dsMax project directories.' )
-    elif nim.app()=='3dsMax' :
-        P.warning( 'Didn\'t create 3dsMax project directories.' )
-
-    #  Make Houdini Project directory :
-    if os.path.isdir( projDir ) and nim.app()=='Houdini' :
-        import nim_houdini as Houdini
-        if Houdini.mk_proj( path=projDir, renPath=renDir ) :
-            P.info( 'Created Houdini project directorires within...\n    %s' % projDir )
-        else :
-            P.warning( '    Unable to create Houdini project directories.' )
-    elif nim.app()=='Houdini' :
-        P.warning( 'Didn\'t create Houdini project directories.' )
+    return plan
+
+def publish_copy( filePath='', pubPath='' ) :
+    'Publishes a read-only copy of a file - as a reflink, hard link or verified copy, see nim_publish'
+    result=Publish.publish_file( filePath=filePath, pubPath=pubPath )
+    clear_dirCache( os.path.dirname( pubPath ) )
+    if not result :
+        return False
+    return pubPath
+
+
+def verUp( nim=None, padding=2, selected=False, win_launch=False, pub=False, symLink=True, copyPub=True ) :
+    '''
+    Versions up a file - Does NOT add it to the NIM API
+    When publishing without a sym-link, the published copy is left to the caller if copyPub is
+    False - its destination is returned as "pubPath".
+    '''
     
+    #  Variables :
+    cur_filePath, cur_fileDir, cur_fileName='', '', ''
+    scenePath, assetName, shotName='', '', ''
+    server, fileBase, nimDir, fileDir, ext, verNum='', '', '', '', '', None
+    renDir, compPath='', ''
     
-    #  Save :
-    #===------
-    P.info('APP = %s' % nim.app())
-
-    #  Maya :
-    if nim.app()=='Maya' :
-        import maya.cmds as mc
-        
-        #  Save File :
-        if not selected :
-            #  Set Vars :
-            import nim_maya as M
-            M.set_vars( nim=nim )
-            
-            P.info( 'Saving file as %s \n' % new_filePath )
-            mc.file(rename=new_filePath)
-            if ext=='.mb' :
-                mc.file( save=True, type='mayaBinary' )
-            elif ext=='.ma' :
-                mc.file( save=True, type='mayaAscii' )
-        else :
-            P.info( 'Saving selected items as %s \n' % new_filePath )
-            if ext=='.mb' :
-                mc.file( new_filePath, exportSelected=True, type='mayaBinary' )
-            elif ext=='.ma' :
-                mc.file( new_filePath, exportSelected=True, type='mayaAscii' )
+    #  Get current file information :
+    if not nim :
+        #  Initialize NIM dictionary :
+        nim=Nim.NIM()
+        nim.ingest_prefs()
+        if pub : nim.set_name( elem='filter', name='Published' )
+        else : nim.set_name( elem='filter', name='Work' )
     
-    #  Nuke :
-    elif nim.app()=='Nuke' :
-        
-        import nuke
-        
-        #  Save File :
-        if not selected :
-            #  Set Vars :
-            import nim_nuke as N
-            N.set_vars( nim=nim )
-            P.info( 'Saving file as %s \n' % new_filePath )
-            nuke.scriptSaveAs( new_filePath )
-        elif selected :
-            P.info( 'Saving selected items as %s \n' % new_filePath )
-            try :
-                nuke.nodeCopy( new_filePath )
-            except RuntimeError:
-                P.info( 'Failed to selected items... Possibly no items selected.' )
-                return False
 
+    #  Work out where, and as what version, to save :
+    plan=plan_verUp( nim=nim, padding=padding, pub=pub )
+    try :
+        basename, fileDir, projDir=plan['basename'], plan['fileDir'], plan['projDir']
+        verNum, ext=plan['verNum'], plan['ext']
+    
+        #  Error Checking :
+        if not fileDir or not basename :
+            msg='Sorry, you must either: Save the file from the NIM File GUI, or\n'+\
+                '    save the file in the appropriate folders, with the correct name.\n\n'+\
+                'File NOT saved.'
+            P.error( msg )
+            Win.popup( title='NIM - Version Up Error', msg=msg )
+            return False
     
-    #  Cinema 4D :
-    elif nim.app()=='C4D' :
-        import c4d
+        new_fileName, new_filePath=plan['fileName'], plan['filePath']
+        renDir, compPath=plan['renDir'], plan['compPath']
+        if nim.filePath() :
+            cur_filePath=nim.filePath()
+    
+        P.info( '\nVariables:' )
+        P.info( '  Initial File Path = %s' % cur_filePath )
+        P.info( '  Basename = %s' % basename )
+        P.info( '  Project Directory = %s' % projDir )
+        P.info( '  New File Path = %s' % new_filePath )
+        P.info( '  Render Directory = %s' % renDir )
+        P.info( '  Comp Directory = %s\n' % compPath )
+    
+    
+        #  Directories :
+        #===---------------
+    
+        #  Make basename directory :
+        if projDir and not os.path.isdir( projDir ) :
+            P.info( 'Creating basename directory within...\n    %s' % projDir )
+            og_umask=os.umask(0)
+            os.makedirs( projDir )
+            os.umask(og_umask)
+            if os.path.isdir( projDir ) :
+                P.info( '  Successfully created the basename directory!' )
+            else :
+                P.warning( '  Unable to create basename directory' )
+    
+        #  Make render directory :
+        if renDir and not os.path.isdir( renDir ) :
+            P.info( 'Creating render directory...\n      %s' % renDir )
         
-        #  Set Vars :
-        nim_plugin_ID=1032427
+            og_umask=os.umask(0)
+            os.makedirs( renDir )
+            os.umask(og_umask)
         
-        #  Save File :
-        if not selected :
-            P.info( 'Saving file as %s \n' % new_filePath )
-            import nim_c4d as C
-            C.set_vars( nim=nim, ID=nim_plugin_ID )
-            doc=c4d.documents.GetActiveDocument()
-            doc.SetDocumentName( new_fileName )
-            doc.SetDocumentPath( fileDir )
-            c4d.documents.SaveDocument( doc, str(new_filePath),
-                c4d.SAVEDOCUMENTFLAGS_DIALOGSALLOWED,
-                c4d.FORMAT_C4DEXPORT )
-            P.info( 'Saving File Complete')
-        #  Save Selected :
-        else :
-            P.info( 'Saving selected items as %s \n' % new_filePath )
-            doc=c4d.documents.GetActiveDocument()
-            sel=doc.GetActiveObjects( False )
-            baseDoc=c4d.documents.IsolateObjects(doc, sel)
-            c4d.documents.SaveDocument( baseDoc, str(new_filePath),
-                c4d.SAVEDOCUMENTFLAGS_DIALOGSALLOWED,
-                c4d.FORMAT_C4DEXPORT)
+            if os.path.isdir( renDir ) :
+                P.info( '    Successfully created the render directory!' )
+            else :
+                P.warning( '    Unable to create project directories.' )
+        elif renDir :
+            P.debug( 'Render directory already exists.\n' )
     
-    #  Hiero :
-    elif nim.app()=='Hiero' :
-        import hiero.core
-        projects=hiero.core.projects()
-        proj=projects[0]
-        curFilePath=proj.path()
-        proj.saveAs( new_filePath )
-        #proj=hiero.core.project( projName )
-        #proj=hiero.core.Project
-        #proj=self._get_current_project()
-    
-    #  3dsMax :
-    if nim.app()=='3dsMax' :
-        import MaxPlus
-        maxFM = MaxPlus.FileManager
-        #  Save File :
-        if not selected :
-            #  Set Vars :
+        #  Make Maya Project directory :
+        if os.path.isdir( projDir ) and nim.app()=='Maya' :
+            import nim_maya as M
+            if M.makeProject( projectLocation=projDir, renderPath=renDir ) :
+                P.info( 'Created Maya project directorires within...\n    %s' % projDir )
+            else :
+                P.warning( '    Unable to create Maya project directories.' )
+        elif nim.app()=='Maya' :
+            P.warning( 'Didn\'t create Maya project directories.' )
+
+        #  Make 3dsMax Project directory :
+        if os.path.isdir( projDir ) and nim.app()=='3dsMax' :
             import nim_3dsmax as Max
-            Max.set_vars( nim=nim )
-            #Save File
-            P.info( 'Saving file as %s \n' % new_filePath )
-            maxFM.Save(new_filePath)
-        else :
-            #Save Selected Items
-            P.info( 'Saving selected items as %s \n' % new_filePath )
-            maxFM.SaveSelected(new_filePath)
+            if Max.mk_proj( path=projDir, renPath=renDir ) :
+                P.info( 'Created 3dsMax project directorires within...\n    %s' % projDir )
+            else :
+                P.warning( '    Unable to create 3dsMax project directories.' )
+        elif nim.app()=='3dsMax' :
+            P.warning( 'Didn\'t create 3dsMax project directories.' )
 
-    #  Houdini :
-    if nim.app()=='Houdini' :
-        import hou
-        #  Save File :
-        if not selected :
-            #  Set Vars :
+        #  Make Houdini Project directory :
+        if os.path.isdir( projDir ) and nim.app()=='Houdini' :
             import nim_houdini as Houdini
-            Houdini.set_vars( nim=nim )
+            if Houdini.mk_proj( path=projDir, renPath=renDir ) :
+                P.info( 'Created Houdini project directorires within...\n    %s' % projDir )
+            else :
+                P.warning( '    Unable to create Houdini project directories.' )
+        elif nim.app()=='Houdini' :
+            P.warning( 'Didn\'t create Houdini project directories.' )
+    
+    
+        #  Save :
+        #===------
+        P.info('APP = %s' % nim.app())
 
-            #Save File
-            if _os.lower() in ['windows', 'win32'] :
-                new_filePath = new_filePath.replace('\\','/')
+        #  Maya :
+        if nim.app()=='Maya' :
+            import maya.cmds as mc
+        
+            #  Save File :
+            if not selected :
+                #  Set Vars :
+                import nim_maya as M
+                M.set_vars( nim=nim )
             
-            P.info( 'Saving file as %s \n' % new_filePath )
-            try :
-                hou.hipFile.save(file_name=str(new_filePath))
-                P.info('Houdini successfully save the file.')
-            except hou.OperationFailed :
-                P.info('Houdini failed to save the file.' )
-                P.info( hou.OperationFailed.description() )
-
-            #Set $HIP var to location of current file
-            if _os.lower() in ['windows', 'win32'] :
-                projDir = projDir.replace('\\','/')
+                P.info( 'Saving file as %s \n' % new_filePath )
+                mc.file(rename=new_filePath)
+                if ext=='.mb' :
+                    mc.file( save=True, type='mayaBinary' )
+                elif ext=='.ma' :
+                    mc.file( save=True, type='mayaAscii' )
+            else :
+                P.info( 'Saving selected items as %s \n' % new_filePath )
+                if ext=='.mb' :
+                    mc.file( new_filePath, exportSelected=True, type='mayaBinary' )
+                elif ext=='.ma' :
+                    mc.file( new_filePath, exportSelected=True, type='mayaAscii' )
+    
+        #  Nuke :
+        elif nim.app()=='Nuke' :
+        
+            import nuke
+        
+            #  Save File :
+            if not selected :
+                #  Set Vars :
+                import nim_nuke as N
+                N.set_vars( nim=nim )
+                P.info( 'Saving file as %s \n' % new_filePath )
+                nuke.scriptSaveAs( new_filePath )
+            elif selected :
+                P.info( 'Saving selected items as %s \n' % new_filePath )
+                try :
+                    nuke.nodeCopy( new_filePath )
+                except RuntimeError:
+                    P.info( 'Failed to selected items... Possibly no items selected.' )
+                    return False
+
+    
+        #  Cinema 4D :
+        elif nim.app()=='C4D' :
+            import c4d
+        
+            #  Set Vars :
+            nim_plugin_ID=1032427
+        
+            #  Save File :
+            if not selected :
+                P.info( 'Saving file as %s \n' % new_filePath )
+                import nim_c4d as C
+                C.set_vars( nim=nim, ID=nim_plugin_ID )
+                doc=c4d.documents.GetActiveDocument()
+                doc.SetDocumentName( new_fileName )
+                doc.SetDocumentPath( fileDir )
+                c4d.documents.SaveDocument( doc, str(new_filePath),
+                    c4d.SAVEDOCUMENTFLAGS_DIALOGSALLOWED,
+                    c4d.FORMAT_C4DEXPORT )
+                P.info( 'Saving File Complete')
+            #  Save Selected :
+            else :
+                P.info( 'Saving selected items as %s \n' % new_filePath )
+                doc=c4d.documents.GetActiveDocument()
+                sel=doc.GetActiveObjects( False )
+                baseDoc=c4d.documents.IsolateObjects(doc, sel)
+                c4d.documents.SaveDocument( baseDoc, str(new_filePath),
+                    c4d.SAVEDOCUMENTFLAGS_DIALOGSALLOWED,
+                    c4d.FORMAT_C4DEXPORT)
+    
+        #  Hiero :
+        elif nim.app()=='Hiero' :
+            import hiero.core
+            projects=hiero.core.projects()
+            proj=projects[0]
+            curFilePath=proj.path()
+            proj.saveAs( new_filePath )
+            #proj=hiero.core.project( projName )
+            #proj=hiero.core.Project
+            #proj=self._get_current_project()
+    
+        #  3dsMax :
+        if nim.app()=='3dsMax' :
+            import MaxPlus
+            maxFM = MaxPlus.FileManager
+            #  Save File :
+            if not selected :
+                #  Set Vars :
+                import nim_3dsmax as Max
+                Max.set_vars( nim=nim )
+                #Save File
+                P.info( 'Saving file as %s \n' % new_filePath )
+                maxFM.Save(new_filePath)
+            else :
+                #Save Selected Items
+                P.info( 'Saving selected items as %s \n' % new_filePath )
+                maxFM.SaveSelected(new_filePath)
+
+        #  Houdini :
+        if nim.app()=='Houdini' :
+            import hou
+            #  Save File :
+            if not selected :
+                #  Set Vars :
+                import nim_houdini as Houdini
+                Houdini.set_vars( nim=nim )
+
+                #Save File
+                if _os.lower() in ['windows', 'win32'] :
+                    new_filePath = new_filePath.replace('\\','/')
+            
+                P.info( 'Saving file as %s \n' % new_filePath )
+                try :
+                    hou.hipFile.save(file_name=str(new_filePath))
+                    P.info('Houdini successfully save the file.')
+                except hou.OperationFailed :
+                    P.info('Houdini failed to save the file.' )
+                    P.info( hou.OperationFailed.description() )
+                    return False
+
+                #Set $HIP var to location of current file
+                if _os.lower() in ['windows', 'win32'] :
+                    projDir = projDir.replace('\\','/')
             
-            hou.hscript("set -g HIP = '" + str(projDir) + "'")
+                hou.hscript("set -g HIP = '" + str(projDir) + "'")
 
-            #Set $HIPNAME var to current file
-            hipName = os.path.splitext(new_fileName)[0]
-            hou.hscript("set -g HIPNAME = '" + str(hipName) + "'")
+                #Set $HIPNAME var to current file
+                hipName = os.path.splitext(new_fileName)[0]
+                hou.hscript("set -g HIPNAME = '" + str(hipName) + "'")
 
-        else :
-            #Save Selected Items
-            if _os.lower() in ['windows', 'win32'] :
-                new_filePath = new_filePath.replace('\\','/')
-            P.info( 'Saving selected items as %s \n' % new_filePath )
+            else :
+                #Save Selected Items
+                if _os.lower() in ['windows', 'win32'] :
+                    new_filePath = new_filePath.replace('\\','/')
+                P.info( 'Saving selected items as %s \n' % new_filePath )
            
-            try :
-                tmp_filePath = new_filePath+"."+time.strftime('%Y%m%d_%H%M%S')+".tmp"
-                parentNode = "hou.node('/obj/')"
-                selected = hou.selectedNodes()
-                selectedParent = selected[0].parent()
-                selectedParent.saveItemsToFile(selected, file_name=str(tmp_filePath))
-                P.info('Houdini saved items to file.' )
-            except hou.OperationFailed :
-                P.info('Houdini failed to save selected items to file.' )
-                P.info( hou.OperationFailed.description() )
-
-            saveCode = '"' + "import os, time; newParent = "+parentNode+"; newParent.loadChildrenFromFile('"+tmp_filePath+"'); hou.hipFile.save('"+new_filePath+"')" + '"'
-            pyCmd = os.environ["HFS"] + '/bin/hython -c ' + saveCode
+                try :
+                    tmp_filePath = new_filePath+"."+time.strftime('%Y%m%d_%H%M%S')+".tmp"
+                    parentNode = "hou.node('/obj/')"
+                    selected = hou.selectedNodes()
+                    selectedParent = selected[0].parent()
+                    selectedParent.saveItemsToFile(selected, file_name=str(tmp_filePath))
+                    P.info('Houdini saved items to file.' )
+                except hou.OperationFailed :
+                    P.info('Houdini failed to save selected items to file.' )
+                    P.info( hou.OperationFailed.description() )
+                    return False
+
+                saveCode = '"' + "import os, time; newParent = "+parentNode+"; newParent.loadChildrenFromFile('"+tmp_filePath+"'); hou.hipFile.save('"+new_filePath+"')" + '"'
+                pyCmd = os.environ["HFS"] + '/bin/hython -c ' + saveCode
+
+                try :
+                    os.system(pyCmd)
+                except :
+                    P.info('Failed to run hython for external Houini save.')
+
+                try:
+                    os.remove(tmp_filePath)
+                except OSError:
+                    pass
+
+
+        #  Make a copy of the file, if publishing :
+        pub_filePath=''
+        if pub and not symLink :
+            pub_fileName=basename+ext
+            pub_fileDir=Api.to_nimDir( nim=nim )
+            pub_filePath=os.path.join( pub_fileDir, pub_fileName )
+            if copyPub :
+                publish_copy( filePath=new_filePath, pubPath=pub_filePath )
+    finally :
+        #  The saved file now holds the version - or the save failed, and the version is free again :
+        release_ver( plan['reservation'] )
+    
+    #  Directory contents have changed :
+    clear_dirCache( fileDir )
 
-            try :
-                os.system(pyCmd)
-            except :
-                P.info('Failed to run hython for external Houini save.')
-
-            try:
-                os.remove(tmp_filePath)
-            except OSError:
-                pass
-
-
-    #  Make a copy of the file, if publishing :
-    if pub and not symLink :
-        pub_fileName=basename+ext
-        pub_fileDir=Api.to_nimDir( nim=nim )
-        pub_filePath=os.path.join( pub_fileDir, pub_fileName )
-        #  Delete any pre-existing published file :
-        if os.path.isfile( pub_filePath ) :
-            os.chmod( pub_filePath, stat.S_IWRITE )
-            os.remove( pub_filePath )
-        #  Copy file and make it read-only :
-        shutil.copyfile( new_filePath, pub_filePath )
-        os.chmod( pub_filePath, stat.S_IREAD )
-        
     #  Print save success :
     P.info( '\nFile successfully saved to...\n    %s\n' % new_filePath )
     
     #  [AS]  returning nim object with current dictionary settings
     #return new_filePath
-    return {'filepath':new_filePath,'nim':nim}
+    return {'filepath':new_filePath,'nim':nim,'plan':plan,'pubPath':pub_filePath}
     #  [AS]  END
 
 
@@ -712,6 +923,8 @@ def scripts_reload() :
         #  App specific modules :
         app=get_app()
         try :
+            import nim_thumbs as Thumbs
+            reload(Thumbs)
             import UI as UI
             reload(UI)
         except : pass
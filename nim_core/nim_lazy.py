@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_lazy.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import sys
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+
+
+class LazyModule( object ) :
+    '''
+    Stands in for a module, importing it the first time one of its attributes is used.
+
+    Used for the GUI and application modules, like nim_win and nim_tools, so scripts that
+    only talk to the NIM API - render farm tasks, for instance - don't import Qt.
+    '''
+
+    def __init__( self, name='' ) :
+        self.__dict__['_name']=name
+        self.__dict__['_module']=None
+        return
+
+    def _load(self) :
+        'Imports the module, if it hasn\'t been imported yet, and returns it'
+        module=self.__dict__['_module']
+        if module is None :
+            name=self.__dict__['_name']
+            __import__( name )
+            module=sys.modules[name]
+            self.__dict__['_module']=module
+        return module
+
+    def __getattr__( self, attr ) :
+        return getattr( self._load(), attr )
+
+    def __setattr__( self, attr, value ) :
+        setattr( self._load(), attr, value )
+        return
+
+    def __repr__(self) :
+        if self.__dict__['_module'] is None :
+            return '<lazy module %r>' % self.__dict__['_name']
+        return repr( self.__dict__['_module'] )
+
+
+def module( name='', caller='' ) :
+    '''
+    Returns a lazily imported module.  Pass the importing module's __name__ as "caller" and
+    the module is looked for in the same package - the way "import nim_win" does inside nim_core.
+    '''
+    package=caller.rpartition( '.' )[0]
+    if package :
+        name=package+'.'+name
+    return LazyModule( name )
+
+
+#  End
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_paths.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import os, platform, threading, time
+
+#  NIM Imports :
+import nim_api as Api
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+_os=platform.system().lower()
+#  Seconds before a server table is fetched again :
+translator_ttl=600.0
+_translators={}
+_translatorLock=threading.Lock()
+#  Server record keys for each platform, and whether paths compare case sensitively :
+platforms=[ ('win', 'winPath', False), ('osx', 'osxPath', False), ('linux', 'path', True) ]
+
+
+def get_osName( osName='' ) :
+    'Returns the NIM platform name ( win / osx / linux ) for an operating system name'
+    if not osName :
+        osName=_os
+    osName=osName.lower()
+    if osName in ['windows', 'win32', 'win'] :
+        return 'win'
+    elif osName in ['darwin', 'mac', 'osx'] :
+        return 'osx'
+    elif osName in ['linux', 'linux2'] :
+        return 'linux'
+    return None
+
+def get_root( server=None, osName='' ) :
+    'Returns a server record\'s root path for the given, or current, OS'
+    osName=get_osName( osName )
+    for name, key, caseSensitive in platforms :
+        if name==osName :
+            return server.get( key )
+    return None
+
+def _segments( path='' ) :
+    'Splits a path into its components, treating both slash types the same'
+    return path.replace( '\\', '/' ).rstrip( '/' ).split( '/' )
+
+
+class PathTranslator( object ) :
+    '''
+    Translates paths between the Windows, OSX and Linux roots of a set of NIM servers.
+
+    Server roots are stored in prefix tries keyed by path component - one for the
+    case sensitive Linux roots, and one for the case insensitive Windows and OSX
+    roots - so finding the server for a path costs one walk down its components,
+    regardless of how many servers there are.  The longest matching root wins.
+    '''
+
+    def __init__( self, servers=None ) :
+        self.servers=[]
+        self._trie={}
+        self._trieNoCase={}
+        for server in servers or [] :
+            self.add_server( server )
+        return
+
+    def add_server( self, server=None ) :
+        'Adds a server record, with "winPath", "osxPath" and "path" keys, to the tries'
+        if not server or not isinstance( server, dict ) :
+            return
+        self.servers.append( server )
+        for platformName, key, caseSensitive in platforms :
+            root=server.get( key )
+            if not root :
+                continue
+            segments=_segments( root )
+            if caseSensitive :
+                node=self._trie
+            else :
+                node=self._trieNoCase
+                segments=[seg.lower() for seg in segments]
+            for seg in segments :
+                node=node.setdefault( seg, {} )
+            #  The first server registered for a root keeps it :
+            node.setdefault( None, (server, platformName) )
+        return
+
+    def _walk( self, trie=None, segments=None ) :
+        'Returns the deepest terminal found along the path components, and its depth'
+        node, found, depth=trie, None, 0
+        for index, seg in enumerate( segments ) :
+            node=node.get( seg )
+            if node is None :
+                break
+            if None in node :
+                found, depth=node[None], index+1
+        return found, depth
+
+    def match( self, path='' ) :
+        'Returns ( server, platform, tail ) for the server root a path starts with, or None'
+        if not path :
+            return None
+        segments=_segments( path )
+        found, depth=self._walk( self._trie, segments )
+        foundNoCase, depthNoCase=self._walk( self._trieNoCase, [seg.lower() for seg in segments] )
+        if foundNoCase and depthNoCase > depth :
+            found, depth=foundNoCase, depthNoCase
+        if not found :
+            return None
+        return ( found[0], found[1], '/'.join( segments[depth:] ) )
+
+    def translate( self, path='', osName='' ) :
+        'Returns a path rooted on the matching server\'s root for the given OS, or the path unchanged'
+        osName=get_osName( osName )
+        result=self.match( path )
+        if not result or not osName :
+            return path
+        server, platformName, tail=result
+        root=get_root( server, osName )
+        if not root :
+            return path
+        return join_root( root, tail, osName )
+
+    def translate_paths( self, paths=None, osName='' ) :
+        'Translates a list of paths, resolving each distinct directory once'
+        osName=get_osName( osName )
+        translated, dirs=[], {}
+        for path in paths or [] :
+            if not path :
+                translated.append( path )
+                continue
+            head, tail=os.path.split( path.replace( '\\', '/' ) )
+            if head not in dirs :
+                result=self.match( head )
+                matched=bool( result and get_root( result[0], osName ) )
+                dirs[head]=( matched, self.translate( head, osName=osName ) )
+            matched, headPath=dirs[head]
+            if matched :
+                translated.append( join_root( headPath, tail, osName ) )
+            else :
+                translated.append( self.translate( path, osName=osName ) )
+        return translated
+
+
+def join_root( root='', tail='', osName='' ) :
+    'Joins a server root and a relative path using the separator for the given OS'
+    if tail :
+        path=root.rstrip( '/\\' )+'/'+tail
+    else :
+        path=root
+    if osName=='win' :
+        return path.replace( '/', '\\' )
+    return path.replace( '\\', '/' )
+
+
+def get_translator( serverID=None ) :
+    'Returns a translator for a single server, or for all servers if no ID is given'
+    key=str(serverID) if serverID else ''
+    with _translatorLock :
+        cached=_translators.get( key )
+        if cached and time.time()-cached[0] < translator_ttl :
+            return cached[1]
+    if serverID :
+        servers=Api.get_serverInfo( serverID )
+    else :
+        servers=Api.get_allServers()
+    if not servers or not isinstance( servers, list ) :
+        P.warning( 'Unable to retrieve the NIM server list' )
+        return PathTranslator()
+    translator=PathTranslator( servers=servers )
+    with _translatorLock :
+        _translators[key]=( time.time(), translator )
+    return translator
+
+def clear() :
+    'Drops the cached server tables'
+    with _translatorLock :
+        _translators.clear()
+    return
+
+def translate( path='', serverID=None, osName='' ) :
+    'Translates a path to the current, or given, OS'
+    return get_translator( serverID=serverID ).translate( path, osName=osName )
+
+def translate_paths( paths=None, serverID=None, osName='' ) :
+    'Translates a list of paths to the current, or given, OS'
+    return get_translator( serverID=serverID ).translate_paths( paths, osName=osName )
+
+
+#  End
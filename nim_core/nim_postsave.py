@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_postsave.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import errno, json, os, socket, tempfile, threading, time, traceback, uuid
+
+#  NIM Imports :
+import nim_api as Api
+import nim_client as Client
+import nim_file as F
+import nim_prefs as Prefs
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+jobs_dirName='postsave'
+#  Seconds to wait before each retry of a failed stage - the last delay repeats :
+retry_delays=[5, 30, 120, 300]
+max_attempts=20
+#  Seconds after which a job journal that nobody is updating is adopted by another session :
+orphan_age=900.0
+#  Seconds between touches of the journals a session is still running, so they aren't adopted :
+heartbeat_interval=orphan_age/5
+#  Stages run for each saved file, in order :
+stages=['register', 'resolve', 'publish']
+_queue=None
+_queueLock=threading.Lock()
+
+
+def get_dir() :
+    'Returns the directory that post-save job journals are kept in'
+    return os.path.join( Prefs.get_home(), jobs_dirName )
+
+
+def mk_job( nim=None, filePath='', pub=False, symLink=True, pubPath='' ) :
+    '''
+    Builds a post-save job for a saved scene file - call from the application's main thread,
+    as this may prompt for a comment.  Returns False if the file can't be added to NIM.
+    '''
+    query=Api.get_addFileQuery( nim=nim, filePath=filePath, comment=nim.name( 'comment' ), pub=pub )
+    if not query :
+        return False
+    job={'ID': uuid.uuid4().hex, 'created': time.time(), 'filePath': filePath, 'pub': bool(pub),
+        'symLink': bool(symLink), 'pubPath': pubPath or '', 'addFile': query['addFile'],
+        'clearPub': query['clearPub'], 'fileID': None, 'done': [], 'attempts': 0, 'next': 0}
+    if nim.tab()=='SHOT' :
+        job['verQuery']={'shotID': nim.ID( 'shot' ), 'basename': query['addFile']['basename']}
+    else :
+        job['verQuery']={'assetID': nim.ID( 'asset' ), 'basename': query['addFile']['basename']}
+    return job
+
+
+def _failed( result=None ) :
+    'Returns True if the result of an addFile query says the file wasn\'t added'
+    if isinstance( result, list ) and len(result)==1 :
+        result=result[0]
+    if result is None or result is False :
+        return True
+    if isinstance( result, dict ) :
+        return str(result.get( 'success', 'true' )).lower()=='false' or bool( result.get( 'error' ) )
+    return False
+
+
+#  Stages :
+#       Each stage is passed the job, may store results on it, and returns True once done.
+#       A stage that returns False, or raises, is retried later from the same stage.
+
+def _register( job=None ) :
+    'Adds the file to the NIM database'
+    if job['clearPub'] :
+        Api.clear_pubFlags( **job['clearPub'] )
+    result=Api.get( job['addFile'] )
+    #  addFile isn't idempotent - it is only sent again if the server reported a failure :
+    if _failed( result ) :
+        P.error( 'Problem writing %s to the NIM database - will retry.' % job['addFile']['filename'] )
+        return False
+    job['fileID']=Api.get_fileID( result )
+    P.info( 'NIM API updated with new file.' )
+    if job['fileID'] :
+        P.info( '      File ID = %s' % job['fileID'] )
+    return True
+
+def _resolve( job=None ) :
+    'Makes sure the file ID of a published file is known, for the sym-link'
+    if not job['pub'] or not job['symLink'] or job['fileID'] :
+        return True
+    #  The addFile result had no ID - look the file up instead :
+    verQuery=job['verQuery']
+    if 'shotID' in verQuery :
+        parent, parentID='shot', verQuery['shotID']
+    else :
+        parent, parentID='asset', verQuery['assetID']
+    job['fileID']=Api.find_fileID( parent=parent, parentID=parentID, filePath=job['filePath'],
+        basename=verQuery['basename'], pub=True )
+    if not job['fileID'] :
+        P.error( 'Sorry!  Problem retrieving File ID.' )
+        return False
+    P.info( 'File ID = %s' % job['fileID'] )
+    return True
+
+def _publish( job=None ) :
+    'Publishes the sym-link, or copies the published file'
+    if not job['pub'] :
+        return True
+    if job['symLink'] :
+        P.info( 'Publishing Sym-Link...' )
+        result=Api.get( {'q': 'publishSymlink', 'fileID': str(job['fileID'])} )
+        if not result :
+            return False
+        P.info( '    Sym-Link Published!' )
+    elif job['pubPath'] :
+        return bool( F.publish_copy( filePath=job['filePath'], pubPath=job['pubPath'] ) )
+    return True
+
+stage_funcs={'register': _register, 'resolve': _resolve, 'publish': _publish}
+
+
+def run_job( job=None, onStage=None ) :
+    '''
+    Runs the remaining stages of a job in the calling thread - returns True once all are done.
+    onStage is called with the job after each stage completes.
+    '''
+    for stage in stages :
+        if stage in job['done'] :
+            continue
+        try :
+            success=stage_funcs[stage]( job )
+        except Client.NimError, e :
+            P.error( 'Post-save stage "%s" failed for %s - %s' % (stage, job['filePath'], e) )
+            success=False
+        except Exception :
+            P.error( 'Post-save stage "%s" failed for %s\n%s' % (stage, job['filePath'], traceback.format_exc()) )
+            success=False
+        if not success :
+            return False
+        job['done'].append( stage )
+        if onStage :
+            onStage( job )
+    return True
+
+
+class PostSaveQueue( object ) :
+    '''
+    Runs post-save jobs, in the order they were saved, on a background thread.
+
+    Every job is journalled to a JSON file in the NIM home directory before it is queued,
+    and the journal is updated after each stage, so a job interrupted by a network outage,
+    or by the application closing, is retried - in this session after a back-off, or by
+    the next NIM session to start, from the stage it had reached.
+    '''
+
+    def __init__( self, jobDir='' ) :
+        self.jobDir=jobDir or get_dir()
+        self._jobs=[]
+        self._cond=threading.Condition()
+        self._thread=None
+        self._heartbeat=None
+        #  Jobs that ran out of retries, until the user is told about them :
+        self._failed=[]
+        return
+
+    def submit( self, job=None ) :
+        'Journals and queues a job'
+        job['owner']=_owner()
+        self._save( job )
+        with self._cond :
+            self._jobs.append( job )
+            self._start()
+            self._cond.notify()
+        return job['ID']
+
+    def resume(self) :
+        'Adopts journalled jobs left behind by sessions that have stopped running them'
+        if not os.path.isdir( self.jobDir ) :
+            return 0
+        adopted=[]
+        for fileName in sorted( os.listdir( self.jobDir ) ) :
+            if not fileName.endswith( '.json' ) :
+                continue
+            jobPath=os.path.join( self.jobDir, fileName )
+            try :
+                if time.time()-os.stat( jobPath ).st_mtime < orphan_age :
+                    continue
+                if _ownerAlive( jobPath ) :
+                    continue
+                #  Claim the journal - only one session can rename it :
+                claimPath='%s.%s.claim' % ( jobPath, os.getpid() )
+                os.rename( jobPath, claimPath )
+            except OSError :
+                continue
+            try :
+                with open( claimPath ) as jobFile :
+                    job=json.load( jobFile )
+            except (IOError, ValueError) :
+                P.error( 'Unable to read post-save job - %s' % claimPath )
+                continue
+            job['owner'], job['next']=_owner(), 0
+            self._save( job )
+            os.remove( claimPath )
+            adopted.append( job )
+        if adopted :
+            P.info( 'Resuming %s unfinished post-save job(s)' % len(adopted) )
+            adopted.sort( key=lambda job : job['created'] )
+            with self._cond :
+                self._jobs.extend( adopted )
+                self._start()
+                self._cond.notify()
+        return len(adopted)
+
+    def pending(self) :
+        'Returns the number of jobs that haven\'t finished'
+        with self._cond :
+            return len(self._jobs)
+
+    def wait( self, timeout=None ) :
+        'Blocks until every queued job has finished or failed, or the timeout expires'
+        end=None if timeout is None else time.time()+timeout
+        with self._cond :
+            while self._jobs :
+                remaining=None if end is None else end-time.time()
+                if remaining is not None and remaining <= 0 :
+                    return False
+                self._cond.wait( remaining if remaining is not None else 1.0 )
+        return True
+
+    def failed(self) :
+        'Returns the file paths of jobs that ran out of retries since the last call, and forgets them'
+        with self._cond :
+            failed, self._failed=self._failed, []
+        return failed
+
+    def _start(self) :
+        'Starts the worker and heartbeat threads, if they aren\'t running - call with the condition held'
+        if self._thread is None or not self._thread.is_alive() :
+            self._thread=threading.Thread( target=self._run, name='NIM_PostSave' )
+            self._thread.daemon=True
+            self._thread.start()
+        if self._heartbeat is None or not self._heartbeat.is_alive() :
+            self._heartbeat=threading.Thread( target=self._beat, name='NIM_PostSaveHeartbeat' )
+            self._heartbeat.daemon=True
+            self._heartbeat.start()
+        return
+
+    def _beat(self) :
+        'Heartbeat loop - keeps the journals of queued and running jobs fresh, however long a stage takes'
+        while True :
+            time.sleep( heartbeat_interval )
+            with self._cond :
+                jobs=list( self._jobs )
+            for job in jobs :
+                self._touch( job )
+
+    def _run(self) :
+        'Worker loop - runs the oldest job, backing off while it fails'
+        while True :
+            with self._cond :
+                while not self._jobs :
+                    self._cond.wait()
+                job=self._jobs[0]
+                delay=job['next']-time.time()
+                if delay > 0 :
+                    self._cond.wait( delay )
+                    continue
+
+            #  Never prompt from the worker thread - failed stages are retried instead :
+            with Client.headless() :
+                finished=run_job( job, onStage=self._save )
+
+            with self._cond :
+                if finished :
+                    self._jobs.remove( job )
+                    self._remove( job )
+                    P.info( 'Post-save steps complete - %s' % job['filePath'] )
+                else :
+                    job['attempts'] +=1
+                    if job['attempts'] >= max_attempts :
+                        self._jobs.remove( job )
+                        self._fail( job )
+                    else :
+                        job['next']=time.time()+retry_delays[ min( job['attempts'], len(retry_delays) )-1 ]
+                        self._save( job )
+                self._cond.notify_all()
+
+    def _path( self, job=None ) :
+        return os.path.join( self.jobDir, job['ID']+'.json' )
+
+    def _save( self, job=None ) :
+        'Atomically writes a job journal'
+        try :
+            if not os.path.isdir( self.jobDir ) :
+                os.makedirs( self.jobDir )
+            fd, tmpPath=tempfile.mkstemp( prefix='.'+job['ID']+'.', dir=self.jobDir )
+            try :
+                os.write( fd, json.dumps( job ) )
+            finally :
+                os.close( fd )
+            jobPath=self._path( job )
+            try :
+                os.rename( tmpPath, jobPath )
+            except OSError :
+                #  Windows won't rename over an existing file :
+                os.remove( jobPath )
+                os.rename( tmpPath, jobPath )
+        except (IOError, OSError) :
+            P.warning( 'Unable to journal post-save job for %s' % job['filePath'] )
+        return
+
+    def _touch( self, job=None ) :
+        try : os.utime( self._path( job ), None )
+        except OSError : pass
+        return
+
+    def _remove( self, job=None ) :
+        try : os.remove( self._path( job ) )
+        except OSError : pass
+        return
+
+    def _fail( self, job=None ) :
+        'Keeps the journal of a job that ran out of retries, for someone to look at'
+        P.error( 'Giving up on post-save steps for %s after %s attempts.' % (job['filePath'], job['attempts']) )
+        P.error( '    Job kept in %s' % self._path( job )+'.failed' )
+        try : os.rename( self._path( job ), self._path( job )+'.failed' )
+        except OSError : pass
+        #  Reported to the user, from the main thread, by the next version up :
+        self._failed.append( job['filePath'] )
+        return
+
+
+def _owner() :
+    'Identifies this session in job journals'
+    return '%s:%s' % ( socket.gethostname(), os.getpid() )
+
+def _ownerAlive( jobPath='' ) :
+    'Returns True if the journal belongs to a session on this machine that is still running'
+    try :
+        with open( jobPath ) as jobFile :
+            hostname, pid=json.load( jobFile ).get( 'owner', '' ).rsplit( ':', 1 )
+        pid=int(pid)
+    except (IOError, ValueError, AttributeError) :
+        return False
+    #  Sessions on other machines can't be checked - their journals are judged by age alone :
+    if hostname!=socket.gethostname() or os.name!='posix' or pid==os.getpid() :
+        return False
+    try :
+        os.kill( pid, 0 )
+    except OSError, e :
+        return e.errno==errno.EPERM
+    return True
+
+
+def get_queue() :
+    'Returns the session\'s post-save queue, adopting any unfinished jobs on first use'
+    global _queue
+    with _queueLock :
+        if _queue is None :
+            _queue=PostSaveQueue()
+            try :
+                _queue.resume()
+            except Exception :
+                P.error( 'Unable to resume post-save jobs\n%s' % traceback.format_exc() )
+    return _queue
+
+def submit( job=None ) :
+    'Queues a post-save job to run in the background'
+    return get_queue().submit( job )
+
+def failed() :
+    'Returns the file paths of background jobs that ran out of retries since this was last called'
+    if _queue is None :
+        return []
+    return _queue.failed()
+
+
+#  End
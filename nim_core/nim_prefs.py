@@ -15,13 +15,23 @@
 
 #  General Imports :
 import os, sys, re, traceback
+import atexit, shutil, tempfile, threading
 import urlparse
+try :
+    import fcntl
+except ImportError :
+    fcntl=None
+try :
+    import msvcrt
+except ImportError :
+    msvcrt=None
 
 #  NIM Imports :
 import nim_api as Api
 import nim_file as F
+import nim_lazy as Lazy
 import nim_print as P
-import nim_win as Win
+Win=Lazy.module( 'nim_win', __name__ )
 
 '''
 isGUI = True
@@ -33,6 +43,8 @@ except :
     pass
 '''
 
+'''
+# Moved to inline functions
 isGUI = False
 try :
     #Validate Against DCC Environment
@@ -40,7 +52,7 @@ try :
         isGUI = True
 except :
     pass
-
+'''
 #print "isGUI: %s" % isGUI
 
 #  Variables :
@@ -58,6 +70,9 @@ css_dir= css_dir.replace('\\','/')
 #http_srch=re.compile( '^http[s]?://' )
 #ip_srch=re.compile( '[0-9\.]+' )
 equal_srch=re.compile( '=' )
+#  Seconds to wait for further changes before writing the preferences file :
+flush_delay=0.5
+_store=None
 
 
 def get_user() :
@@ -494,13 +509,207 @@ def mk_default( recreatePrefs=False, notify_success=True ) :
     return os.path.normpath( prefsFile )
 
 
+class PrefsStore( object ) :
+    '''
+    In-memory model of the preferences file.
+
+    Reads are served from memory and only re-parse the file when its modification
+    time or size changes.  Updates are applied in memory straight away and written
+    out together after a short delay, under a lock file, by re-reading the file,
+    re-applying the pending updates and atomically renaming a temp file over it -
+    so sessions writing different attributes at the same time don't undo each other.
+    '''
+
+    def __init__( self, path='' ) :
+        self.path=path
+        #  [ [name, value, rawLine], ... ] - name is None for blank/comment lines :
+        self.lines=[]
+        self.stamp=None
+        self.pending=[]
+        self.lock=threading.RLock()
+        self.timer=None
+        return
+
+    def _stat(self) :
+        'Returns a (mtime, size) stamp for the preferences file, or None if it doesn\'t exist'
+        try :
+            info=os.stat( self.path )
+        except OSError :
+            return None
+        return ( info.st_mtime, info.st_size )
+
+    def _load(self) :
+        'Parses the preferences file into memory'
+        self.lines=[]
+        self.stamp=self._stat()
+        if self.stamp is None :
+            return
+        _file=open( self.path, 'r' )
+        try :
+            for line in _file :
+                name, var=line.partition("=")[::2]
+                #  Changed "rstrip" method to "replace", so as not to replace spaces at the end
+                var=var.replace( '\n', '' )
+                var=var.replace( '\r', '' )
+                if name !='' and name !='\n' and name.strip() :
+                    self.lines.append( [name.strip(), var, line] )
+                else :
+                    self.lines.append( [None, '', line] )
+        finally :
+            _file.close()
+        return
+
+    def _apply( self, attr='', app='', value='' ) :
+        'Applies a single preference update to the in-memory model'
+        _pre=''
+        if app :
+            _pre=app+'_'
+        key=_pre+attr[0].upper()+attr[1:]
+        _clearable=[_pre+'Job', _pre+'Asset', _pre+'Show', _pre+'Shot', _pre+'Task', _pre+'Basename', _pre+'Version']
+        pre_srch=re.compile( '^'+re.escape( _pre )+'[a-zA-Z]+' )
+        _skip=False
+        for line in self.lines :
+            if line[0] is None :
+                continue
+            #  Operate on lines matching the application and attribute names specified :
+            if line[0]==key :
+                #  Don't store "Select.." or "None" combo box options :
+                if value not in ['Select..', 'Select...', 'None', ''] and value :
+                    line[1]=str(value)
+                    P.debug( 'Writing "%s=%s" to preferences...' % ( key, value ) )
+                #  Write out Shot/Asset for the tab :
+                elif key.startswith( _pre+'Tab' ) :
+                    line[1]='SHOT'
+                else :
+                    line[1]=''
+                line[2]=None
+                _skip=True
+            #  Clear dependent selections following the attribute :
+            elif _skip and attr in _clearable and not line[0].startswith( _pre+'Tab' ) :
+                srch=pre_srch.search( line[0] )
+                if srch and srch.group() in _clearable :
+                    line[0], line[1], line[2]=srch.group(), '', None
+        return
+
+    def _write(self) :
+        'Atomically replaces the preferences file with the in-memory model'
+        prefsDir=os.path.dirname( self.path )
+        fd, tmpPath=tempfile.mkstemp( prefix='.'+prefs_fileName+'.', dir=prefsDir )
+        try :
+            for name, var, line in self.lines :
+                if line is None :
+                    line=name+'='+var+'\n'
+                os.write( fd, line )
+        finally :
+            os.close( fd )
+        if os.path.isfile( self.path ) :
+            shutil.copymode( self.path, tmpPath )
+        try :
+            os.rename( tmpPath, self.path )
+        except OSError :
+            #  Windows won't rename over an existing file :
+            os.remove( self.path )
+            os.rename( tmpPath, self.path )
+        self.stamp=self._stat()
+        return
+
+    def _fileLock(self) :
+        'Opens and locks the preferences lock file, shared by all NIM sessions'
+        lockFile=open( self.path+'.lock', 'a+' )
+        lockFile.seek(0)
+        try :
+            if fcntl is not None :
+                fcntl.flock( lockFile.fileno(), fcntl.LOCK_EX )
+            elif msvcrt is not None :
+                msvcrt.locking( lockFile.fileno(), msvcrt.LK_LOCK, 1 )
+        except (IOError, OSError) :
+            P.debug( 'Unable to lock preferences, writing without a lock.' )
+        return lockFile
+
+    def _fileUnlock( self, lockFile=None ) :
+        'Releases and closes the preferences lock file'
+        try :
+            if fcntl is not None :
+                fcntl.flock( lockFile.fileno(), fcntl.LOCK_UN )
+            elif msvcrt is not None :
+                lockFile.seek(0)
+                msvcrt.locking( lockFile.fileno(), msvcrt.LK_UNLCK, 1 )
+        except (IOError, OSError) :
+            pass
+        lockFile.close()
+        return
+
+    def read(self) :
+        'Returns a dictionary of the preferences, reloading the file if it has changed'
+        with self.lock :
+            if self.stamp is None or self._stat()!=self.stamp :
+                self._load()
+                for update in self.pending :
+                    self._apply( *update )
+            return dict( [(line[0], line[1]) for line in self.lines if line[0]] )
+
+    def update( self, attr='', app='', value='' ) :
+        'Applies an update in memory and schedules it to be written'
+        with self.lock :
+            self.read()
+            self.pending.append( (attr, app, value) )
+            self._apply( attr, app, value )
+            self._schedule()
+        return
+
+    def _schedule(self) :
+        'Restarts the timer that writes pending updates'
+        if self.timer is not None :
+            self.timer.cancel()
+        self.timer=threading.Timer( flush_delay, self.flush )
+        #  Never keeps the application from exiting - the exit hook flushes instead :
+        self.timer.daemon=True
+        self.timer.start()
+        return
+
+    def flush(self) :
+        'Writes any pending updates to the preferences file'
+        with self.lock :
+            if self.timer is not None :
+                self.timer.cancel()
+                self.timer=None
+            if not self.pending :
+                return
+            lockFile=None
+            try :
+                lockFile=self._fileLock()
+                #  Merge with changes made by other sessions :
+                self._load()
+                for update in self.pending :
+                    self._apply( *update )
+                self._write()
+                self.pending=[]
+            except Exception, e :
+                P.error( 'Unable to write preferences.' )
+                P.debug( '    %s' % traceback.format_exc() )
+            finally :
+                if lockFile is not None :
+                    self._fileUnlock( lockFile )
+        return
+
+
+def _get_store() :
+    'Returns the preferences store for the current preferences file'
+    global _store
+    prefsFile=get_path()
+    if _store is None or _store.path!=prefsFile :
+        if _store is not None :
+            _store.flush()
+        _store=PrefsStore( path=prefsFile )
+    return _store
+
+
 def read() :
     'Reads and stores preferences'
 
     #P.info('nim_prefs.read')
 
     prefsFile=get_path()
-    _prefs={}
     
     #  Create preferences, if necessary :
     if not os.path.isfile( prefsFile ) :
@@ -510,16 +719,7 @@ def read() :
             return False
     try :
         #  Read NIM preferences file :
-        for line in open( prefsFile ) :
-            name, var=line.partition("=")[::2]
-            #  Changed "rstrip" method to "replace", so as not to replace spaces at the end
-            var=var.replace( '\n', '' )
-            var=var.replace( '\r', '' )
-            if name !='' and name !='\n' :
-                _prefs[name.strip()]=var
-        #  Remove empty dictionary entries :
-        prefs=dict( [(k,v) for k,v in _prefs.items() if len(k)>0])
-        return prefs
+        return _get_store().read()
     except Exception, e :
         P.error( 'Unable to read preferences.' )
         return False
@@ -531,64 +731,28 @@ def update( attr=None, app='', value='' ) :
 
     #  Variables :
     _prefsFile=get_path()
-    _prefs=read()
     
     if not os.path.isfile( _prefsFile ) :
         mk_default()
     if not attr :
         P.info( 'Error : At least one preference attribute must be specified to write out' )
         return
-    _pre, _txt='', ''
-    _skip=False
-    if app :
-        _pre=app+'_'
-    _clearable=[_pre+'Job', _pre+'Asset', _pre+'Show', _pre+'Shot', _pre+'Task', _pre+'Basename', _pre+'Version']
     
-    #  Retrieve old preferences :
-    _old=open( _prefsFile, 'r' )
-    
-    #  Write out preferences :
-    for line in _old :
-        #  Operate on lines matching the application and attribute names specified :
-        if re.search( '^'+_pre+attr[0].upper()+attr[1:]+'=', line ) :
-            #  Don't store "Select.." or "None" combo box options :
-            if value not in ['Select..', 'Select...', 'None', ''] and value :
-                _txt+=_pre+attr[0].upper()+attr[1:]+'='+str(value)+'\n'
-                #  Print :
-                P.debug( 'Writing "%s=%s" to preferences...' % ( _pre+attr[0].upper()+attr[1:], value ) )
-            else :
-                #  Write out Shot/Asset for the tab :
-                if re.search( '^'+_pre+'Tab', line ) :
-                    _txt+=_pre+attr[0].upper()+attr[1:]+'=SHOT\n'
-                else :
-                    _txt+=_pre+attr[0].upper()+attr[1:]+'=\n'
-            _skip=True
-            continue
-        
-        #  Operate on lines without the application/attribute names specified :
-        else :
-            srch=re.search( '^'+_pre+'[a-zA-Z]+', line )
-            #  Operate on lines related to the given attribute :
-            if _skip and srch :
-                if not re.search( '^'+_pre+'Tab', line ) :
-                    if srch.group() in _clearable and attr in _clearable :
-                        _txt+=srch.group()+'=\n'
-                    else : _txt+=line
-                #  Deal with assetIndex attributes :
-                else : _txt+=line
-            else : _txt+=line
-     
-     #  Close old preference file, so it can be over-written :
-    _old.close()
-    
-    #  Write new preferences :
-    _old=open( _prefsFile, 'w' )
-    _old.write( _txt )
-    _old.close()
+    #  Updates are written out shortly after the last change :
+    _get_store().update( attr=attr, app=app, value=value )
     
     return
 
 
+def flush() :
+    'Writes any pending preference updates to disk'
+    if _store is not None :
+        _store.flush()
+    return
+
+atexit.register( flush )
+
+
 def Dbug_toggle() :
     'Toggles debug mode on/off, inside of Maya'
     import maya.cmds as mc
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_prewarm.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import os, threading, time, traceback
+
+#  NIM Imports :
+import nim_api as Api
+import nim_client as Client
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+#  Seconds to wait after start() is called, so the application can finish launching :
+warm_delay=10.0
+#  Seconds to keep the warmed job list - longer than the usual query cache, as the
+#  first NIM window may not be opened until a while after the application starts :
+warm_ttl=300.0
+#  Seconds to wait for the NIM server to answer the first request :
+warm_timeout=10.0
+#  Set NIM_PREWARM=0 in the environment to turn pre-warming off :
+env_var='NIM_PREWARM'
+#  Kept when the scripts are reloaded, so pre-warming only runs once per session :
+_thread=globals().get( '_thread' )
+
+
+def warm() :
+    '''
+    Loads the preferences and fills the connection and query caches used when a NIM window
+    opens - the user's ID and job list.  Nothing is done if the preferences haven't been made
+    yet, or the server can't be reached, as both need the user's input.  Returns True if the
+    caches were filled.
+    '''
+    startTime=time.time()
+    try :
+        connect_info=Client.get_connect_info()
+        #  Check the server answers, without waiting as long as a normal request :
+        Client.get( {'q': 'testAPI'}, timeout=warm_timeout )
+        userID=Client.cached_get( {'q': 'getUserID', 'u': str(connect_info['nim_apiUser'])}, ttl=Api.user_ttl )
+        if type(userID)!=type(list()) or len(userID)!=1 :
+            return False
+        Client.cached_get( {'q': 'getUserJobs', 'u': userID[0]['ID']}, ttl=warm_ttl )
+    except Client.NimError, e :
+        P.debug( 'NIM pre-warm: skipped - %s' % e )
+        return False
+
+    P.debug( 'NIM pre-warm: complete in %.3fs' % (time.time()-startTime) )
+    return True
+
+def _run( delay=0 ) :
+    'Worker thread - waits for the application to settle, then warms the caches'
+    if delay :
+        time.sleep( delay )
+    try :
+        warm()
+    except Exception :
+        P.debug( 'NIM pre-warm failed\n%s' % traceback.format_exc() )
+    return
+
+
+def start( delay=None ) :
+    '''
+    Starts warming NIM on a background thread - called from the application start-up scripts.
+    Only runs once per session.  Returns False if pre-warming is turned off or already started.
+    '''
+    global _thread
+    if os.environ.get( env_var, '1' ).lower() in ['0', 'false', 'off', 'no'] :
+        return False
+    if _thread is not None :
+        return False
+    if delay is None :
+        delay=warm_delay
+    _thread=threading.Thread( target=_run, args=(delay,), name='NIM_Prewarm' )
+    _thread.daemon=True
+    _thread.start()
+    return True
+
+
+#  End
+
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_publish.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import ctypes, ctypes.util, errno, hashlib, os, platform, stat, tempfile, threading
+try :
+    import fcntl
+except ImportError :
+    fcntl=None
+
+#  NIM Imports :
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+_os=platform.system().lower()
+#  Publish strategies to try, in order - "copy" always works, so keep it last.
+#  "hardlink" and "symlink" are opt-in - the published file would share the work file's data :
+strategies=['reflink', 'copy']
+#  Bytes read per chunk, when copying :
+copy_bufSize=8*1024*1024
+#  Linux ioctl that clones a file's extents, on filesystems that support it ( Btrfs, XFS, ... ) :
+FICLONE=0x40049409
+#  Strategies that failed for a ( source device, target device ) pair - skipped from then on :
+_unsupported={}
+_unsupportedLock=threading.Lock()
+_clonefile=None
+
+
+#  Strategies :
+#       Each creates "dest" as a new file with the contents of "src", raising OSError/IOError if
+#       it can't.  errno values in unsupported_errs mean the filesystem can't do it at all.
+
+unsupported_errs=[ errno.EXDEV, errno.EPERM, errno.EINVAL, errno.ENOTTY, errno.ENOSYS,
+    getattr( errno, 'EOPNOTSUPP', errno.EINVAL ), getattr( errno, 'ENOTSUP', errno.EINVAL ) ]
+
+def _reflink( src='', dest='' ) :
+    'Creates a copy-on-write clone, sharing the source\'s data blocks until either is changed'
+    if _os=='darwin' :
+        clonefile=_get_clonefile()
+        if clonefile is None :
+            raise OSError( errno.ENOSYS, 'clonefile is not available' )
+        if clonefile( src.encode('utf-8'), dest.encode('utf-8'), 0 )!=0 :
+            err=ctypes.get_errno()
+            raise OSError( err, os.strerror( err ) )
+        return
+    if fcntl is None or _os!='linux' :
+        raise OSError( errno.ENOSYS, 'reflinks are not supported on %s' % _os )
+    with open( src, 'rb' ) as srcFile :
+        with open( dest, 'wb' ) as destFile :
+            try :
+                fcntl.ioctl( destFile.fileno(), FICLONE, srcFile.fileno() )
+            except IOError, e :
+                raise OSError( e.errno, e.strerror )
+    return
+
+def _hardlink( src='', dest='' ) :
+    'Links the published name to the same file - the file\'s permissions are shared'
+    if not hasattr( os, 'link' ) :
+        raise OSError( errno.ENOSYS, 'hard links are not supported on %s' % _os )
+    os.link( src, dest )
+    return
+
+def _symlink( src='', dest='' ) :
+    'Creates a symbolic link to the source file'
+    if not hasattr( os, 'symlink' ) :
+        raise OSError( errno.ENOSYS, 'symbolic links are not supported on %s' % _os )
+    os.symlink( src, dest )
+    return
+
+def _copy( src='', dest='' ) :
+    'Copies the file in large chunks, then checks the copy\'s checksum against the source'
+    srcHash=hashlib.sha1()
+    with open( src, 'rb' ) as srcFile :
+        with open( dest, 'wb' ) as destFile :
+            sendfile=getattr( os, 'sendfile', None )
+            if sendfile is not None :
+                #  Let the kernel move the data, then hash the source separately :
+                size, offset=os.fstat( srcFile.fileno() ).st_size, 0
+                try :
+                    while offset < size :
+                        sent=sendfile( destFile.fileno(), srcFile.fileno(), offset, size-offset )
+                        if not sent :
+                            break
+                        offset +=sent
+                except OSError :
+                    sendfile=None
+                    destFile.seek(0)
+                    destFile.truncate()
+                    srcFile.seek(0)
+                else :
+                    srcHash=_checksum( src )
+            if sendfile is None :
+                while True :
+                    data=srcFile.read( copy_bufSize )
+                    if not data :
+                        break
+                    srcHash.update( data )
+                    destFile.write( data )
+            destFile.flush()
+            os.fsync( destFile.fileno() )
+    if _checksum( dest ).digest()!=srcHash.digest() :
+        raise IOError( errno.EIO, 'Checksum of the published copy doesn\'t match %s' % src )
+    return
+
+strategy_funcs={'reflink': _reflink, 'hardlink': _hardlink, 'symlink': _symlink, 'copy': _copy}
+
+
+def _checksum( filePath='' ) :
+    'Returns the SHA-1 hash object for a file\'s contents'
+    fileHash=hashlib.sha1()
+    with open( filePath, 'rb' ) as readFile :
+        while True :
+            data=readFile.read( copy_bufSize )
+            if not data :
+                break
+            fileHash.update( data )
+    return fileHash
+
+def _get_clonefile() :
+    'Returns the OSX clonefile() function, or None'
+    global _clonefile
+    if _clonefile is None :
+        try :
+            libc=ctypes.CDLL( ctypes.util.find_library('c'), use_errno=True )
+            _clonefile=libc.clonefile
+            _clonefile.argtypes=[ ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int ]
+        except (OSError, AttributeError) :
+            _clonefile=False
+    return _clonefile or None
+
+def _devices( src='', pubDir='' ) :
+    'Returns the ( source, target ) device pair that strategy support is recorded against'
+    try :
+        return ( os.stat( src ).st_dev, os.stat( pubDir ).st_dev )
+    except OSError :
+        return None
+
+def _replace( tmpPath='', pubPath='' ) :
+    'Moves a finished file over the published file'
+    #  Renaming a hard link over another link to the same file does nothing :
+    if hasattr( os.path, 'samefile' ) and os.path.exists( pubPath ) and not os.path.islink( pubPath ) \
+        and not os.path.islink( tmpPath ) and os.path.samefile( tmpPath, pubPath ) :
+        os.remove( tmpPath )
+        return
+    try :
+        os.rename( tmpPath, pubPath )
+    except OSError :
+        #  Windows won't rename over an existing file :
+        if os.path.lexists( pubPath ) :
+            os.chmod( pubPath, stat.S_IWRITE )
+            os.remove( pubPath )
+        os.rename( tmpPath, pubPath )
+    return
+
+
+def publish_file( filePath='', pubPath='', order=None, readOnly=True ) :
+    '''
+    Publishes a file to pubPath using the first strategy that works for the two locations.
+
+    Strategies are tried in the order given ( "reflink", "hardlink", "symlink", "copy" ),
+    defaulting to the module's "strategies" list.  A strategy the filesystem doesn't
+    support is remembered for that pair of devices, and skipped on later publishes.  The
+    result is built next to pubPath and renamed over it, so the published file is never
+    partially written.  Links aren't made read-only, as they share the source's permissions.
+    Returns the name of the strategy used, or False.
+    '''
+    pubDir=os.path.dirname( pubPath ) or '.'
+    devices=_devices( filePath, pubDir )
+
+    for strategy in ( order or strategies ) :
+        with _unsupportedLock :
+            if devices and strategy in _unsupported.get( devices, [] ) :
+                continue
+        fd, tmpPath=tempfile.mkstemp( prefix='.'+os.path.basename( pubPath )+'.', dir=pubDir )
+        os.close( fd )
+        os.remove( tmpPath )
+        try :
+            strategy_funcs[strategy]( filePath, tmpPath )
+        except (IOError, OSError), e :
+            if os.path.lexists( tmpPath ) :
+                os.remove( tmpPath )
+            if e.errno in unsupported_errs :
+                P.debug( 'Publish strategy "%s" is not supported here - %s' % (strategy, e) )
+                if devices and strategy!='copy' :
+                    with _unsupportedLock :
+                        _unsupported.setdefault( devices, [] ).append( strategy )
+            else :
+                P.warning( 'Publish strategy "%s" failed - %s' % (strategy, e) )
+            continue
+
+        #  Make it read-only - links share their permissions with the work file, so are left alone :
+        if readOnly and strategy not in ['hardlink', 'symlink'] :
+            os.chmod( tmpPath, stat.S_IREAD )
+        _replace( tmpPath, pubPath )
+        P.info( 'Published %s\n    to %s ( %s )' % (filePath, pubPath, strategy) )
+        return strategy
+
+    P.error( 'Unable to publish %s to %s' % (filePath, pubPath) )
+    return False
+
+
+#  End
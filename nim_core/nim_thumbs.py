@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_thumbs.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import collections, threading, traceback, urllib
+from urlparse import urlparse
+
+#  NIM Imports :
+import nim_client as Client
+import nim_print as P
+
+#  Import Python GUI packages :
+try :
+    from PySide2 import QtGui as QtGui2
+    from PySide2 import QtCore
+    Signal=QtCore.Signal
+except ImportError :
+    try :
+        from PySide import QtCore
+        from PySide import QtGui as QtGui2
+        Signal=QtCore.Signal
+    except ImportError :
+        from PyQt4 import QtCore
+        from PyQt4 import QtGui as QtGui2
+        Signal=QtCore.pyqtSignal
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+cache_size=64
+
+
+class PixCache( object ) :
+    'Least recently used cache of scaled pixmaps, keyed by item and size'
+
+    def __init__( self, maxItems=cache_size ) :
+        self.maxItems=maxItems
+        self.items=collections.OrderedDict()
+        return
+
+    def get( self, key=None ) :
+        'Returns a cached pixmap, marking it as recently used'
+        pix=self.items.pop( key, None )
+        if pix is not None :
+            self.items[key]=pix
+        return pix
+
+    def put( self, key=None, pix=None ) :
+        'Stores a pixmap, dropping the least recently used ones'
+        self.items.pop( key, None )
+        self.items[key]=pix
+        while len(self.items) > self.maxItems :
+            self.items.popitem( last=False )
+        return
+
+    def clear(self) :
+        self.items.clear()
+        return
+
+
+class ThumbService( QtCore.QObject ) :
+    '''
+    Loads Shot and Asset thumbnails on a background thread.
+
+    Requests are keyed by element, so a newer request for the same element replaces
+    one that hasn't started yet - only the last selected item is fetched.  The image
+    is downloaded, decoded and scaled off the UI thread, then handed back through the
+    "ready" signal as ( elem, itemID, size, QImage ), or None if no icon exists.
+    '''
+    ready=Signal( object, object, object, object )
+
+    def __init__( self, parent=None, maxItems=cache_size ) :
+        super( ThumbService, self ).__init__( parent )
+        self.pixCache=PixCache( maxItems=maxItems )
+        self._pending={}
+        self._cond=threading.Condition()
+        self._thread=None
+        self._running=True
+        return
+
+    def cached( self, elem='shot', itemID=None, size=0 ) :
+        'Returns the cached, scaled pixmap for an item - call from the UI thread'
+        return self.pixCache.get( (elem, str(itemID), int(size)) )
+
+    def store( self, elem='shot', itemID=None, size=0, img=None ) :
+        'Converts a scaled image to a pixmap and caches it - call from the UI thread'
+        pix=QtGui2.QPixmap.fromImage( img )
+        self.pixCache.put( (elem, str(itemID), int(size)), pix )
+        return pix
+
+    def request( self, elem='shot', itemID=None, size=0 ) :
+        'Queues a thumbnail request, replacing any queued request for the same element'
+        with self._cond :
+            self._pending[elem]=( str(itemID), int(size) )
+            if self._thread is None or not self._thread.is_alive() :
+                self._thread=threading.Thread( target=self._run, name='NIM_Thumbnails' )
+                self._thread.daemon=True
+                self._thread.start()
+            self._cond.notify()
+        return
+
+    def stop(self) :
+        'Stops the worker thread'
+        with self._cond :
+            self._running=False
+            self._pending.clear()
+            self._cond.notify()
+        return
+
+    def _run(self) :
+        'Worker loop - takes the most recent request for each element'
+        while True :
+            with self._cond :
+                while self._running and not self._pending :
+                    self._cond.wait()
+                if not self._running :
+                    return
+                elem, (itemID, size)=self._pending.popitem()
+            img=None
+            try :
+                img=self._load( elem=elem, itemID=itemID, size=size )
+            except Exception :
+                P.debug( 'Unable to load %s thumbnail\n%s' % (elem, traceback.format_exc()) )
+            if self._running :
+                self.ready.emit( elem, itemID, size, img )
+
+    def _load( self, elem='shot', itemID=None, size=0 ) :
+        'Fetches, decodes and scales a thumbnail'
+        if elem=='asset' :
+            img=Client.get( {'q': 'getAssetIcon', 'ID': itemID} )
+        else :
+            img=Client.get( {'q': 'getShotIcon', 'ID': itemID} )
+        try :
+            img_link=img[0]['img_link']
+        except :
+            img_link=None
+        if not img_link :
+            return None
+
+        #  Build the image URL from the NIM domain :
+        connect_info=Client.get_connect_info()
+        parsed_uri=urlparse( connect_info['nim_apiURL'] )
+        img_loc='{uri.scheme}://{uri.netloc}/'.format( uri=parsed_uri )+img_link
+
+        #  Download :
+        try :
+            _data=urllib.urlopen( img_loc, context=Client.get_sslContext() ).read()
+        except :
+            _data=urllib.urlopen( img_loc ).read()
+        if not _data :
+            return None
+
+        #  Decode and scale :
+        image=QtGui2.QImage()
+        if not image.loadFromData( _data ) :
+            return None
+        P.debug( '%s image URL = "%s"' % (elem.upper(), img_loc) )
+        return image.scaled( size, size, QtCore.Qt.KeepAspectRatio )
+
+
+#  End
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: nim_versions.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+
+#  General Imports :
+import threading
+
+#  NIM Imports :
+import nim_api as Api
+import nim_print as P
+
+
+#  Variables :
+version='v4.0.61'
+winTitle='NIM_'+version
+#  get_vers keyword for each parent type :
+_parentKeys={ 'SHOT': 'shotID', 'ASSET': 'assetID', 'SHOW': 'showID' }
+
+
+class BasenameVersions( object ) :
+    'The versions logged under one basename, and the file ID of each file name'
+
+    def __init__(self) :
+        #  The version dictionaries returned by get_vers - None until they are fetched :
+        self.versions=None
+        self.fileIDs={}
+        self._lock=threading.RLock()
+        return
+
+    def first(self) :
+        'Returns the first version returned by get_vers, or None if there are none'
+        if self.versions :
+            return self.versions[0]
+        return None
+
+    def add( self, filename='', fileID=None ) :
+        'Records a file logged under the basename'
+        self.fileIDs[filename]=fileID
+        return
+
+
+class VersionIndex( object ) :
+    '''
+    The files already logged under each basename of a shot, asset or show, for an export that logs
+    many files.  A basename's versions are fetched the first time one of its files is logged, and
+    the index is kept up to date as files are saved, so choosing between update_file and save_file
+    is a dictionary lookup rather than another get_vers call :
+
+        index=nim_versions.VersionIndex()
+        for comp in comps :
+            index.log_file( parent='shot', parentID=shotID, basename=comp['basename'],
+                filename=comp['filename'], path=comp['path'], ... )
+
+    Safe to share between the worker threads of a batch.
+    '''
+
+    def __init__(self) :
+        self._basenames={}
+        self._lock=threading.Lock()
+        return
+
+    def basename( self, parent='shot', parentID=None, basename='' ) :
+        'Returns the BasenameVersions of a basename, fetching its versions the first time it is asked for'
+        key=( parent.upper(), str(parentID), basename )
+        with self._lock :
+            entry=self._basenames.get( key )
+            if entry is None :
+                entry=self._basenames[key]=BasenameVersions()
+        #  Only one thread fetches a basename's versions :
+        with entry._lock :
+            if entry.versions is None :
+                kwargs={ _parentKeys.get( key[0], 'showID' ): parentID, 'basename': basename }
+                #  Errors raised in headless mode are left to the caller - guessing that there are no
+                #  versions would save a duplicate of a file that is already logged :
+                versions=Api.get_vers( **kwargs )
+                if isinstance( versions, list ) :
+                    entry.versions=versions
+                    for versionItem in versions :
+                        entry.add( versionItem.get( 'filename' ), versionItem.get( 'fileID' ) )
+                else :
+                    #  Nothing to go on - the versions are fetched again next time :
+                    P.error( 'Failed to load existing versions from NIM - %s' % versions )
+        return entry
+
+    def file_id( self, parent='shot', parentID=None, basename='', filename='' ) :
+        'Returns the ID of the file with the given name logged under a basename, or None'
+        return self.basename( parent=parent, parentID=parentID, basename=basename ).fileIDs.get( filename )
+
+    def log_file( self, parent='shot', parentID=None, basename='', filename='', **kwargs ) :
+        '''
+        Logs a file - updating the file of the same name if the basename already has one, or
+        saving a new one.  Other keyword arguments are passed on to update_file or save_file.
+        Returns the API result.
+        '''
+        entry=self.basename( parent=parent, parentID=parentID, basename=basename )
+        #  Files of the same basename are logged one at a time, so a new file is only saved once :
+        with entry._lock :
+            fileID=entry.fileIDs.get( filename )
+            if fileID :
+                P.info( 'Updating file data in NIM' )
+                return Api.update_file( ID=fileID, basename=basename, filename=filename, **kwargs )
+            P.info( 'Saving file data to NIM' )
+            result=Api.save_file( parent=parent, parentID=parentID, basename=basename, filename=filename, **kwargs )
+            if isinstance( result, dict ) and str( result.get( 'success' ) ).lower()=='true' and result.get( 'ID' ) :
+                entry.add( filename, result['ID'] )
+            return result
+
+
+#  End
+
@@ -181,6 +181,13 @@ def main():
         outputMenu(MaxPlus.MenuManager.GetMainMenu(), False)
     except:
         print "Failed to create NIM menu"
+
+    #  Warm the NIM connection and caches in the background :
+    try:
+        import nim_core.nim_prewarm as nimPrewarm
+        nimPrewarm.start()
+    except:
+        print "Failed to start NIM pre-warm"
         
 
 if __name__ == '__main__':
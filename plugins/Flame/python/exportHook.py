@@ -438,6 +438,11 @@ def preExportSequence( info, userData ):
    # If standard export then ask for NIM association
    nimShowDialog = False
 
+   if 'nim_export_sequence' in userData :
+      if userData['nim_export_sequence'] == True :
+         # Elements and files exported with the sequence are spooled, then sent to NIM in postExportSequence
+         userData['nim_spool'] = nimFlameExport.nimStartExportEvents()
+
    print "preExportSequence - end <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<"
    pass
 
@@ -476,34 +481,20 @@ def postExportSequence( info, userData ):
       print info
       print userData
 
+   shotData = {}
+
    if 'nim_export_sequence' in userData :
       if userData['nim_export_sequence'] == True :
-         shotData = userData['shotData']
+         # Send the elements and files spooled while the sequence exported
+         if 'nim_spool' in userData :
+            print "Sending Export Events to NIM"
+            result = nimFlameExport.nimFlushExportEvents(spoolName=userData['nim_spool'], close=True)
+            print "Export events sent: %s  failed: %s" % (result['sent'], result['failed'])
 
-         for shotName in shotData :
-            print "shotName: %s" % shotName
-            for assetType in shotData[shotName] :
-               
-               # Update Icons
-               if assetType == 'video' :
-                  print "Updating Shot Icon"
-                  itemData = shotData[shotName]['video']
-                  nim_shotID = itemData['nim_shotID']
-                  nim_iconPath = itemData['nim_iconPath']
-                  print "shotID: %s" % nim_shotID
-                  print "iconPath: %s" % nim_iconPath
-                  result = nimFlameExport.updateShotIcon(nim_shotID=nim_shotID, image_path=nim_iconPath)
-
-               # Resolve keywords in Batch export_node files
-               if assetType == 'batch' :
-                  print "Resolving Keywords in Batch Export Node"
-                  itemData = shotData[shotName]['batch']
-                  nim_shotID = itemData['nim_shotID']
-                  resolvedPath = itemData['resolvedPath']
-                  destinationPath = info['destinationPath']
-                  batchPath = os.path.join(destinationPath,resolvedPath)
-                  result = nimFlameExport.resolveBatchKeywords(nim_shotID=nim_shotID, batch_path=batchPath)
+         shotData = userData['shotData']
 
+   # Upload the edit or daily along with the shot icons
+   uploads = []
 
    if 'nim_export_edit' in userData :
       if userData['nim_export_edit'] == True :
@@ -515,7 +506,7 @@ def postExportSequence( info, userData ):
       
          if 'editData' in userData :
             mov_path = userData['editData']['path']
-            result = nimFlameExport.uploadEdit(nim_showID=nim_showID, mov_path=mov_path)
+            uploads.append( ('edit', nim_showID, mov_path) )
          
 
    if 'nim_export_daily' in userData :
@@ -529,7 +520,13 @@ def postExportSequence( info, userData ):
       
          if 'dailyData' in userData :
             mov_path = userData['dailyData']['path']
-            result = nimFlameExport.uploadDaily(nim_taskID=nim_taskID, mov_path=mov_path)
+            uploads.append( ('daily', nim_taskID, mov_path) )
+
+   # Update shot icons, resolve keywords in Batch export_node files and upload review items
+   # on the NIM worker pool
+   if shotData or uploads :
+      print "Updating Shot Icons, Batch Export Nodes and Review Items"
+      result = nimFlameExport.nimPostExportSequence(shotData=shotData, destinationPath=info['destinationPath'], uploads=uploads)
 
    print "postExportSequence - end <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<"
    pass
@@ -642,7 +639,14 @@ def preExportAsset( info, userData ):
 
    if 'nim_export_sequence' in userData :
       if userData['nim_export_sequence'] == True :
-         result = nimFlameExport.nimCreateShot(nim_showID=userData['nim_showID'], info=info)
+         # Shots are only created once per export - keyed by name and duration as segments can share a name
+         if 'nim_createdShots' not in userData :
+            userData['nim_createdShots'] = {}
+         shotKey = '%s_%s' % (info['shotName'], info['sourceOut'] - info['sourceIn'])
+         result = nimFlameExport.nimCreateShot(nim_showID=userData['nim_showID'], info=info, \
+                                    nim_shotID=userData['nim_createdShots'].get(shotKey))
+         if result.get('nim_shotID') :
+            userData['nim_createdShots'][shotKey] = result['nim_shotID']
 
          info['resolvedPath'] = result['resolvedPath']
 
@@ -819,7 +823,18 @@ def postExportAsset( info, userData ):
 
          comment = 'Batch File exported from Flame'
 
-         if exportFile :
+         if 'nim_spool' in userData :
+            # Spool the registration - it is sent to NIM with the rest of the sequence in postExportSequence
+            if exportFile :
+               event = {'type':'file', 'nim_shotID':userData['currentShotID'], 'info':dict(info), 'taskTypeID':assetTypeID, \
+                        'taskFolder':userData['batchTaskTypeFolder'], 'serverID':userData['nim_serverID'], \
+                        'nim_userID':nim_userID, 'tapeName':nim_tapeName, 'comment':comment}
+            else :
+               event = {'type':'element', 'nim_shotID':userData['currentShotID'], 'info':dict(info), 'typeID':assetTypeID, \
+                        'nim_userID':nim_userID}
+            result = nimFlameExport.nimQueueExportEvent(spoolName=userData['nim_spool'], event=event)
+
+         elif exportFile :
             # export batch to NIM files
             result = nimFlameExport.nimExportFile(nim_shotID=userData['currentShotID'], info=info, taskTypeID=assetTypeID, \
                                     taskFolder=userData['batchTaskTypeFolder'], serverID=userData['nim_serverID'], \
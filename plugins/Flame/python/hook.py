@@ -284,6 +284,9 @@ def customUIAction( info, userData ):
 
       import nim_core.nim_win as Win;
       Win.userInfo()
+
+      # Data loaded for the previous user no longer applies
+      nimFlameExport.nimWarmSession(clear=True)
    pass
 
 
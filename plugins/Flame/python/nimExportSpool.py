@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: Flame/python/nimExportSpool.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+# Registration events recorded by the export hooks while a sequence exports,
+# to be sent to NIM in one go once the sequence is done.
+#
+# Each event is appended to a spool file - one JSON object per line - and
+# synced to disk before the hook returns.  A flush first renames the spool
+# aside, so events added while it runs start a new spool, and marks events
+# done in the renamed file as they are sent.  Files left behind by an export
+# that died are picked up by abandoned() and replayed, skipping the events
+# already marked done.
+
+import os,json,time,errno,socket,threading
+
+spoolExt = '.spool'
+claimExt = '.claimed'
+closedExt = '.closed'
+
+# Times an event is sent before it is dropped
+maxAttempts = 3
+# Seconds after which files are treated as abandoned where the process that
+# owns them can't be checked
+staleTime = 12*60*60
+
+_lock = threading.Lock()
+_count = [0]
+
+
+def newSpoolName() :
+	'''Returns a name for a new spool, unique to this host and process'''
+	with _lock :
+		_count[0] += 1
+		count = _count[0]
+	hostname = socket.gethostname().replace('_', '-')
+	return '%s_%d_%d_%d' % (hostname, os.getpid(), int(time.time()*1000), count)
+
+
+def _append(path='', lines=None) :
+	'''Appends lines to a file in a single write, synced to disk before returning'''
+	fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0600)
+	try :
+		os.write(fd, ''.join(lines or []))
+		os.fsync(fd)
+	finally :
+		os.close(fd)
+
+
+def _ownerAlive(hostname='', pid=0, path='') :
+	'''Returns True if the process that owns a file may still be running'''
+	if hostname != socket.gethostname().replace('_', '-') or os.name != 'posix' :
+		try :
+			return time.time() - os.path.getmtime(path) < staleTime
+		except OSError :
+			return False
+	try :
+		os.kill(pid, 0)
+	except OSError, e :
+		return e.errno == errno.EPERM
+	return True
+
+
+class ExportSpool(object) :
+	'''The spool of one exported sequence'''
+
+	def __init__(self, spoolDir='', name='') :
+		self.spoolDir = spoolDir
+		self.name = name
+		self.path = os.path.join(spoolDir, name+spoolExt)
+
+	def add(self, event=None) :
+		'''Appends an event - a JSON serialisable dictionary - to the spool'''
+		event = dict(event or {})
+		event.setdefault('attempts', 0)
+		self.addAll([event])
+
+	def addAll(self, events=None) :
+		'''Appends several events to the spool at once'''
+		events = events or []
+		if not events :
+			return
+		if not os.path.isdir(self.spoolDir) :
+			try :
+				os.makedirs(self.spoolDir)
+			except OSError :
+				# Made by another process in the meantime
+				if not os.path.isdir(self.spoolDir) :
+					raise
+		_append(self.path, [json.dumps(event)+'\n' for event in events])
+
+	def close(self) :
+		'''Marks the sequence as finished - events added after this should be flushed right away'''
+		if os.path.isdir(self.spoolDir) :
+			_append(os.path.join(self.spoolDir, self.name+closedExt))
+
+	def closed(self) :
+		'''Returns True once close() has been called'''
+		return os.path.isfile(os.path.join(self.spoolDir, self.name+closedExt))
+
+	def claim(self) :
+		'''Moves the spooled events aside to be flushed
+		   Returns the claimed file, or None if there were no events'''
+		claimed = os.path.join(self.spoolDir, '%s.%d.%d%s' % (self.name, os.getpid(), int(time.time()*1000), claimExt))
+		try :
+			os.rename(self.path, claimed)
+		except OSError, e :
+			if e.errno == errno.ENOENT :
+				return None
+			raise
+		return claimed
+
+
+def read(claimed='') :
+	'''Returns the events in a claimed file that aren't marked done, in the order they were added
+	   Each event gets its line number in the file as 'index' '''
+	events = []
+	done = set()
+	with open(claimed, 'r') as f :
+		for index, line in enumerate(f) :
+			try :
+				event = json.loads(line)
+			except ValueError :
+				# A line cut short by a crash
+				continue
+			if 'done' in event :
+				done.add(event['done'])
+			else :
+				event['index'] = index
+				events.append(event)
+	return [event for event in events if event['index'] not in done]
+
+
+def markDone(claimed='', event=None) :
+	'''Records that an event read from a claimed file was sent'''
+	_append(claimed, [json.dumps( {'done':event['index']} )+'\n'])
+
+
+def release(claimed='', spool=None, retry=None) :
+	'''Removes a claimed file once flushed, putting the events to retry back in the spool
+	   Events that were already tried maxAttempts times are dropped - returns them'''
+	dropped = []
+	requeue = []
+	for event in retry or [] :
+		event = dict(event)
+		event.pop('index', None)
+		event['attempts'] = event.get('attempts', 0)+1
+		if event['attempts'] >= maxAttempts :
+			dropped.append(event)
+		else :
+			requeue.append(event)
+	if requeue and spool is not None :
+		spool.addAll(requeue)
+	try :
+		os.remove(claimed)
+	except OSError :
+		pass
+	return dropped
+
+
+def _owner(name='') :
+	'''Returns the ( hostname, pid ) a spool name was made for'''
+	hostname, pid = name.rsplit('_', 3)[:2]
+	return hostname, int(pid)
+
+
+def abandoned(spoolDir='') :
+	'''Returns ( ExportSpool, [claimed files] ) for each spool left behind by an export that is no longer
+	   running, or that this process finished with events left to retry
+	   Spools of running exports and claims still being flushed are left alone'''
+	try :
+		fileNames = sorted(os.listdir(spoolDir))
+	except OSError :
+		return []
+
+	running = set()
+	claims = {}
+	closedFiles = {}
+	finished = set()
+	for fileName in fileNames :
+		path = os.path.join(spoolDir, fileName)
+		try :
+			if fileName.endswith(spoolExt) :
+				name = fileName[:-len(spoolExt)]
+				if _ownerAlive(*_owner(name), path=path) :
+					running.add(name)
+				else :
+					claims.setdefault(name, [])
+			elif fileName.endswith(claimExt) :
+				# name.<pid of the flushing process>.<time>.claimed
+				name, claimPid = fileName[:-len(claimExt)].rsplit('.', 2)[:2]
+				if not _ownerAlive(_owner(name)[0], int(claimPid), path) :
+					claims.setdefault(name, []).append(path)
+			elif fileName.endswith(closedExt) :
+				name = fileName[:-len(closedExt)]
+				if not _ownerAlive(*_owner(name), path=path) :
+					closedFiles[name] = path
+				elif _owner(name) == (socket.gethostname().replace('_', '-'), os.getpid()) :
+					# A sequence this process finished exporting, with events left to retry
+					finished.add(name)
+		except ValueError :
+			continue
+
+	for name in running & finished :
+		claims.setdefault(name, [])
+	result = []
+	for name in sorted(claims) :
+		if name not in running or name in finished :
+			result.append( (ExportSpool(spoolDir, name), claims[name]) )
+	for name, closedFile in closedFiles.items() :
+		if name not in claims :
+			# Nothing left to send - tidy up the marker
+			try :
+				os.remove(closedFile)
+			except OSError :
+				pass
+	return result
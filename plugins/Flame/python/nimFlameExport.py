@@ -20,6 +20,8 @@ import json
 import xml.dom.minidom as minidom
 import shutil
 import subprocess
+import tempfile
+import threading
 import time
 
 try:
@@ -55,12 +57,21 @@ sys.path.append(nimScriptPath)
 try:
 	import nim_core.UI as nimUI
 	import nim_core.nim_api as nimAPI
+	import nim_core.nim_batch as nimBatch
 	import nim_core.nim_prefs as nimPrefs
+	import nim_core.nim_versions as nimVersions
 	import nim_core.nim_file as nimFile
+	import nim_core.nim_paths as nimPaths
 	import nim_core.nim as nim
 except:
 	print "NIM - Failed to load modules"
 
+import nimExportSpool
+import nimFlameSession
+import nimFolderScan
+import nimMediaProbe
+import nimOpenClip
+
 
 #  Import Python GUI packages :
 try : 
@@ -85,6 +96,12 @@ nimPrefs.mk_default( notify_success=True )
 flamePrefFile = os.path.normpath( os.path.join( nimPrefs.get_home(), "apps","Flame","flame.nim" ) )
 print "Flame Prefs: %s" % flamePrefFile
 
+# What the last "build openClips from folders" found, so the next run only probes what changed
+folderScanFile = os.path.normpath( os.path.join( nimPrefs.get_home(), "apps","Flame","openClipFolders.json" ) )
+
+# Registration events of sequence exports waiting to be sent to NIM
+exportSpoolDir = os.path.normpath( os.path.join( nimPrefs.get_home(), "apps","Flame","spool" ) )
+
 try :
 	# from libwiretapPythonClientAPI import *
 	nimExport_app = os.environ.get('NIM_APP', '-1')
@@ -97,9 +114,12 @@ class NimScanForVersionsDialog(QDialog):
 	# Reads NIM for openClips with elementTypes 
 	#	and updates with logged elements of matching types
 
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimScanForVersionsDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -159,7 +179,7 @@ class NimScanForVersionsDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -185,7 +205,7 @@ class NimScanForVersionsDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -355,14 +375,14 @@ class NimScanForVersionsDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateShow()
 		
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 		#print self.nim_shows
 
 		showIndex = 0
@@ -407,7 +427,7 @@ class NimScanForVersionsDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -436,38 +456,57 @@ class NimScanForVersionsDialog(QDialog):
 		self.clipCount = 0
 		self.clipFail = 0
 		
-		shots = nimAPI.get_shots(showID=self.nim_showID)
-		numShots = len(shots)
-		print "Shot count: %s" % numShots
-		self.progressBar.setRange(0, numShots)
-
 		self.nim_jobChooser.setDisabled(True)
 		self.nim_showChooser.setDisabled(True)
 		self.nim_updateChooser.setDisabled(True)
-		self._buttonbox.setDisabled(True)
+		# Cancel stays enabled to stop the scan
+		self._buttonbox.button(QDialogButtonBox.StandardButton.Ok).setDisabled(True)
 
 		print "Update All Elements: %s" % self.nim_updateAll
 
-		shotCount = 0
-		for shot in shots :
-			shotCount += 1
-			self.nimCommentLabel.setText( "Scanning shot: "+shot['name'] )
-			self.progressBar.setValue(shotCount)
-			QApplication.processEvents()
-			
+		# Scan the whole show at once - elements are fetched for all shots together
+		self.scanning = True
+		self.scanCancelled = False
+		try :
 			clipSucess = {}
-			clipSucess = nimScanForVersions(nim_shotID=shot['ID'], updateAll=self.nim_updateAll)
+			clipSucess = nimScanForVersions(nim_showID=self.nim_showID, updateAll=self.nim_updateAll, progress=self.scanProgress)
+		finally :
+			self.scanning = False
 
-			self.clipCount += clipSucess['clipCount']
-			self.clipFail += clipSucess['clipFail']
+		self.clipCount += clipSucess['clipCount']
+		self.clipFail += clipSucess['clipFail']
+
+		if self.scanCancelled :
+			print "NIM - Scan for Versions cancelled"
+			QDialog.reject(self)
+		else :
+			self.accept()
 
-		self.accept()
+
+	def reject(self):
+		'''Stop a scan in progress, or close the dialog'''
+		if getattr(self, 'scanning', False) :
+			self.scanCancelled = True
+			return
+		QDialog.reject(self)
+
+
+	def scanProgress(self, message, done, total):
+		'''Update the progress bar while scanning'''
+		self.nimCommentLabel.setText( message )
+		self.progressBar.setRange(0, total)
+		self.progressBar.setValue(done)
+		QApplication.processEvents()
+		return not self.scanCancelled
 
 
 class NimBuildOpenClipsFromElementDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimBuildOpenClipsFromElementDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -518,7 +557,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -543,7 +582,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -711,7 +750,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateServer()
 		self.nim_updateShow()
@@ -719,7 +758,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 
 	def nim_updateServer(self):
 		self.nim_servers = {}
-		self.nim_servers = nimAPI.get_jobServers(self.nim_jobID)
+		self.nim_servers = self.session.jobServers(self.nim_jobID)
 		self.nim_serverID = ''
 		self.nim_serverOSPath = ''
 		self.nim_serverDict = {}
@@ -744,7 +783,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 			serverID = self.nim_serverDict[serverName]
 			self.nim_serverID = serverID
 
-			serverInfo = nimAPI.get_serverOSPath(serverID, self.nim_OS)
+			serverInfo = self.session.serverOSPath(serverID, self.nim_OS)
 			if serverInfo:
 				if len(serverInfo)>0:
 					self.nim_serverOSPath = serverInfo[0]['serverOSPath']
@@ -757,7 +796,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 		#print self.nim_shows
 
 		showIndex = 0
@@ -802,7 +841,7 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -849,9 +888,12 @@ class NimBuildOpenClipsFromElementDialog(QDialog):
 
 
 class NimBuildOpenClipsFromProjectDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimBuildOpenClipsFromProjectDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -902,7 +944,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -927,7 +969,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -1117,7 +1159,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateServer()
 		self.nim_updateShow()
@@ -1125,7 +1167,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 
 	def nim_updateServer(self):
 		self.nim_servers = {}
-		self.nim_servers = nimAPI.get_jobServers(self.nim_jobID)
+		self.nim_servers = self.session.jobServers(self.nim_jobID)
 		self.nim_serverID = ''
 		self.nim_serverOSPath = ''
 		self.nim_serverDict = {}
@@ -1150,7 +1192,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 			serverID = self.nim_serverDict[serverName]
 			self.nim_serverID = serverID
 
-			serverInfo = nimAPI.get_serverOSPath(serverID, self.nim_OS)
+			serverInfo = self.session.serverOSPath(serverID, self.nim_OS)
 			if serverInfo:
 				if len(serverInfo)>0:
 					self.nim_serverOSPath = serverInfo[0]['serverOSPath']
@@ -1163,7 +1205,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 		#print self.nim_shows
 
 		showIndex = 0
@@ -1208,7 +1250,7 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -1242,30 +1284,32 @@ class NimBuildOpenClipsFromProjectDialog(QDialog):
 		useRenders = True
 		useComps = True
 
-		shotCount = 0
-		for shot in shots :
-			shotCount += 1
-			self.nimCommentLabel.setText( "Scanning shot: "+shot['name'] )
-			self.progressBar.setValue(shotCount)
-			QApplication.processEvents()
-			
-			folders = []
-			if usePlates :
-				folders.append('<nim_shot_plates>')
-			if useRenders :
-				folders.append('<nim_shot_render>')
-			if useComps :
-				folders.append('<nim_shot_comp>')
+		folders = []
+		if usePlates :
+			folders.append('<nim_shot_plates>')
+		if useRenders :
+			folders.append('<nim_shot_render>')
+		if useComps :
+			folders.append('<nim_shot_comp>')
 
-			clipSucess = {}
-			clipSucess = nimBuildOpenClipFromFolders(nim_shotID=shot['ID'], nim_serverID=self.nim_serverID, folders=folders)
+		# Scan the folders of every shot in one pass
+		clipSucess = {}
+		clipSucess = nimBuildOpenClipFromFolders(nim_showID=self.nim_showID, nim_serverID=self.nim_serverID, folders=folders, progress=self.scanProgress)
 
-			self.clipCount += clipSucess['clipCount']
-			self.clipFail += clipSucess['clipFail']
+		self.clipCount += clipSucess['clipCount']
+		self.clipFail += clipSucess['clipFail']
 
 		self.accept()
 
 
+	def scanProgress(self, message, done, total):
+		'''Update the progress bar while scanning'''
+		self.nimCommentLabel.setText( message )
+		self.progressBar.setRange(0, total)
+		self.progressBar.setValue(done)
+		QApplication.processEvents()
+
+
 class NimBatchExportDialog(QDialog):
 	def __init__(self, parent=None):
 		super(NimBatchExportDialog, self).__init__(parent)
@@ -1347,9 +1391,12 @@ class NimBatchExportDialog(QDialog):
 
 
 class NimExportSequenceDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimExportSequenceDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -1378,7 +1425,7 @@ class NimExportSequenceDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -1404,7 +1451,7 @@ class NimExportSequenceDialog(QDialog):
 		#Get NIM Element Types
 		self.nim_elementTypes = []
 		self.nim_elementTypesDict = {}
-		self.nim_elementTypes = nimAPI.get_elementTypes()
+		self.nim_elementTypes = self.session.elementTypes()
 		if len(self.nim_elementTypes)>0:
 			for element in self.nim_elementTypes:
 				self.nim_elementTypesDict[element['name']] = element['ID']
@@ -1423,7 +1470,7 @@ class NimExportSequenceDialog(QDialog):
 		self.nim_taskTypes = []
 		self.nim_taskTypesDict = {}
 		self.nim_taskFolderDict = {}
-		self.nim_taskTypes = nimAPI.get_tasks(app='FLAME', userType='all')
+		self.nim_taskTypes = self.session.taskTypes()
 		if len(self.nim_taskTypes)>0:
 			for task in self.nim_taskTypes:
 				self.nim_taskTypesDict[task['name']] = task['ID']
@@ -1436,7 +1483,7 @@ class NimExportSequenceDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -1853,7 +1900,7 @@ class NimExportSequenceDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateServer()
 		self.nim_updateShow()
@@ -1861,7 +1908,7 @@ class NimExportSequenceDialog(QDialog):
 
 	def nim_updateServer(self):
 		self.nim_servers = {}
-		self.nim_servers = nimAPI.get_jobServers(self.nim_jobID)
+		self.nim_servers = self.session.jobServers(self.nim_jobID)
 		self.nim_serverID = ''
 		self.nim_serverOSPath = ''
 		self.nim_serverDict = {}
@@ -1897,7 +1944,7 @@ class NimExportSequenceDialog(QDialog):
 			serverID = self.nim_serverDict[serverName]
 			self.nim_serverID = serverID
 
-			serverInfo = nimAPI.get_serverOSPath(serverID, self.nim_OS)
+			serverInfo = self.session.serverOSPath(serverID, self.nim_OS)
 			if serverInfo:
 				if len(serverInfo)>0:
 					self.nim_serverOSPath = serverInfo[0]['serverOSPath']
@@ -1910,7 +1957,7 @@ class NimExportSequenceDialog(QDialog):
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 
 		showIndex = 0
 		showIter = 0
@@ -1948,7 +1995,7 @@ class NimExportSequenceDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -2026,9 +2073,12 @@ class NimExportSequenceDialog(QDialog):
 
 
 class NimExportEditDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimExportEditDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -2058,7 +2108,7 @@ class NimExportEditDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -2082,7 +2132,7 @@ class NimExportEditDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -2301,7 +2351,7 @@ class NimExportEditDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateServer()
 		self.nim_updateShow()
@@ -2309,7 +2359,7 @@ class NimExportEditDialog(QDialog):
 
 	def nim_updateServer(self):
 		self.nim_servers = {}
-		self.nim_servers = nimAPI.get_jobServers(self.nim_jobID)
+		self.nim_servers = self.session.jobServers(self.nim_jobID)
 		self.nim_serverID = ''
 		self.nim_serverOSPath = ''
 		self.nim_serverDict = {}
@@ -2345,7 +2395,7 @@ class NimExportEditDialog(QDialog):
 			serverID = self.nim_serverDict[serverName]
 			self.nim_serverID = serverID
 
-			serverInfo = nimAPI.get_serverOSPath(serverID, self.nim_OS)
+			serverInfo = self.session.serverOSPath(serverID, self.nim_OS)
 			if serverInfo:
 				if len(serverInfo)>0:
 					self.nim_serverOSPath = serverInfo[0]['serverOSPath']
@@ -2358,7 +2408,7 @@ class NimExportEditDialog(QDialog):
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 		showIndex = 0
 		showIter = 0
 		self.nim_showDict = {}
@@ -2395,7 +2445,7 @@ class NimExportEditDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -2431,9 +2481,12 @@ class NimExportEditDialog(QDialog):
 
 
 class NimExportDailyDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, session=None):
 		super(NimExportDailyDialog, self).__init__(parent)
 
+		# NIM data shared by the Flame dialogs
+		self.session = session or nimFlameSession.session()
+
 		self.result = ""
 		QApplication.setOverrideCursor(Qt.ArrowCursor)
 		try:
@@ -2463,7 +2516,7 @@ class NimExportDailyDialog(QDialog):
 		self.nim_OS = platform.system()
 		
 		try:
-			self.nim_userID = nimAPI.get_userID(self.user)
+			self.nim_userID = self.session.userID(self.user)
 			if not self.nim_userID :
 				nimUI.GUI().update_user()
 				userInfo=nim.NIM().userInfo()
@@ -2487,7 +2540,7 @@ class NimExportDailyDialog(QDialog):
 
 		#Get NIM Jobs
 		self.nim_jobID = None
-		self.nim_jobs = nimAPI.get_jobs(self.nim_userID)
+		self.nim_jobs = self.session.jobs(self.nim_userID)
 		if not self.nim_jobs :
 			print "No Jobs Found"
 			self.nim_jobs["None"]="0"
@@ -2732,7 +2785,7 @@ class NimExportDailyDialog(QDialog):
 		#print "JOB CHANGED"
 		job = self.nim_jobChooser.currentText()
 		self.nim_jobID = self.nim_jobs[job]
-		self.nim_jobPaths = nimAPI.get_paths('job', self.nim_jobID)
+		self.nim_jobPaths = self.session.paths('job', self.nim_jobID)
 
 		self.nim_updateServer()
 		self.nim_updateShow()
@@ -2740,7 +2793,7 @@ class NimExportDailyDialog(QDialog):
 
 	def nim_updateServer(self):
 		self.nim_servers = {}
-		self.nim_servers = nimAPI.get_jobServers(self.nim_jobID)
+		self.nim_servers = self.session.jobServers(self.nim_jobID)
 		self.nim_serverID = ''
 		self.nim_serverOSPath = ''
 		self.nim_serverDict = {}
@@ -2776,7 +2829,7 @@ class NimExportDailyDialog(QDialog):
 			serverID = self.nim_serverDict[serverName]
 			self.nim_serverID = serverID
 
-			serverInfo = nimAPI.get_serverOSPath(serverID, self.nim_OS)
+			serverInfo = self.session.serverOSPath(serverID, self.nim_OS)
 			if serverInfo:
 				if len(serverInfo)>0:
 					self.nim_serverOSPath = serverInfo[0]['serverOSPath']
@@ -2789,7 +2842,7 @@ class NimExportDailyDialog(QDialog):
 
 	def nim_updateShow(self):
 		self.nim_shows = {}
-		self.nim_shows = nimAPI.get_shows(self.nim_jobID)
+		self.nim_shows = self.session.shows(self.nim_jobID)
 		showIndex = 0
 		showIter = 0
 		self.nim_showDict = {}
@@ -2826,7 +2879,7 @@ class NimExportDailyDialog(QDialog):
 			##set showID
 			self.nim_showID = showID
 
-			self.nim_showPaths = nimAPI.get_paths('show', showID)
+			self.nim_showPaths = self.session.paths('show', showID)
 			if self.nim_showPaths:
 				if len(self.nim_showPaths)>0:
 					#print "NIM: showPaths=", self.nim_showPaths
@@ -2951,8 +3004,9 @@ class NimExportDailyDialog(QDialog):
 		self.accept()
 
 
-def nimCreateShot(nim_showID=None, info=None) :
-	'''Create Shot in NIM on preAssetExport'''
+def nimCreateShot(nim_showID=None, info=None, nim_shotID=None) :
+	'''Create Shot in NIM on preAssetExport
+	   Pass the nim_shotID of a shot already created for another asset of the export to skip creating it again'''
 
 	# TODO: Needs to be Variable Project Structure Aware
 	#		Check if project is online
@@ -2960,7 +3014,6 @@ def nimCreateShot(nim_showID=None, info=None) :
 	result = {}
 
 	if nim_showID != None:
-		nim_shotID = False
 		nim_shotName = info['shotName']
 		nim_sourceIn = info['sourceIn']
 		nim_sourceOut = info['sourceOut']
@@ -2974,21 +3027,27 @@ def nimCreateShot(nim_showID=None, info=None) :
 
 		#TODO: If shotName is '' then set to assetName
 
-		print "NIM - Exporting Shot Info"
-		shotInfo = nimAPI.add_shot( showID=nim_showID, name=nim_shotName, frames=nim_duration )
-
-		if shotInfo['success'] == 'true':
+		if nim_shotID :
+			print "NIM - Shot already exported - nim_shotID: %s" % nim_shotID
 			result['success'] = True
-			nim_shotID = shotInfo['ID']
-			print "NIM - nim_shotID: %s" % nim_shotID
-			if 'error' in shotInfo:
-				print "NIM - WARNING: %s" % shotInfo['error']
-		else:
-			result['success'] = False
-			nim_shotID = False
-			if shotInfo['error']:
-				#error exists
-				print "NIM - ERROR: %s" % shotInfo['error']
+		else :
+			print "NIM - Exporting Shot Info"
+			shotInfo = nimAPI.add_shot( showID=nim_showID, name=nim_shotName, frames=nim_duration )
+
+			if shotInfo['success'] == 'true':
+				result['success'] = True
+				nim_shotID = shotInfo['ID']
+				print "NIM - nim_shotID: %s" % nim_shotID
+				# The shot may be new or renamed - don't resolve its paths from the cache
+				clearKeywordCache('shot', nim_shotID)
+				if 'error' in shotInfo:
+					print "NIM - WARNING: %s" % shotInfo['error']
+			else:
+				result['success'] = False
+				nim_shotID = False
+				if shotInfo['error']:
+					#error exists
+					print "NIM - ERROR: %s" % shotInfo['error']
 
 		if nim_shotID == False:
 			pass
@@ -3016,6 +3075,15 @@ def nimCreateShot(nim_showID=None, info=None) :
 	return result
 
 
+def _apiSucceeded(result=None) :
+	# Return True unless an API result is empty or reports success as false
+	if isinstance(result, list) and len(result) == 1 :
+		result = result[0]
+	if isinstance(result, dict) :
+		return str(result.get('success', 'true')).lower() != 'false'
+	return bool(result)
+
+
 def nimExportElement(nim_shotID=None, info=None, typeID='', nim_userID=None) :
 	# Export Elements in NIM on postAssetExport
 
@@ -3060,16 +3128,20 @@ def nimExportElement(nim_shotID=None, info=None, typeID='', nim_userID=None) :
 		element_result = nimAPI.add_element( parent='shot', parentID=nim_shotID, userID=nim_userID, typeID=typeID, path=nim_path, name=nim_name, \
 										startFrame=nim_sourceIn, endFrame=nim_sourceOut, handles=nim_handleIn, isPublished=False, metadata=metadata )
 
-		print "NIM - %s has been added in NIM." % (nim_assetType)
-		success = True
+		if _apiSucceeded(element_result) :
+			print "NIM - %s has been added in NIM." % (nim_assetType)
+			success = True
+		else :
+			print "NIM - Failed to add %s to NIM: %s" % (nim_assetType, element_result)
 	else:
 		print "NIM - shotID missing found"
 
 	return success
 
 
-def nimExportFile(nim_shotID=None, info=None, taskTypeID='', taskFolder='', serverID=None, nim_userID=None, tapeName='', comment='') :
+def nimExportFile(nim_shotID=None, info=None, taskTypeID='', taskFolder='', serverID=None, nim_userID=None, tapeName='', comment='', versionIndex=None) :
 	# Export File in NIM on postAssetExport
+	# Pass a nim_versions.VersionIndex shared by the files of an export so each basename's versions are fetched once
 
 	print "Exporting NIM File"
 	success = False
@@ -3131,33 +3203,32 @@ def nimExportFile(nim_shotID=None, info=None, taskTypeID='', taskFolder='', serv
 		# Verify entry is not duplicate of existing version
 		nim_doUpdate = False
 
-		# Get versions for basename
-		nim_versions = {}
-		nim_versionID = 0
-		nim_versions = nimAPI.get_vers(shotID=nim_shotID, basename=basename)
-		# print "Versions Returned: %s" % nim_versions
+		# Get versions for basename - fetched once per export by the version index
+		if versionIndex is None :
+			versionIndex = nimVersions.VersionIndex()
+		nim_versions = versionIndex.basename(parent='shot', parentID=nim_shotID, basename=basename)
 
 		# If file matching class / basename / filename / version
 		try:
-			if len(nim_versions)>0:
+			if nim_versions.fileIDs.get(filename) :
+				print "Existing Version Found"
+				nim_versionID = nim_versions.fileIDs[filename]
+				print "versionID: %s" % nim_versionID
+				nim_doUpdate = True
+
+			versionItem = nim_versions.first()
+			if versionItem :
 				print "Versions found" 
-				for versionItem in nim_versions:
-					if versionItem['filename'] == filename:
-						print "Existing Version Found"
-						nim_versionID = versionItem['fileID']
-						print "versionID: %s" % nim_versionID
-						nim_doUpdate = True
-
-					# Match previous taskTypeID, taskFolder, and serverID if not set
-					if taskTypeID == '' :
-						taskTypeID = versionItem['task_type_ID']
-						print "taskTypeID: %s" % taskTypeID
-					if taskFolder == '' :
-						taskFolder = versionItem['task_type_folder']
-						print "taskFolder: %s" % taskFolder
-					if not serverID :
-						serverID = versionItem['serverID']
-						print "serverID: %s" % serverID
+				# Match previous taskTypeID, taskFolder, and serverID if not set
+				if taskTypeID == '' :
+					taskTypeID = versionItem['task_type_ID']
+					print "taskTypeID: %s" % taskTypeID
+				if taskFolder == '' :
+					taskFolder = versionItem['task_type_folder']
+					print "taskFolder: %s" % taskFolder
+				if not serverID :
+					serverID = versionItem['serverID']
+					print "serverID: %s" % serverID
 			else:
 				print "No existing versions found"
 		except:
@@ -3189,22 +3260,126 @@ def nimExportFile(nim_shotID=None, info=None, taskTypeID='', taskFolder='', serv
 		metadata = json.dumps(metadata)
 
 		if nim_doSave is True:
-			if nim_doUpdate is True:
-				print "Updating file data in NIM"
-				file_apiResult = nimAPI.update_file( ID=nim_versionID, task_type_ID=taskTypeID, task_folder=taskFolder, userID=nim_userID, \
-														basename=basename, filename=filename, path=filepath, ext=ext, version=version, \
-														comment=comment, serverID=serverID, pub=pub, forceLink=forceLink, work=work, metadata=metadata )
-				print file_apiResult
-			else:
-				print "Saving file data to NIM"
-				file_apiResult = nimAPI.save_file( parent='shot', parentID=nim_shotID, task_type_ID=taskTypeID, task_folder=taskFolder, userID=nim_userID, \
+			# Updates the existing version with this filename, or saves a new one and adds it to the index
+			file_apiResult = versionIndex.log_file( parent='shot', parentID=nim_shotID, task_type_ID=taskTypeID, task_folder=taskFolder, userID=nim_userID, \
 													basename=basename, filename=filename, path=filepath, ext=ext, version=version, \
 													comment=comment, serverID=serverID, pub=pub, forceLink=forceLink, work=work, metadata=metadata )
-				print file_apiResult
+			print file_apiResult
+			success = _apiSucceeded(file_apiResult)
+		else :
+			# Nothing to log - sending it again won't change that
+			success = True
 
 	return success
 
 
+def nimStartExportEvents() :
+	# Start the spool of registration events for a sequence export - returns its name
+	# Events left behind by an earlier export that died are sent first
+	nimReplayExportEvents()
+	return nimExportSpool.newSpoolName()
+
+
+def nimQueueExportEvent(spoolName='', event=None) :
+	# Spool an element or file registration to be sent when the sequence export is done
+	# Events that arrive after that - from a background job - are sent right away
+	spool = nimExportSpool.ExportSpool(exportSpoolDir, spoolName)
+	spool.add(event)
+	if spool.closed() :
+		nimFlushExportEvents(spoolName=spoolName)
+	return True
+
+
+def nimFlushExportEvents(spoolName='', close=False, progress=None) :
+	# Send the spooled events of a sequence export to NIM
+	# Pass close=True once the sequence is done, so that later events are sent as they arrive
+	spool = nimExportSpool.ExportSpool(exportSpoolDir, spoolName)
+	if close :
+		spool.close()
+	claimed = spool.claim()
+	if claimed is None :
+		return {'sent':0, 'failed':0}
+	return _sendExportEvents(spool, claimed, progress=progress)
+
+
+def nimReplayExportEvents(progress=None) :
+	# Send the events of exports that died before their spool was flushed
+	results = {'sent':0, 'failed':0}
+	for spool, claims in nimExportSpool.abandoned(exportSpoolDir) :
+		print "NIM: Replaying export events from %s" % spool.name
+		claimed = spool.claim()
+		if claimed is not None :
+			claims.append(claimed)
+		for claimed in claims :
+			result = _sendExportEvents(spool, claimed, progress=progress)
+			results['sent'] += result['sent']
+			results['failed'] += result['failed']
+	return results
+
+
+def _sendExportEvents(spool=None, claimed='', progress=None) :
+	# Send the events of a claimed spool file, one job per shot on the NIM worker pool
+	# Each shot's events are sent in the order they were spooled - if one fails the shot's
+	# remaining events are put back in the spool to be tried again
+	events = nimExportSpool.read(claimed)
+	shotEvents = {}
+	shotOrder = []
+	for event in events :
+		shotKey = str(event.get('nim_shotID'))
+		if shotKey not in shotEvents :
+			shotEvents[shotKey] = []
+			shotOrder.append(shotKey)
+		shotEvents[shotKey].append(event)
+
+	retry = []
+	lock = threading.Lock()
+	sent = [0]
+	versionIndex = nimVersions.VersionIndex()
+
+	def _sendShotEvents(shotKey) :
+		events = shotEvents[shotKey]
+		for eventIndex in range(len(events)) :
+			event = events[eventIndex]
+			try :
+				success = _sendExportEvent(event, versionIndex)
+			except Exception :
+				print '%s' % traceback.format_exc()
+				success = False
+			if not success :
+				print "NIM: Failed to send %s export event for shot %s" % (event.get('type'), shotKey)
+				with lock :
+					retry.extend(events[eventIndex:])
+				return False
+			with lock :
+				nimExportSpool.markDone(claimed, event)
+				sent[0] += 1
+		return True
+
+	batch = nimBatch.Batch()
+	for shotKey in shotOrder :
+		batch.add(shotKey, _sendShotEvents, args=(shotKey,))
+	batch.run(progress=progress)
+
+	retry.sort(key=lambda event: event['index'])
+	dropped = nimExportSpool.release(claimed, spool, retry)
+	for event in dropped :
+		print "NIM: Giving up on %s export event for shot %s after %s attempts" % (event.get('type'), event.get('nim_shotID'), event['attempts'])
+	return {'sent':sent[0], 'failed':len(retry)}
+
+
+def _sendExportEvent(event=None, versionIndex=None) :
+	# Send one spooled registration event to NIM - returns False if NIM didn't accept it
+	if event['type'] == 'element' :
+		return nimExportElement( nim_shotID=event['nim_shotID'], info=event['info'], typeID=event['typeID'], nim_userID=event['nim_userID'] )
+	elif event['type'] == 'file' :
+		return nimExportFile( nim_shotID=event['nim_shotID'], info=event['info'], taskTypeID=event['taskTypeID'], \
+						taskFolder=event['taskFolder'], serverID=event['serverID'], nim_userID=event['nim_userID'], \
+						tapeName=event['tapeName'], comment=event['comment'], versionIndex=versionIndex )
+	else :
+		print "NIM: Unknown export event type %s - skipping" % event['type']
+	return True
+
+
 def nimAddBatchExport(info=None, comment='') :
 	'''Determine NIM shot from associated openClip, then log elements and files'''
 
@@ -3308,7 +3483,7 @@ def uploadEdit(nim_showID=None, mov_path='') :
 			#result = nimAPI.upload_edit(showID=nim_showID, path=mov_path)
 			result = nimAPI.upload_reviewItem( itemID=nim_showID, itemType='show', path=mov_path )
 			print result
-			success = True
+			success = _apiSucceeded(result)
 		else :
 			status_msg = "NIM - upload_reviewItem missing movie path"
 	else :
@@ -3326,7 +3501,7 @@ def uploadDaily(nim_taskID=None, mov_path='') :
 			#result = nimAPI.upload_dailies(taskID=nim_taskID, path=mov_path)
 			result = nimAPI.upload_reviewItem( itemID=nim_taskID, itemType='task', path=mov_path )
 			print result
-			success = True
+			success = _apiSucceeded(result)
 		else :
 			status_msg = "NIM - upload_reviewItem missing movie path"
 	else :
@@ -3335,13 +3510,121 @@ def uploadDaily(nim_taskID=None, mov_path='') :
 	return success
 
 
-def nimScanForVersions(nim_showID=None, nim_shotID=None, updateAll=0) :
-	# find_elements in show with metadata flameAssetType : batchOpenClip
-	# get element type
-	# find all elements of type in shot
-	# print "nimScanForVersions"
+def nimPostExportSequence(shotData=None, destinationPath='', uploads=None, progress=None) :
+	# Upload the shot icons, resolve the keywords of the batch export nodes and upload the
+	# edits and dailies of an exported sequence, all at once on the NIM worker pool
+	# nim_client limits how many uploads go to the NIM server at the same time
+	#	shotData - the shotData built by the export hooks, { shotName : { assetType : itemData } }
+	#	uploads - ( 'edit', showID, mov_path ) and ( 'daily', taskID, mov_path ) review items
+	# Shots of the sequence that share a NIM shot get one icon upload
+	# Returns a summary - { task type : { 'done' : count, 'skipped' : count, 'failed' : count } }
+	batch = nimBatch.Batch()
+	iconShots = {}
+
+	def _uploadIcon(nim_shotID, nim_iconPath) :
+		if updateShotIcon(nim_shotID=nim_shotID, image_path=nim_iconPath) :
+			return 'done'
+		return 'failed'
+
+	def _skipIcon(nim_shotID, nim_iconPath) :
+		print "NIM - Icon is already being uploaded for shotID: %s - skipping %s" % (nim_shotID, nim_iconPath)
+		return 'skipped'
+
+	def _resolveBatch(nim_shotID, batchPath) :
+		if resolveBatchKeywords(nim_shotID=nim_shotID, batch_path=batchPath) :
+			return 'done'
+		return 'failed'
+
+	def _uploadReview(uploadType, itemID, mov_path) :
+		if uploadType == 'edit' :
+			success = uploadEdit(nim_showID=itemID, mov_path=mov_path)
+		else :
+			success = uploadDaily(nim_taskID=itemID, mov_path=mov_path)
+		if success :
+			return 'done'
+		return 'failed'
+
+	for shotName in shotData or {} :
+		for assetType in shotData[shotName] :
+			itemData = shotData[shotName][assetType]
+
+			# Update Icons
+			if assetType == 'video' and itemData.get('nim_shotID') and itemData.get('nim_iconPath') :
+				nim_shotID = str(itemData['nim_shotID'])
+				if nim_shotID in iconShots :
+					batch.add('icon %s' % shotName, _skipIcon, args=(nim_shotID, itemData['nim_iconPath']))
+				else :
+					iconShots[nim_shotID] = shotName
+					batch.add('icon %s' % shotName, _uploadIcon, args=(itemData['nim_shotID'], itemData['nim_iconPath']))
+
+			# Resolve keywords in Batch export_node files
+			if assetType == 'batch' :
+				batchPath = os.path.join(destinationPath, itemData['resolvedPath'])
+				batch.add('batch %s' % shotName, _resolveBatch, args=(itemData.get('nim_shotID'), batchPath))
+
+	for uploadType, itemID, mov_path in uploads or [] :
+		batch.add('%s %s' % (uploadType, len(batch)), _uploadReview, args=(uploadType, itemID, mov_path))
+
+	batch.run(progress=progress)
+
+	# Summarise what was done by task type
+	summary = {}
+	for job in batch.jobs() :
+		key = job.key
+		taskType = key.split(' ')[0]
+		counts = summary.setdefault(taskType, {'done':0, 'skipped':0, 'failed':0})
+		status = job.result if job.state == 'done' else 'failed'
+		counts[status] += 1
+		if status == 'failed' and job.error :
+			print "NIM - %s failed - %s" % (key, job.error)
+	for taskType in sorted(summary) :
+		counts = summary[taskType]
+		print "NIM - %s: %s done, %s skipped, %s failed" % (taskType, counts['done'], counts['skipped'], counts['failed'])
+	return summary
+
+
+def nimFindShotElements(shotIDs=None, progress=None) :
+	# Fetch every element of each shot - one query per shot, run on the NIM worker pool
+	# Returns a dictionary of element lists by shotID
+	batch = nimBatch.Batch()
+	for shotID in shotIDs or [] :
+		if str(shotID) not in batch :
+			batch.add(str(shotID), nimAPI.find_elements, kwargs={'shotID':shotID})
+
+	def batchProgress(done, total) :
+		if progress :
+			return progress("Finding elements", done, total)
+
+	batch.run(progress=batchProgress)
+	for job in batch.failed() :
+		print "NIM: Failed to find elements for shotID %s - %s" % (job.key, job.error)
+
+	shotElements = {}
+	for shotID in shotIDs or [] :
+		elements = batch.result(str(shotID))
+		if isinstance(elements, list) :
+			shotElements[str(shotID)] = elements
+	return shotElements
+
+
+def nimScanForVersions(nim_showID=None, nim_shotID=None, updateAll=0, progress=None) :
+	# Add new elements to the openClips of the same element type in their shot
+	# All elements are fetched up front, grouped by shot and element type in memory,
+	# and the elements' flameUsedInClip metadata is updated once every clip is done
+	# progress is called with a message, the number of steps done and the total -
+	# return False from it to stop, leaving the clips not reached yet and the metadata as they are
 	clipCount = 0
 	clipFail = 0
+	cancelled = [False]
+
+	def scanProgress(message, done, total) :
+		if progress and progress(message, done, total) is False :
+			cancelled[0] = True
+			return False
+		return True
+
+	def scanResult() :
+		return {'clipCount':clipCount, 'clipFail':clipFail}
 
 	shots = []
 	if nim_showID :
@@ -3349,109 +3632,146 @@ def nimScanForVersions(nim_showID=None, nim_shotID=None, updateAll=0) :
 	if nim_shotID :
 		shots.append( {'ID':nim_shotID} )
 
-	# Iterate through shots in show
-	for shot in shots :
-		if 'ID' in shot :
-			nim_shotID = shot['ID']
-
-			# Get Elements By extension
-			openClipElements = nimAPI.find_elements(shotID=nim_shotID, ext='.clip')
-			# print json.dumps(openClipElements)
-
-			for openClipElement in openClipElements :
-				clipID = openClipElement['ID']
-				shotID = openClipElement['shotID']
-				clipPath = openClipElement['path'].encode('utf-8')
-				clipName = openClipElement['name'].encode('utf-8')
-				clipFile = os.path.join(clipPath,clipName)
-
-				elementTypeID = openClipElement['elementTypeID']
-				elements = nimAPI.find_elements(shotID=shotID, elementTypeID=elementTypeID)
-					
-
-				# print "Elements found"
-				# print json.dumps(elements)
-
-				for element in elements :
-					if element['ID'] != clipID and element['name'].endswith('.clip') == False :
-
-						appendElement = True
-						elementMetadata = json.loads(element['metadata'])
-						
-						clipUsed = False
-						usedClipIDs = []
-
-						# flameUsedInClip metadata is an array of fileIDs relating to 
-						# the clips that this item has been imported into
-						if len(elementMetadata)>0 and elementMetadata.has_key('flameUsedInClip') :
-							# print "flameUsedInClip Found"
-							usedClipIDs = json.loads(elementMetadata['flameUsedInClip'])
-							# print usedClipIDs
-
-							if len(usedClipIDs)>0 and isinstance(usedClipIDs, list) :
-								for usedClipID in usedClipIDs :
-									if usedClipID == clipID :
-										# print "clipID found"
-										clipUsed = True
-							else :
-								# print "usedClipIDs is not list"
-								pass
-
-						if updateAll is 0 and clipUsed is True :
-							appendElement = False
-							print "Element %s has been already added to clip %s... Skipping" % (element['name'], clipName)
-						
-						if appendElement :
-							# print "New Element found for shotID %s" % shotID
-							elementPath = element['path'].encode('utf-8')
-							elementName = element['name'].encode('utf-8')
-							
-							# Update elementPath using server os resolution
-							# print "Raw Element Path: %s" % elementPath
-							elementPath = resolveServerOsPath(path=elementPath)
-							# print "OS Element Path: %s" % elementPath
-							
-							fullPath = os.path.join(elementPath,elementName)
-							# print "Full Path: %s" % fullPath
-
-							# If sequence with name.frame.ext format, replace frame with *
-							# This will limit dl_get_media_info failure when finding subfolders
-							elementExt = os.path.splitext(elementName)[1]
-							elementBasename = elementName.rpartition('.')[0].rpartition('.')[0]
-							elementWildcard = elementBasename+".*"+elementExt
-							# print "elementWildcard: %s" % elementWildcard
-						
-
-							clipUpdated = updateOpenClip( masterFile=clipFile, elementPath=elementPath, \
-															elementName=elementName, elementWildcard=elementWildcard, recursive=False )
-							
-							# Possible that clip was already part of OpenClip but did not have metadata
-							# If key doesn't exist in metadata then update metadata
-							if clipUsed is False :
-								usedClipIDs.append(clipID)
-
-								# Update Element Metadata to mark as used in openClip
-								# print "Updating Element with new metadata"
-								elementMetadata['flameUsedInClip'] = json.dumps(usedClipIDs)
-
-								elementMetadata = json.dumps(elementMetadata)
-								# print "Updated elementMetadata: %s" % elementMetadata
-
-								# print "Element ID being updated: %s" % element['ID']
-								elementUpdate = nimAPI.update_element(ID=element['ID'], metadata=elementMetadata)
-								# print json.dumps(elementUpdate)
-
-
-							if clipUpdated :
-								if clipUpdated == -1 :
-									clipFail += 1
-								else :
-									clipCount += 1
-
-	clipSucess = {}
-	clipSucess['clipCount'] = clipCount
-	clipSucess['clipFail'] = clipFail
-	return clipSucess
+	shotIDs = [shot['ID'] for shot in shots if 'ID' in shot]
+	shotElements = nimFindShotElements(shotIDs=shotIDs, progress=scanProgress)
+	if cancelled[0] :
+		return scanResult()
+
+	# Group the elements by shot and element type
+	openClipElements = []
+	typeElements = {}
+	for shotID in shotIDs :
+		for element in shotElements.get(str(shotID), []) :
+			if element['name'].endswith('.clip') :
+				openClipElements.append( (shotID, element) )
+			else :
+				typeElements.setdefault( (str(shotID), str(element['elementTypeID'])), [] ).append(element)
+
+	# Resolve each element path to this OS in one pass through the cached server table
+	rawPaths = []
+	for elements in typeElements.values() :
+		for element in elements :
+			rawPaths.append(element['path'].encode('utf-8'))
+	osPaths = dict( zip(rawPaths, resolveServerOsPaths(paths=rawPaths)) )
+
+	# flameUsedInClip metadata is an array of fileIDs relating to
+	# the clips that this item has been imported into
+	elementMetadata = {}
+	usedClipIDs = {}
+	for elements in typeElements.values() :
+		for element in elements :
+			try :
+				metadata = json.loads(element['metadata'])
+			except (TypeError, ValueError) :
+				metadata = {}
+			if not isinstance(metadata, dict) :
+				metadata = {}
+			clipIDs = []
+			if 'flameUsedInClip' in metadata :
+				try :
+					clipIDs = json.loads(metadata['flameUsedInClip'])
+				except (TypeError, ValueError) :
+					clipIDs = []
+				if not isinstance(clipIDs, list) :
+					# print "usedClipIDs is not list"
+					clipIDs = []
+			elementMetadata[element['ID']] = metadata
+			usedClipIDs[element['ID']] = clipIDs
+
+	# Work out which elements to add to each openClip
+	clipPlans = []
+	for shotID, openClipElement in openClipElements :
+		clipID = openClipElement['ID']
+		clipPath = openClipElement['path'].encode('utf-8')
+		clipName = openClipElement['name'].encode('utf-8')
+		clipFile = os.path.join(clipPath,clipName)
+
+		elementTypeID = openClipElement['elementTypeID']
+		clipElements = []
+		for element in typeElements.get( (str(shotID), str(elementTypeID)), [] ) :
+			if element['ID'] == clipID :
+				continue
+
+			clipUsed = clipID in usedClipIDs[element['ID']]
+			if updateAll is 0 and clipUsed is True :
+				print "Element %s has been already added to clip %s... Skipping" % (element['name'], clipName)
+				continue
+
+			elementPath = element['path'].encode('utf-8')
+			elementName = element['name'].encode('utf-8')
+
+			# Update elementPath using server os resolution
+			elementPath = osPaths.get(elementPath, elementPath)
+
+			# If sequence with name.frame.ext format, replace frame with *
+			# This will limit dl_get_media_info failure when finding subfolders
+			elementExt = os.path.splitext(elementName)[1]
+			elementBasename = elementName.rpartition('.')[0].rpartition('.')[0]
+			elementWildcard = elementBasename+".*"+elementExt
+
+			clipElements.append( (element['ID'], clipUsed, elementPath, elementName, elementWildcard) )
+		clipPlans.append( (clipID, clipFile, clipName, clipElements) )
+
+	# Probe the media of every element to be added at once
+	if scanProgress("Reading media", 0, 1) is False :
+		return scanResult()
+	prefetchOpenClipMedia( [ (elementPath, elementName, elementWildcard) \
+								for clipID, clipFile, clipName, clipElements in clipPlans \
+								for elementID, clipUsed, elementPath, elementName, elementWildcard in clipElements ] )
+
+	updatedElements = []
+	clipIndex = 0
+	for clipID, clipFile, clipName, clipElements in clipPlans :
+		clipIndex += 1
+		if scanProgress("Updating %s" % clipName, clipIndex, len(clipPlans)) is False :
+			return scanResult()
+
+		# Add every new element to the clip in memory, then write it once
+		openClip = loadOpenClip(clipFile)
+		if openClip is None :
+			clipFail += 1
+			continue
+		usedElements = []
+		addedCount = 0
+		for elementID, clipUsed, elementPath, elementName, elementWildcard in clipElements :
+			clipUpdated = updateOpenClip( masterFile=clipFile, elementPath=elementPath, \
+											elementName=elementName, elementWildcard=elementWildcard, recursive=False, openClip=openClip )
+
+			# Possible that clip was already part of OpenClip but did not have metadata
+			# Mark the element as used in this openClip, once the clip is written
+			if clipUsed is False :
+				usedElements.append(elementID)
+
+			if clipUpdated :
+				if clipUpdated == -1 :
+					clipFail += 1
+				else :
+					addedCount += 1
+
+		if saveOpenClip(openClip) == -1 :
+			clipFail += 1
+			continue
+		clipCount += addedCount
+		for elementID in usedElements :
+			usedClipIDs[elementID].append(clipID)
+			if elementID not in updatedElements :
+				updatedElements.append(elementID)
+
+	# Update the metadata of every element added to a clip, on the NIM worker pool
+	batch = nimBatch.Batch()
+	for elementID in updatedElements :
+		metadata = elementMetadata[elementID]
+		metadata['flameUsedInClip'] = json.dumps(usedClipIDs[elementID])
+		batch.add(str(elementID), nimAPI.update_element, kwargs={'ID':elementID, 'metadata':json.dumps(metadata)})
+
+	def batchProgress(done, total) :
+		return scanProgress("Updating element metadata", done, total)
+
+	batch.run(progress=batchProgress)
+	for job in batch.failed() :
+		print "NIM: Failed to update metadata for element %s - %s" % (job.key, job.error)
+
+	return scanResult()
 	
 
 def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=None) :
@@ -3478,6 +3798,9 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 	elementTypes = []
 	elementTypesDict = {}
 	elementTypes = nimAPI.get_elementTypes()
+
+	# Fetch the keywords of every shot at once
+	nimPrefetchKeywords( [shot['ID'] for shot in shots if 'ID' in shot] )
 	
 	# Iterate through shots in show
 	for shot in shots :
@@ -3485,6 +3808,12 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 			nim_shotID = shot['ID']
 			nim_shotName = shot['name']
 			print "Looking for elements in shot %s" % nim_shotName
+
+			# Create new openClip from comp path and elementTypeName
+			nim_comp_path = os.path.join(serverOSPath,"<nim_shot_comp>")
+			nim_comp_path = nimResolvePath(nim_shotID=nim_shotID, keyword_string=nim_comp_path)
+			# print "nim_comp_path: %s" % nim_comp_path
+
 			# Iterate through elements types to find nim elements
 			if len(elementTypes)>0:
 				for elementType in elementTypes:
@@ -3495,15 +3824,23 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 					elements = nimAPI.find_elements(shotID=nim_shotID, elementTypeID=elementTypeID)
 					openClipElements = nimAPI.find_elements( shotID=nim_shotID, ext='.clip', elementTypeID=elementTypeID )
 
-					# Create new openClip from comp path and elementTypeName
-					nim_comp_path = os.path.join(serverOSPath,"<nim_shot_comp>")
-					nim_comp_path = nimResolvePath(nim_shotID=nim_shotID, keyword_string=nim_comp_path)
-					# print "nim_comp_path: %s" % nim_comp_path
-
 					clipPath = nim_comp_path.encode('utf-8')
 					clipName = nim_shotName +"_nimElement_"+ elementTypeName +".clip"
 					clipFile = os.path.join(clipPath,clipName)
 
+					# Probe the media of all the elements at once
+					openClipIDs = [openClipElement['ID'] for openClipElement in openClipElements]
+					prefetchElements = []
+					for element in elements :
+						if element['ID'] not in openClipIDs :
+							elementName = element['name'].encode('utf-8')
+							elementExt = os.path.splitext(elementName)[1]
+							elementBasename = elementName.rpartition('.')[0].rpartition('.')[0]
+							prefetchElements.append( (resolveServerOsPath(element['path'].encode('utf-8')), elementName, elementBasename+".*"+elementExt) )
+					prefetchOpenClipMedia(prefetchElements)
+
+					# Add every new element to the clip in memory, then write it once
+					openClip = loadOpenClip(clipFile)
 					for element in elements :
 						# Compare to make sure not recursively adding openClip elements
 						isOpenClip = False
@@ -3533,7 +3870,7 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 							# print "elementWildcard: %s" % elementWildcard
 
 							clipUpdated = updateOpenClip( masterFile=clipFile, elementPath=elementPath, \
-														elementName=elementName, elementWildcard=elementWildcard, recursive=False )
+														elementName=elementName, elementWildcard=elementWildcard, recursive=False, openClip=openClip )
 							if clipUpdated :
 								# TODO: Add newly created openClip to shot elements
 								# 		found_clips = nimAPI.find_elements(name=clipName, shotID=nim_shotID)
@@ -3544,6 +3881,9 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 										clipFail += 1
 									else :
 										clipCount += 1
+
+					if saveOpenClip(openClip) == -1 :
+						clipFail += 1
 	
 	clipSucess = {}
 	clipSucess['clipCount'] = clipCount
@@ -3551,10 +3891,12 @@ def nimBuildOpenClipFromElements(nim_showID=None, nim_shotID=None, nim_serverID=
 	return clipSucess					
 
 
-def nimBuildOpenClipFromFolders(nim_showID=None, nim_shotID=None, nim_serverID=None, folders=None) :
+def nimBuildOpenClipFromFolders(nim_showID=None, nim_shotID=None, nim_serverID=None, folders=None, progress=None) :
 	# Find all root folders for given show (comp, render, plates)
 	# Update existing openClips with contents of folders
 	# Create newClip if no matching type
+	# Only subfolders that are new or changed since the last run are probed - see nimFolderScan
+	# progress(message, done, total) is called as each clip is updated - return False to stop
 	clipCount = 0
 	clipFail = 0
 
@@ -3568,13 +3910,16 @@ def nimBuildOpenClipFromFolders(nim_showID=None, nim_shotID=None, nim_serverID=N
 		shots = []
 		if shotInfo :
 			shots.append( {'ID':nim_shotID, 'name':shotInfo[0]['shotName'] } )
-	
-	# Iterate through shots in show or single shot
+
+	# Fetch the keywords of every shot at once
+	nimPrefetchKeywords( [shot['ID'] for shot in shots if 'ID' in shot] )
+
+	# Resolve the folder of every clip to build
+	clipPlans = []
 	for shot in shots :
 		if 'ID' in shot :
 			nim_shotID = shot['ID']
 			nim_shotName = shot['name']
-			print "Looking for elements in shot %s" % nim_shotName
 			# Iterate through elements types to find nim elements
 			if len(folders)>0:
 				for folder in folders:
@@ -3594,39 +3939,73 @@ def nimBuildOpenClipFromFolders(nim_showID=None, nim_shotID=None, nim_serverID=N
 					clipPath = nim_folder_path.encode('utf-8')
 					clipName = nim_shotName+"_nimProject_"+folderName+".clip"
 					clipFile = os.path.join(clipPath,clipName)
-					
-					# Get Subfolders in nim_folder_path
-					subfolders = []
-					
-					for root, dirs, files in os.walk(nim_folder_path, topdown=False) :
-						for name in dirs :
-							subfolders.append(os.path.join(root, name))
-					
-					for subfolder in subfolders :
-						print("------folder iteration------------------------------------------------------------->")
+					clipPlans.append( (nim_shotName, clipPath, clipName, clipFile) )
+
+	# Walk the folders of every shot at once, listing only the folders that changed
+	if progress :
+		progress("Scanning folders", 0, 1)
+	folderScan = nimFolderScan.FolderScan(folderScanFile)
+	scannedFolders = folderScan.walk_all( [clipPath for shotName, clipPath, clipName, clipFile in clipPlans] )
+
+	clipIndex = 0
+	for shotName, clipPath, clipName, clipFile in clipPlans :
+		clipIndex += 1
+		if progress and progress("Scanning shot: %s" % shotName, clipIndex, len(clipPlans)) is False :
+			break
+		print "Looking for elements in shot %s" % shotName
+
+		# Get the subfolders that are new or changed since they were last added to the clip
+		found = scannedFolders.get(clipPath, [])
+		subfolders = folderScan.changed(clipFile, found)
+		if not subfolders :
+			print "No new or changed folders for %s" % clipName
+			folderScan.record(clipFile, keep=[subfolder for subfolder, fingerprint in found])
+			continue
+
+		# Probe the media of all the subfolders at once
+		probeResults = prefetchOpenClipMedia( [ (resolveServerOsPath(subfolder), subfolder.rpartition('/')[2], '') \
+													for subfolder in subfolders ] )
+
+		# Add every subfolder to the clip in memory, then write it once
+		openClip = loadOpenClip(clipFile)
+		scanned = []
+		for subfolder in subfolders :
+			print("------folder iteration------------------------------------------------------------->")
+
+			elementPath = subfolder
+			elementName = subfolder.rpartition('/')[2]
+			
+			# Update elementPath using server os resolution
+			# print "Raw Element Path: %s" % elementPath
+			elementPath = resolveServerOsPath(elementPath)
+			# print "OS ElementPath: %s" % elementPath
+			
+			# print "clipFile: %s" % clipFile
+
+			clipUpdated = updateOpenClip( masterFile=clipFile, elementPath=elementPath, \
+											elementName=elementName, recursive=False, openClip=openClip )
+			if clipUpdated :
+				# TODO: Add newly created openClip to shot elements
+				# 		found_clips = nimAPI.find_elements(name=clipName, shotID=nim_shotID)
+				#		if len(found_clips) == 0 :
+				#			nimAPI.add_elements()
+				if clipUpdated == -1 :
+					clipFail += 1
+				else :
+					clipCount += 1
 
-						elementPath = subfolder.encode('utf-8')
-						elementName = subfolder.rpartition('/')[2].encode('utf-8')
-						
-						# Update elementPath using server os resolution
-						# print "Raw Element Path: %s" % elementPath
-						elementPath = resolveServerOsPath(elementPath)
-						# print "OS ElementPath: %s" % elementPath
-						
-						# print "clipFile: %s" % clipFile
-
-						clipUpdated = updateOpenClip( masterFile=clipFile, elementPath=elementPath, \
-														elementName=elementName, recursive=False )
-						if clipUpdated :
-							# TODO: Add newly created openClip to shot elements
-							# 		found_clips = nimAPI.find_elements(name=clipName, shotID=nim_shotID)
-							#		if len(found_clips) == 0 :
-							#			nimAPI.add_elements()
-							if clipUpdated == -1 :
-								clipFail += 1
-							else :
-								clipCount += 1
-					
+			# Probe again next time if the probe failed or timed out
+			probeResult = (probeResults or {}).get( os.path.abspath(elementPath) )
+			if probeResults is not None and clipUpdated != -1 and not (probeResult and probeResult.timedOut) :
+				scanned.append(subfolder)
+
+		if saveOpenClip(openClip) == -1 :
+			clipFail += 1
+		elif openClip is not None :
+			folderScan.record(clipFile, [(subfolder, fingerprint) for subfolder, fingerprint in found if subfolder in scanned], \
+								keep=[subfolder for subfolder, fingerprint in found])
+
+	folderScan.save()
 
 	clipSucess = {}
 	clipSucess['clipCount'] = clipCount
@@ -3634,82 +4013,246 @@ def nimBuildOpenClipFromFolders(nim_showID=None, nim_shotID=None, nim_serverID=N
 	return clipSucess					
 
 
-def nimResolvePath(nim_jobID=None, nim_showID=None, nim_shotID=None, keyword_string='', tokenL='<', tokenR='>') :
-
+# Resolved nim_* keywords, cached per shot, show and job
+# Each entry is ( time fetched, parent ID, keyword dictionary )
+keywordTTL = 300.0
+_keywordCache = {}
+_keywordFlights = {}
+_keywordLock = threading.Lock()
+_keywordPatterns = {}
+
+
+class _KeywordFlight(object) :
+	'''A keyword fetch in progress, shared by every caller asking for the same item'''
+	def __init__(self) :
+		self.done = threading.Event()
+		self.result = (None, {})
+		self.error = None
+
+
+def _cachedKeywords(item='', ID=None, fetch=None) :
+	# Return the cached ( parentID, keywords ) for an item, fetching them if missing or stale
+	# Concurrent callers share one fetch, and only tables NIM returned in full are cached
+	key = (item, str(ID))
+	with _keywordLock :
+		cached = _keywordCache.get(key)
+		if cached and time.time()-cached[0] < keywordTTL :
+			return cached[1], cached[2]
+		flight = _keywordFlights.get(key)
+		leader = flight is None
+		if leader :
+			flight = _keywordFlights[key] = _KeywordFlight()
+
+	# Wait for the caller that is already fetching this item
+	if not leader :
+		flight.done.wait()
+		if flight.error is not None :
+			raise flight.error
+		return flight.result
+
+	complete = False
+	try :
+		parentID, keywords, complete = fetch(ID)
+		flight.result = (parentID, keywords)
+	except Exception, e :
+		flight.error = e
+		raise
+	finally :
+		with _keywordLock :
+			if complete :
+				_keywordCache[key] = (time.time(), flight.result[0], flight.result[1])
+			_keywordFlights.pop(key, None)
+		flight.done.set()
+	return flight.result
+
+
+def _fetchShotKeywords(nim_shotID=None) :
+	nim_showID = None
+	keywords = {}
+	nim_shotInfo = nimAPI.get_shotInfo(nim_shotID)
+	if nim_shotInfo:
+		if len(nim_shotInfo)>0:
+			nim_showID = nim_shotInfo[0]['showID']
+
+	nim_shotPaths = nimAPI.get_paths('shot', nim_shotID)
+	if nim_shotPaths:
+		if len(nim_shotPaths)>0:
+			keywords['nim_shot_root'] = nim_shotPaths['root']
+			keywords['nim_shot_plates'] = nim_shotPaths['plates']
+			keywords['nim_shot_render'] = nim_shotPaths['renders']
+			keywords['nim_shot_comp'] = nim_shotPaths['comps']
+	return nim_showID, keywords, bool(nim_shotInfo) and bool(nim_shotPaths)
+
+
+def _fetchShowKeywords(nim_showID=None) :
+	nim_jobID = None
+	keywords = {}
+	nim_showInfo = nimAPI.get_showInfo(nim_showID)
+	if nim_showInfo:
+		if len(nim_showInfo)>0:
+			nim_jobID = nim_showInfo[0]['jobID']
+			keywords['nim_show_name'] = nim_showInfo[0]['showname']
+
+	nim_showPaths = nimAPI.get_paths('show', nim_showID)
+	if nim_showPaths:
+		if len(nim_showPaths)>0:
+			keywords['nim_show_root'] = nim_showPaths['root']
+	return nim_jobID, keywords, bool(nim_showInfo) and bool(nim_showPaths)
+
+
+def _fetchJobKeywords(nim_jobID=None) :
+	keywords = {}
+	nim_jobInfo = nimAPI.get_jobInfo(nim_jobID)
+	if nim_jobInfo:
+		if len(nim_jobInfo)>0:
+			keywords['nim_job_name'] = nim_jobInfo[0]['jobname']
+			keywords['nim_job_number'] = nim_jobInfo[0]['number']
+
+	nim_jobPaths = nimAPI.get_paths('job', nim_jobID)
+	if nim_jobPaths:
+		if len(nim_jobPaths)>0:
+			keywords['nim_job_root'] = nim_jobPaths['root']
+	return None, keywords, bool(nim_jobInfo) and bool(nim_jobPaths)
+
+
+def nimKeywords(nim_jobID=None, nim_showID=None, nim_shotID=None) :
+	# Return the nim_* keyword table for a shot, show or job
+	# Each level is fetched once and cached for keywordTTL seconds
 	nimPaths = {}
-	
-	# Get shotInfo
-	if nim_shotID :	
-		nim_shotInfo = nimAPI.get_shotInfo(nim_shotID)
-		if nim_shotInfo:
-			if len(nim_shotInfo)>0:
-				nim_showID = nim_shotInfo[0]['showID']
-
-		nim_shotPaths = nimAPI.get_paths('shot', nim_shotID)
-		if nim_shotPaths:
-			if len(nim_shotPaths)>0:
-				nimPaths['nim_shot_root'] = nim_shotPaths['root']
-				nimPaths['nim_shot_plates'] = nim_shotPaths['plates']
-				nimPaths['nim_shot_render'] = nim_shotPaths['renders']
-				nimPaths['nim_shot_comp'] = nim_shotPaths['comps']
-
-	# Get showInfo
-	if nim_showID :	
-		nim_showInfo = nimAPI.get_showInfo(nim_showID)
-		if nim_showInfo:
-			if len(nim_showInfo)>0:
-				nim_jobID = nim_showInfo[0]['jobID']
-				nimPaths['nim_show_name'] = nim_showInfo[0]['showname']
-
-		nim_showPaths = nimAPI.get_paths('show', nim_showID)
-		if nim_showPaths:
-			if len(nim_showPaths)>0:
-				nimPaths['nim_show_root'] = nim_showPaths['root']
-
-		
-	# Get jobInfo
-	if nim_jobID :	
-		nim_jobInfo = nimAPI.get_jobInfo(nim_jobID)
-		if nim_jobInfo:
-			if len(nim_jobInfo)>0:
-				nimPaths['nim_job_name'] = nim_jobInfo[0]['jobname']
-				nimPaths['nim_job_number'] = nim_jobInfo[0]['number']
 
-		nim_jobPaths = nimAPI.get_paths('job', nim_jobID)
-		if nim_jobPaths:
-			if len(nim_jobPaths)>0:
-				nimPaths['nim_job_root'] = nim_jobPaths['root']
+	if nim_shotID :
+		showID, keywords = _cachedKeywords('shot', nim_shotID, _fetchShotKeywords)
+		nimPaths.update(keywords)
+		if showID :
+			nim_showID = showID
 
+	if nim_showID :
+		jobID, keywords = _cachedKeywords('show', nim_showID, _fetchShowKeywords)
+		nimPaths.update(keywords)
+		if jobID :
+			nim_jobID = jobID
+
+	if nim_jobID :
+		parentID, keywords = _cachedKeywords('job', nim_jobID, _fetchJobKeywords)
+		nimPaths.update(keywords)
+
+	return nimPaths
+
+
+def nimPrefetchKeywords(nim_shotIDs=None) :
+	# Fetch the keyword tables of many shots at once, on the NIM worker pool
+	# Shots sharing a show or job fetch it once, as the cache is filled as the shots resolve
+	batch = nimBatch.Batch()
+	for nim_shotID in nim_shotIDs or [] :
+		if nim_shotID and str(nim_shotID) not in batch :
+			batch.add(str(nim_shotID), _cachedKeywords, args=('shot', nim_shotID, _fetchShotKeywords))
+	batch.run()
+
+	showIDs = []
+	for nim_shotID in nim_shotIDs or [] :
+		result = batch.result(str(nim_shotID))
+		if result and result[0] and result[0] not in showIDs :
+			showIDs.append(result[0])
+	for nim_showID in showIDs :
+		nimKeywords(nim_showID=nim_showID)
+
+
+def clearKeywordCache(item=None, ID=None) :
+	# Drop the cached keyword tables - all of them, or those of one shot, show or job
+	with _keywordLock :
+		if item is None :
+			_keywordCache.clear()
+		else :
+			_keywordCache.pop( (item, str(ID)), None )
+
+
+def resolveKeywords(keyword_string='', nimPaths=None, tokenL='<', tokenR='>') :
+	# Substitute every nim_* keyword found in nimPaths in a single pass
+	pattern = _keywordPatterns.get( (tokenL, tokenR) )
+	if pattern is None :
+		pattern = re.compile( re.escape(tokenL)+r'(nim_[A-Za-z_]+)'+re.escape(tokenR) )
+		_keywordPatterns[(tokenL, tokenR)] = pattern
+	nimPaths = nimPaths or {}
+	def _replace(match) :
+		value = nimPaths.get(match.group(1))
+		if value is None :
+			return match.group(0)
+		return value
+	keyword_string = pattern.sub(_replace, keyword_string)
+	if isinstance(keyword_string, unicode) :
+		return keyword_string.encode('utf-8')
+	return keyword_string
 
-	#keyword_string = keyword_string.format(**nimPaths)
-	if 'nim_job_root' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_job_root'+tokenR, nimPaths['nim_job_root'])
 
-	if 'nim_job_number' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_job_number'+tokenR, nimPaths['nim_job_number'])
+def nimResolvePath(nim_jobID=None, nim_showID=None, nim_shotID=None, keyword_string='', tokenL='<', tokenR='>') :
+	# Resolve the nim_* keywords in a string for a shot, show or job
+	nimPaths = nimKeywords(nim_jobID=nim_jobID, nim_showID=nim_showID, nim_shotID=nim_shotID)
+	return resolveKeywords(keyword_string, nimPaths, tokenL=tokenL, tokenR=tokenR)
 
-	if 'nim_job_name' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_job_name'+tokenR, nimPaths['nim_job_name'])
 
-	if 'nim_show_root' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_show_root'+tokenR, nimPaths['nim_show_root'])
+def nimResolvePaths(items=None, tokenL='<', tokenR='>') :
+	# Resolve a list of ( nim_shotID, keyword_string ) pairs, fetching the shots' keywords together
+	items = items or []
+	nimPrefetchKeywords( [nim_shotID for nim_shotID, keyword_string in items] )
+	return [nimResolvePath(nim_shotID=nim_shotID, keyword_string=keyword_string, tokenL=tokenL, tokenR=tokenR) \
+			for nim_shotID, keyword_string in items]
 
-	if 'nim_show_name' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_show_name'+tokenR, nimPaths['nim_show_name'])
 
-	if 'nim_shot_root' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_shot_root'+tokenR, nimPaths['nim_shot_root'])
+# Bytes read at a time when looking for keywords in a file
+keywordScanSize = 1024*1024
 
-	if 'nim_shot_plates' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_shot_plates'+tokenR, nimPaths['nim_shot_plates'])
 
-	if 'nim_shot_render' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_shot_render'+tokenR, nimPaths['nim_shot_render'])
+def _hasKeywords(path='', tokenL='<') :
+	# Return True if a file contains a nim_* keyword, without loading all of it
+	marker = tokenL+'nim_'
+	tail = ''
+	with open(path, 'rb') as f :
+		while True :
+			chunk = f.read(keywordScanSize)
+			if not chunk :
+				return False
+			chunk = tail+chunk
+			if marker in chunk :
+				return True
+			# Keep enough of the end to find a marker split between chunks
+			tail = chunk[-(len(marker)-1):]
+
+
+def rewriteKeywords(path='', nimPaths=None, tokenL='<', tokenR='>', check=True) :
+	# Resolve the nim_* keywords in a file a line at a time, replacing it in one go once done
+	# Returns False if the file had no keywords and was left alone
+	# Pass check=False if the file is already known to have keywords
+	if check and not _hasKeywords(path, tokenL=tokenL) :
+		return False
 
-	if 'nim_shot_comp' in nimPaths :
-		keyword_string = keyword_string.replace(tokenL+'nim_shot_comp'+tokenR, nimPaths['nim_shot_comp'])
+	# Keyword values are written as utf-8, like the rest of the file
+	table = {}
+	for keyword, value in (nimPaths or {}).items() :
+		if isinstance(value, unicode) :
+			value = value.encode('utf-8')
+		table[keyword] = str(value)
 
-	return keyword_string.encode('utf-8')
+	fileDir = os.path.dirname(os.path.abspath(path))
+	fd, tmpfile = tempfile.mkstemp(prefix='.'+os.path.basename(path)+'.', dir=fileDir)
+	try :
+		with os.fdopen(fd, 'wb') as out :
+			with open(path, 'rb') as f :
+				for line in f :
+					out.write(resolveKeywords(line, table, tokenL=tokenL, tokenR=tokenR))
+			out.flush()
+			os.fsync(out.fileno())
+		shutil.copymode(path, tmpfile)
+		try :
+			os.rename(tmpfile, path)
+		except OSError :
+			# Windows won't rename over an existing file
+			os.remove(path)
+			os.rename(tmpfile, path)
+	except :
+		if os.path.exists(tmpfile) :
+			os.remove(tmpfile)
+		raise
+	return True
 
 
 def resolveBatchKeywords(nim_shotID=None, batch_path=None) :
@@ -3721,18 +4264,20 @@ def resolveBatchKeywords(nim_shotID=None, batch_path=None) :
 			batch_path = batch_path[:-6]
 			print "Bath Path: %s" % batch_path
 
-		for file in os.listdir(batch_path) :
+		# The shot's keywords are looked up once, by the first file that needs them
+		nimPaths = None
+		for file in sorted(os.listdir(batch_path)) :
 			if file.endswith(".export_node") :
 				export_node_file = os.path.join(batch_path, file)
 				print "Export Node Found: %s" % export_node_file
 				try:
-					with open(export_node_file) as f :
-						export_node_contents=f.read()
-						print "Export Node Loaded"
-						export_node_contents = nimResolvePath(nim_shotID=nim_shotID, keyword_string=export_node_contents, tokenL='&lt;', tokenR='&gt;')
-					with open(export_node_file, "w") as f :
-						f.write(export_node_contents)
-					print 'Export Node Updated'
+					if not _hasKeywords(export_node_file, tokenL='&lt;') :
+						print 'Export Node has no NIM keywords'
+					else :
+						if nimPaths is None :
+							nimPaths = nimKeywords(nim_shotID=nim_shotID)
+						rewriteKeywords(export_node_file, nimPaths, tokenL='&lt;', tokenR='&gt;', check=False)
+						print 'Export Node Updated'
 					success = True
 				except Exception, e :
 					print 'Export Node Keyword Resolution Failed'
@@ -3754,99 +4299,15 @@ def resolveBatchSetupNamePattern(namePattern=None, sequenceName='', tapeName='')
 
 def resolveServerOsPath(path='') :
 	#Convert path from known NIM server to OS relavtive path
-	#print("resolveServerOsPath")
-
-	_os = platform.system()
-	serverID = ''
-	servers = {}
-	servers = nimAPI.get_allServers()
-	
+	#The server table is loaded once and cached by nim_paths
 	path = path.replace('\\', '/')
-	resolvedPath = path
-
-	# Find matching server from path
-	if len(servers) > 0:
-		print "Servers Found: %s" % str(len(servers))
-		for server in servers :
-			linuxPath = ""
-			winPath = ""
-			osxPath = ""
-
-			if server['path'] :
-				linuxPath 	= server['path'].replace('\\', '/')
-			if server['winPath'] :
-				winPath 	= server['winPath'].replace('\\', '/')
-			if server['osxPath'] :
-				osxPath 	= server['osxPath'].replace('\\', '/')
-
-			# print "--------------------------"
-			print "Resolving Server: %s" % server['server']
-			# print "Path: %s" % path
-			# print "Linux Path: %s" % linuxPath
-			# print "Windows Path: %s" % winPath
-			# print "OSX Path: %s" % osxPath
-
-			if _os.lower() in ['darwin', 'mac'] :
-				print "OS: OSX"
-				# Compare against windows and linux & set to osx
-
-				#case in-sensitive
-				if osxPath and path.lower().startswith(osxPath.lower()) :
-					print "OSX Path Found"
-					break
-
-				#case in-sensitive
-				elif winPath and path.lower().startswith(winPath.lower()) :
-					print "Translating Windows Path" 
-					pathTail = path[path.lower().startswith(winPath.lower()) and len(winPath):]
-					if pathTail.startswith('/') :
-						pathTail = pathTail[1:]
-					resolvedPath = os.path.join(osxPath,pathTail)
-					break
-
-				#case sensitive
-				elif linuxPath and path.startswith(linuxPath) :
-					print "Translating Linux Path" 
-					pathTail = path[path.startswith(linuxPath) and len(linuxPath):]
-					if pathTail.startswith('/') :
-						pathTail = pathTail[1:]
-					resolvedPath = os.path.join(osxPath,pathTail)
-					break
-
-				else :
-					print "Path match not found"
-
-			elif _os.lower() in ['linux', 'linux2'] :
-				print "OS: Linux"
-				# Compare against windows and osx & set to linux
-
-				#case sensitive
-				if linuxPath and path.startswith(linuxPath) :
-					print "Linux Path Found" 
-					break
-
-				#case in-sensitive
-				elif winPath and path.lower().startswith(winPath.lower()) :
-					print "Translating Windows Path"
-					pathTail = path[path.lower().startswith(winPath.lower()) and len(winPath):]
-					if pathTail.startswith('/') :
-						pathTail = pathTail[1:]
-					resolvedPath = os.path.join(linuxPath,pathTail)
-					break
-
-				#case in-sensitive
-				elif osxPath and path.lower().startswith(osxPath.lower()) :
-					print "Translating OSX Path"
-					pathTail = path[path.lower().startswith(osxPath.lower()) and len(osxPath):]
-					if pathTail.startswith('/') :
-						pathTail = pathTail[1:]
-					resolvedPath = os.path.join(linuxPath,pathTail)
-					break
+	return nimPaths.translate(path=path)
 
-				else :
-					print "Path match not found"
 
-	return resolvedPath
+def resolveServerOsPaths(paths=None) :
+	#Convert a list of paths from known NIM servers to OS relative paths
+	paths = [path.replace('\\', '/') for path in paths or []]
+	return nimPaths.translate_paths(paths=paths)
 
 
 def getNimPrefs() :
@@ -3894,7 +4355,50 @@ def getNimPrefs() :
 	return prefs
 
 
-def updateOpenClip( masterFile='', elementPath='', elementName='', elementWildcard='', recursive=False ) :
+def nimWarmSession(clear=False) :
+	# Start loading the NIM data the dialogs open with, in the background
+	# Pass clear=True to drop the data loaded earlier - after the user is changed
+	try:
+		prefs=nimPrefs.read()
+		user = prefs.get('NIM_User', '') if prefs else ''
+	except:
+		print "NIM - Failed to read NIM prefs"
+		user = ''
+	if clear :
+		nimFlameSession.session().clear()
+	nimFlameSession.session().warm(user)
+	return True
+
+
+# Filter filetype by extension
+# Allow only image sequence due to issue with possible mismatch frame rates for container media (.mov, etc )
+ext_whitelist = ['cin','als','jpg','jpeg','pict','pct','picio','sgi','pic','tga' \
+				'iff','tdi','tif','tiff','rla','cin.pxz','tif.pxz','tiff.pxz','dpx','dpx.pxz' \
+				'hdr','png','exr','exr.pxz','psd']
+
+
+def prefetchOpenClipMedia(elements=None, recursive=False) :
+	# Probe the media for a list of ( elementPath, elementName, elementWildcard ) elements
+	# on the nimMediaProbe pool, so the updateOpenClip calls that follow find the results cached
+	probePaths = []
+	for elementPath, elementName, elementWildcard in elements or [] :
+		elementExt = os.path.splitext(elementName)[1][1:].strip().lower()
+		if elementExt and elementExt not in ext_whitelist :
+			continue
+		apath = os.path.abspath(elementPath)
+		if elementWildcard :
+			apath = apath+"/"+elementWildcard
+		probePaths.append(apath)
+	# Returns { probed path : nimMediaProbe.ProbeResult }, or None if dl_get_media_info isn't installed
+	if not nimMediaProbe.getMediaScript() :
+		return None
+	return dict( zip(probePaths, nimMediaProbe.probe_all(paths=probePaths, recursive=recursive)) )
+
+
+def updateOpenClip( masterFile='', elementPath='', elementName='', elementWildcard='', recursive=False, openClip=None ) :
+	# Add the media of an element to an openClip as a new version
+	# Pass a nimOpenClip.OpenClip to add several elements to the same clip in memory
+	# and save it once afterwards - otherwise the master file is read and written here
 	# print "MasterFile: 	%s" % masterFile
 	# print "ElementPath: %s" % elementPath
 	# print "ElementName: %s" % elementName
@@ -3902,12 +4406,6 @@ def updateOpenClip( masterFile='', elementPath='', elementName='', elementWildca
 
 	clipUpdated = False
 
-	# Filter filetype by extension
-	# Allow only image sequence due to issue with possible mismatch frame rates for container media (.mov, etc )
-	ext_whitelist = ['cin','als','jpg','jpeg','pict','pct','picio','sgi','pic','tga' \
-					'iff','tdi','tif','tiff','rla','cin.pxz','tif.pxz','tiff.pxz','dpx','dpx.pxz' \
-					'hdr','png','exr','exr.pxz','psd']
-
 	# Get extension from elementName
 	# assumes name.#.ext format
 	elementExt = os.path.splitext(elementName)[1][1:].strip().lower()
@@ -3930,320 +4428,127 @@ def updateOpenClip( masterFile='', elementPath='', elementName='', elementWildca
 		elementBasename = elementName
 	# print "elementBasename: %s" % elementBasename
 
-	getMediaScript = ""
-	mediaScriptPaths = ["/opt/Autodesk/mio/current/dl_get_media_info", \
-						"/usr/discreet/mio/current/dl_get_media_info"]
+	getMediaScript = nimMediaProbe.getMediaScript()
 
-	mediaScriptFound = False
-	for getMediaScript in mediaScriptPaths :
-		if os.path.isfile(getMediaScript) :
-			mediaScriptFound = True
-			break
+	if not getMediaScript :
+		print "ERROR: Flame script not installed: file %s missing" % nimMediaProbe.mediaScriptPaths[-1]
+		return clipUpdated
 
-	if not mediaScriptFound :
-		print "ERROR: Flame script not installed: file %s missing" % getMediaScript
-	else :
-		print "Media Script Path: %s" % getMediaScript
+	print "Media Script Path: %s" % getMediaScript
 
-		createNewClip = False
+	apath = os.path.abspath(elementPath)
+	print "Adding folder %s" % apath
 
-		if not os.path.isfile(masterFile) :
-			print "Creating new openClip"
-			apath = os.path.abspath(elementPath)
-			tmpfile = masterFile
-			createNewClip = True
-			clipUpdated = True
-		else :
-			tmpfile = "tmp.clip"
-			apath = os.path.abspath(elementPath)
-			print "Adding folder %s" % apath
-			#output a temp file 
-			tmpfile = apath+"/"+tmpfile
-			if os.path.isfile(tmpfile):
-				os.remove(tmpfile)
-			print "Temp File: %s" % tmpfile
+	if elementWildcard :
+		apath = apath+"/"+elementWildcard
 
-		if elementWildcard :
-			apath = apath+"/"+elementWildcard
+	# Test if item is directory and if empty
+	if os.path.isdir(apath) :
+		if not os.listdir(apath):
+			print "Skipping empty directory"
+			return False
 
-		# Test if item is directory and if empty
-		if os.path.isdir(apath) :
-			if not os.listdir(apath):
-				print "Skipping empty directory"
-				return False
-
-		try :
-			# Write output of getMediaScript to file
-			cmd_args = getMediaScript+" "+apath
-			if recursive :
-				print "dl_get_media_info recursive enabled"
-				cmd_args = getMediaScript+" -r "+apath
-
-			print "cmd: %s" % cmd_args
-
-			pipes = subprocess.Popen(cmd_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-
-			# Communicate with subprocess - timeout after 15 seconds if no reponse is found
-			# Python 3.x
-			#	try:
-			#		std_out, std_err = pipes.communicate(timeout=15)
-			#	except TimeoutExpired:
-			#		pipes.kill()
-			#		std_out, std_err = pipes.communicate()
-
-			# Python 2.7
-			x = 15 #some amount of seconds
-			delay = 1.0
-			timeout = int(x / delay)
-			
-			#while the process is still executing and we haven't timed-out yet
-			while pipes.poll() is None and timeout > 0:
-				#do other things too if necessary e.g. print, check resources, etc.
-				time.sleep(delay)
-				timeout -= delay
-				print "Waiting for dl_get_media_info for %s more seconds..." % timeout
-			# End timeout
-			
-			if pipes.returncode is None :
-				pipes.kill()
-				print 'ERROR: dl_get_media_info failed to return after 15 seconds. Killing process and skipping media import'
-				return False
+	try :
+		# Probe the media - results are cached until the folder changes
+		if recursive :
+			print "dl_get_media_info recursive enabled"
+		print "Probing: %s" % apath
+
+		probeResult = nimMediaProbe.probe(apath, recursive=recursive)
+		std_out, std_err = probeResult.stdout, probeResult.stderr
+
+		if probeResult.timedOut :
+			print 'ERROR: dl_get_media_info failed to return after %s seconds. Killing process and skipping media import' % nimMediaProbe.probeTimeout
+			return False
+		elif probeResult.returncode != 0 :
+			# Error
+			err_msg = "%s. Code: %s" % (std_err.strip(), probeResult.returncode)
+			print '%s' % err_msg
+			return False
+		elif len(std_err) :
+			# return code is 0 (no error) : but we might have warning messages indicating failure
+			print "ERROR: %s" % std_err
+			if std_err.startswith("Could not get metadata from") :
+				print "Possible directory attempted for scan - keep trying"
 			else :
-				std_out, std_err = pipes.communicate()
-
-				if pipes.returncode != 0 :
-					# Error
-					err_msg = "%s. Code: %s" % (std_err.strip(), pipes.returncode)
-					print '%s' % err_msg
-					return False
-				elif len(std_err) :
-					# return code is 0 (no error) : but we might have warning messages indicating failure
-					print "ERROR: %s" % std_err
-					if std_err.startswith("Could not get metadata from") :
-						print "Possible directory attempted for scan - keep trying"
-					else :
-						print "Unknown Error - skipping media import"
-						return False
-				else :
-					print "Successfully parsed media"
-					# print "std_out: %s" % std_out
-
-
-			with open(tmpfile, "w") as f:
-				f.write("{0}".format(std_out))
-
-
-			# Check media type for valid extension
-			try :
-				tmpXML = ET.parse(tmpfile)
-			except :
-				print "Failed to parse XML. XML could be empty."
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
+				print "Unknown Error - skipping media import"
 				return False
+		else :
+			print "Successfully parsed media"
+			# print "std_out: %s" % std_out
 
-			for newTrack in tmpXML.iter('track') :
-				newPathObject = newTrack.find("feeds/feed/spans/span/path")
-				newPath = newPathObject.text
-				print "tmpXML - newPath: %s" % newPath
-				
-				# If file is type not in ext_whitelist then skip
-				newPath_ext = os.path.splitext(newPath)[1][1:].strip().lower()
-				if newPath_ext in ext_whitelist :
-					print "Valid media found %s: " % newPath_ext
-				else :
-					print "Media of type %s not supported. skipping append" % newPath_ext
-					if os.path.isfile(tmpfile):
-						os.remove(tmpfile)
-					return False
-
+		# Parse the probe output in memory
+		try :
+			newXML = ET.fromstring(std_out)
 		except :
-			print "Failed to read media: %s" % apath
-			print'%s' % traceback.print_exc()
-			return -1
-
-
-		# Only splice XML when masterFile does not exist
-		if not createNewClip :
-			print "Updating openClip..."
+			print "Failed to parse XML. XML could be empty."
+			return False
+
+		# Check media type for valid extension
+		for newTrack in newXML.iter('track') :
+			newPathObject = newTrack.find("feeds/feed/spans/span/path")
+			newPath = newPathObject.text
+			print "tmpXML - newPath: %s" % newPath
 			
-			try :
-				sourceXML 	= ET.parse(masterFile)
-			except :
-				print "Failed to parse XML. XML could be empty."
-				# print'%s' % traceback.print_exc()
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
-				return False
-
-			try :
-				newXML 		= ET.parse(tmpfile)
-			except :
-				print "Failed to parse XML. XML could be empty."
-				# print'%s' % traceback.print_exc()
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
+			# If file is type not in ext_whitelist then skip
+			newPath_ext = os.path.splitext(newPath)[1][1:].strip().lower()
+			if newPath_ext in ext_whitelist :
+				print "Valid media found %s: " % newPath_ext
+			else :
+				print "Media of type %s not supported. skipping append" % newPath_ext
 				return False
 
-			try :
-				vuid = ''
-				elementExists = False
-				elementsAdded = 0
-
-				# Get first item in feed and use as the nbTicks reference
-				src_nbTicks = None
-				for srcTrack in sourceXML.iter('track') :
-					for srcFeed in srcTrack.iter('feed') :
-						src_nbTicksObj = srcFeed.find('startTimecode/nbTicks')
-						src_nbTicks = src_nbTicksObj.text
-						break
-					else :
-						continue
-					break
-				# print "Source nbTicks: %s" % src_nbTicks
-
-
-				# Get new feed from file
-				for newTrack in newXML.iter('track') :
-					uid = newTrack.get('uid')
-					newFeed = newTrack.find('feeds/feed')
-
-					feedHandler = newFeed.find("./handler")
-					newFeed.remove(feedHandler)
-					
-					if src_nbTicks :
-						new_nbTicksObject = newTrack.find("feeds/feed/startTimecode/nbTicks")
-						new_nbTicksObject.text = src_nbTicks
-
-					newPathObject = newTrack.find("feeds/feed/spans/span/path")
-					newPath = newPathObject.text
-					
-					print "uid: %s" % uid
-					# print "newFeed: %s" % ET.tostring(newFeed)
-					print "newPath: %s" % newPath
-					
-					# Check for path in sourceFile 
-					# If Path exists ... skip append
-					for srcPath in sourceXML.iter('path') :
-						# print "srcPath: %s" % srcPath.text
-						if newPath == srcPath.text :
-							print "Element exists in clip... skipping append"
-							elementExists = True
-
-					if not elementExists :
-						# Append new feed to source track
-						for srcTrack in sourceXML.iter('track') :
-							newFeed.set('vuid', elementBasename)
-							srcTrack.find('feeds').append(newFeed)
-							print "Appending element: %s" % elementBasename
-							elementsAdded += 1
-
-				if elementsAdded > 0:
-					# Append vUID to versions
-					newVersion = sourceXML.find('versions')
-					newVersionElement = ET.Element("version", {"type": "version", "uid": elementBasename})
-					newVersion.insert(0, newVersionElement)
-					xmlRoot = sourceXML.getroot()
-
-					# Clean tmpfile - brute force remove errant <root/handler>
-					print "Removing Handler"
-					for handler in xmlRoot.findall("./handler") :
-						print "Handler found"
-						xmlRoot.remove(handler)
-
-					resultXML	= ET.tostring(xmlRoot)
-
-					# Create a backup of the original file
-					bakfile = "%s.bak" % masterFile
-					if not os.path.isfile(bakfile):
-						shutil.copy2(masterFile,bakfile)
-					else:
-						created = False
-						for i in range ( 1, 99 ):
-							bakfile = "%s.bak.%02d" % ( masterFile, i )
-							if not os.path.isfile(bakfile):
-								shutil.copy2(masterFile,bakfile)
-								created = True
-								break
-						if not created:
-							bakfile = "%s.bak.last" % masterFile
-							shutil.copy2(masterFile,bakfile)
-							
-					outFile = masterFile
-
-					print "Adding feed version: %s" % elementBasename
-					
-					with open(outFile,"w") as f:
-						f.write( resultXML )
-
-					print "openClip Updated: %s" % outFile
-
-					clipUpdated = True
-
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
+	except :
+		print "Failed to read media: %s" % apath
+		print'%s' % traceback.print_exc()
+		return -1
 
-			except :
-				print "Failed reading XML"
-				print'%s' % traceback.print_exc()
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
-				return False
+	saveClip = openClip is None
+	try :
+		if openClip is None :
+			openClip = nimOpenClip.OpenClip(masterFile)
+	except :
+		print "Failed to parse XML. XML could be empty."
+		return False
 
+	try :
+		if openClip.root is None :
+			print "Creating new openClip"
 		else :
-			# New openClip
-			print "Building new openClip"
-
-			# Update uid name with elementName
-			try :
-				newXML = ET.parse(tmpfile)
-			except :
-				print "Failed reading XML"
-				print'%s' % traceback.print_exc()
-				if os.path.isfile(tmpfile):
-					os.remove(tmpfile)
-				return False
-			
-			try :
-				vuid = ''	
-				
-				for newFeed in newXML.iter('feeds') :
-					feed = newFeed.find('feed')
-					feed.set('vuid', elementBasename)
-
-					feedHandler = feed.find("./handler")
-					feed.remove(feedHandler)
-
-				for newVersion in newXML.iter('versions') :
-					newVersion.set('currentVersion', elementBasename)
-					version = newVersion.find('version')
-					version.set('uid', elementBasename)
-					version.set('type', 'version')
-				
-				xmlRoot = newXML.getroot()
-
-				# Clean tmpfile - brute force remove errant <root/handler>
-				print "Removing Handler"
-				for handler in xmlRoot.findall("./handler") :
-					print "Handler found"
-					xmlRoot.remove(handler)
-
-				resultXML = ET.tostring(xmlRoot)
-
-				print "Adding feed version: %s" % elementBasename
+			print "Updating openClip..."
+		print "Adding feed version: %s" % elementBasename
+		clipUpdated = openClip.add(newXML, elementBasename)
+		if saveClip :
+			openClip.save()
+	except :
+		print "Failed to update openClip: %s" % masterFile
+		print'%s' % traceback.print_exc()
+		return False
 
-				with open(tmpfile,"w") as f:
-					f.write( resultXML )
+	return clipUpdated
 
-				print "openClip Updated: %s" % tmpfile
 
-				clipUpdated = True
+def saveOpenClip(openClip=None) :
+	# Write an openClip that elements were added to with updateOpenClip
+	# Returns -1 if it couldn't be written
+	if openClip is None :
+		return False
+	try :
+		return openClip.save()
+	except :
+		print "Failed to write openClip: %s" % openClip.masterFile
+		print'%s' % traceback.print_exc()
+		return -1
 
-			except :
-				print "Failed to update openClip: %s" % tmpfile
-				print'%s' % traceback.print_exc()
 
-	return clipUpdated
+def loadOpenClip(masterFile='') :
+	# Load an openClip to add elements to with updateOpenClip - returns None if it can't be read
+	try :
+		return nimOpenClip.OpenClip(masterFile)
+	except :
+		print "Failed to parse XML. XML could be empty."
+		print'%s' % traceback.print_exc()
+		return None
 
 
 def readFlamePrefs() :
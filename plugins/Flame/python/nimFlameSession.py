@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: Flame/python/nimFlameSession.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+# The NIM data shared by the Flame dialogs - the user, their jobs, the element
+# and task types, and the paths, servers and shows of each job - loaded once
+# per Flame session instead of by every dialog as it opens.
+#
+# Cached data is returned straight away.  Once it is older than
+# refreshInterval it is fetched again in the background, so a dialog never
+# waits on data it has already seen, and warm() loads the start-up data
+# before the first dialog is opened.
+
+import copy,time,threading,traceback
+
+import nim_core.nim_api as nimAPI
+import nim_core.nim_client as nimClient
+
+
+# Seconds before cached data is fetched again in the background
+refreshInterval = 300.0
+# Seconds after which data that no dialog asked for is dropped rather than refreshed
+idleTime = 3600.0
+
+
+class FlameSession(object) :
+	'''NIM data shared by the Flame dialogs - safe to share between threads'''
+
+	def __init__(self) :
+		# key : [ time fetched, time last used, value, fetch function ]
+		self._values = {}
+		# key : threading.Event set once the fetch in progress is done
+		self._flights = {}
+		self._lock = threading.Lock()
+		self._refresher = None
+
+	def _get(self, key=None, fetch=None) :
+		'''Returns a copy of a cached value, fetching it the first time it is asked for'''
+		now = time.time()
+		with self._lock :
+			entry = self._values.get(key)
+			if entry is not None :
+				entry[1] = now
+				if now - entry[0] > refreshInterval and key not in self._flights :
+					self._refresh(key, fetch)
+				return copy.deepcopy(entry[2])
+			flight = self._flights.get(key)
+			if flight is None :
+				flight = self._flights[key] = threading.Event()
+				owner = True
+			else :
+				owner = False
+
+		if not owner :
+			# Another dialog or the warm up is fetching it - wait for that
+			flight.wait()
+			with self._lock :
+				entry = self._values.get(key)
+			if entry is not None :
+				return copy.deepcopy(entry[2])
+			return fetch()
+
+		try :
+			value = fetch()
+			self._store(key, fetch, value)
+			return copy.deepcopy(value)
+		finally :
+			with self._lock :
+				self._flights.pop(key, None)
+			flight.set()
+
+	def _store(self, key=None, fetch=None, value=None) :
+		'''Caches a fetched value - failed fetches aren't kept'''
+		if value is None or value is False :
+			return
+		now = time.time()
+		with self._lock :
+			entry = self._values.get(key)
+			self._values[key] = [now, entry[1] if entry else now, value, fetch]
+
+	def _refresh(self, key=None, fetch=None) :
+		'''Fetches a value again on a background thread - call with the lock held'''
+		flight = self._flights[key] = threading.Event()
+
+		def _run() :
+			try :
+				with nimClient.headless() :
+					self._store(key, fetch, fetch())
+			except Exception :
+				print "NIM: Failed to refresh %s" % (key,)
+				print '%s' % traceback.format_exc()
+			finally :
+				with self._lock :
+					self._flights.pop(key, None)
+				flight.set()
+
+		thread = threading.Thread(target=_run, name='NIM_FlameSession')
+		thread.daemon = True
+		thread.start()
+
+	def _keepWarm(self) :
+		'''Refreshes the cached data that dialogs still use, dropping the rest'''
+		while True :
+			time.sleep(refreshInterval)
+			now = time.time()
+			with self._lock :
+				for key, entry in self._values.items() :
+					if now - entry[1] > idleTime :
+						del self._values[key]
+					elif now - entry[0] > refreshInterval and key not in self._flights :
+						self._refresh(key, entry[3])
+
+	def warm(self, user='') :
+		'''Loads the data every dialog opens with on a background thread, and keeps it fresh'''
+		def _run() :
+			try :
+				with nimClient.headless() :
+					self.elementTypes()
+					self.taskTypes()
+					if user :
+						userID = self.userID(user)
+						if userID :
+							self.jobs(userID)
+			except Exception :
+				print "NIM: Failed to load NIM data for Flame"
+				print '%s' % traceback.format_exc()
+
+		thread = threading.Thread(target=_run, name='NIM_FlameSession')
+		thread.daemon = True
+		thread.start()
+
+		with self._lock :
+			if self._refresher is None :
+				self._refresher = threading.Thread(target=self._keepWarm, name='NIM_FlameSession')
+				self._refresher.daemon = True
+				self._refresher.start()
+
+	def clear(self) :
+		'''Drops all cached data - after the user is changed, for instance'''
+		with self._lock :
+			self._values.clear()
+
+	def userID(self, user='') :
+		return self._get( ('userID', user), lambda: nimAPI.get_userID(user) )
+
+	def jobs(self, userID=None) :
+		return self._get( ('jobs', str(userID)), lambda: nimAPI.get_jobs(userID) )
+
+	def elementTypes(self) :
+		return self._get( ('elementTypes',), lambda: nimAPI.get_elementTypes() )
+
+	def taskTypes(self) :
+		return self._get( ('taskTypes',), lambda: nimAPI.get_tasks(app='FLAME', userType='all') )
+
+	def paths(self, item='', ID=None) :
+		return self._get( ('paths', item, str(ID)), lambda: nimAPI.get_paths(item, ID) )
+
+	def jobServers(self, jobID=None) :
+		return self._get( ('jobServers', str(jobID)), lambda: nimAPI.get_jobServers(jobID) )
+
+	def serverOSPath(self, serverID=None, os='') :
+		return self._get( ('serverOSPath', str(serverID), os), lambda: nimAPI.get_serverOSPath(serverID, os) )
+
+	def shows(self, jobID=None) :
+		return self._get( ('shows', str(jobID)), lambda: nimAPI.get_shows(jobID) )
+
+
+# Session shared by the Flame dialogs
+_session = None
+_sessionLock = threading.Lock()
+
+def session() :
+	'''Returns the Flame session's FlameSession'''
+	global _session
+	with _sessionLock :
+		if _session is None :
+			_session = FlameSession()
+		return _session
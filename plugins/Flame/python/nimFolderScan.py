@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: Flame/python/nimFolderScan.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+# Walks the shot media folders for nimBuildOpenClipFromFolders without
+# rescanning the SAN on every run.  Each folder's fingerprint - its mtime and
+# number of entries - and its subfolders are kept in a local state file.  A
+# folder whose mtime hasn't moved is not listed again, and the subfolders
+# recorded against an openClip are only probed again once their fingerprint
+# changes.
+
+import os,json,time,tempfile,threading,traceback
+
+try :
+	from os import scandir
+except ImportError :
+	try :
+		from scandir import scandir
+	except ImportError :
+		scandir = None
+
+
+# Number of folder trees walked at the same time
+maxWalkers = 4
+# Seconds - a folder modified this close to when it was listed is listed again
+# next time, in case more was written to it within the file system's mtime resolution
+settleTime = 2.0
+
+
+def _listFolder(path='') :
+	'''Returns the number of entries in a folder and the names of its subfolders'''
+	entries = 0
+	subfolders = []
+	if scandir is not None :
+		for entry in scandir(path) :
+			entries += 1
+			try :
+				if entry.is_dir() :
+					subfolders.append(entry.name)
+			except OSError :
+				pass
+	else :
+		for name in os.listdir(path) :
+			entries += 1
+			if os.path.isdir(os.path.join(path, name)) :
+				subfolders.append(name)
+	return entries, sorted(subfolders)
+
+
+def _decodable(path='') :
+	'''Returns True if a path can be written to the state file'''
+	if isinstance(path, unicode) :
+		return True
+	try :
+		path.decode('utf-8')
+	except UnicodeDecodeError :
+		return False
+	return True
+
+
+class FolderScan(object) :
+	'''Walks folder trees, remembering what it found in a state file - safe to share between threads'''
+
+	def __init__(self, stateFile='', workers=None) :
+		self.stateFile = stateFile
+		self.workers = workers or maxWalkers
+		# path : [ mtime, entries, subfolders, time listed ]
+		self.folders = {}
+		# clip file : { subfolder : [ mtime, entries ] }
+		self.clips = {}
+		self._lock = threading.Lock()
+		self.load()
+
+	def load(self) :
+		'''Reads the state file - a missing or unreadable one starts the scan from scratch'''
+		if not self.stateFile or not os.path.isfile(self.stateFile) :
+			return
+		try :
+			with open(self.stateFile, 'r') as f :
+				state = json.load(f)
+			# Paths are kept as utf-8 strings, as os.listdir returns them
+			for path, known in state.get('folders', {}).items() :
+				known[2] = [name.encode('utf-8') for name in known[2]]
+				self.folders[path.encode('utf-8')] = known
+			for clipFile, recorded in state.get('clips', {}).items() :
+				self.clips[clipFile.encode('utf-8')] = dict( [(subfolder.encode('utf-8'), fingerprint) \
+																for subfolder, fingerprint in recorded.items()] )
+		except Exception :
+			print "NIM: Failed to read folder scan state %s - rescanning" % self.stateFile
+			self.folders = {}
+			self.clips = {}
+
+	def save(self) :
+		'''Writes the state file'''
+		if not self.stateFile :
+			return False
+		try :
+			with self._lock :
+				# Paths that aren't utf-8 can't be written as JSON - they are scanned again next time
+				folders = dict( [(path, known) for path, known in self.folders.items() \
+									if _decodable(path) and all(map(_decodable, known[2]))] )
+				clips = {}
+				for clipFile, recorded in self.clips.items() :
+					if _decodable(clipFile) :
+						clips[clipFile] = dict( [(subfolder, fingerprint) for subfolder, fingerprint in recorded.items() \
+												if _decodable(subfolder)] )
+				state = json.dumps( {'folders':folders, 'clips':clips} )
+			stateDir = os.path.dirname(os.path.abspath(self.stateFile))
+			if not os.path.isdir(stateDir) :
+				os.makedirs(stateDir)
+			fd, tmpfile = tempfile.mkstemp(prefix='.'+os.path.basename(self.stateFile)+'.', dir=stateDir)
+			try :
+				os.write(fd, state)
+			finally :
+				os.close(fd)
+			try :
+				os.rename(tmpfile, self.stateFile)
+			except OSError :
+				# Windows won't rename over an existing file
+				os.remove(self.stateFile)
+				os.rename(tmpfile, self.stateFile)
+		except Exception :
+			print "NIM: Failed to write folder scan state %s" % self.stateFile
+			print '%s' % traceback.format_exc()
+			return False
+		return True
+
+	def _folder(self, path='') :
+		'''Returns the state of a folder, listing it only if it changed since it was last listed'''
+		try :
+			mtime = os.stat(path).st_mtime
+		except OSError :
+			return None
+		with self._lock :
+			known = self.folders.get(path)
+		if known and known[0] == mtime and known[3] - mtime > settleTime :
+			return known
+		try :
+			entries, subfolders = _listFolder(path)
+		except OSError :
+			return None
+		known = [mtime, entries, subfolders, time.time()]
+		with self._lock :
+			self.folders[path] = known
+		return known
+
+	def walk(self, root='') :
+		'''Returns ( subfolder, fingerprint ) for every folder below root, deepest first
+		   Symbolic links to folders are returned but not followed, as os.walk does'''
+		found = []
+		visited = set([root])
+		rootState = self._folder(root)
+		if rootState is None :
+			return found
+
+		def _walk(path, state) :
+			for name in state[2] :
+				subfolder = os.path.join(path, name)
+				subState = self._folder(subfolder)
+				if subState is None :
+					continue
+				visited.add(subfolder)
+				if not os.path.islink(subfolder) :
+					_walk(subfolder, subState)
+				found.append( (subfolder, [subState[0], subState[1]]) )
+		_walk(root, rootState)
+
+		# Forget folders that were removed from the tree
+		prefix = os.path.join(root, '')
+		with self._lock :
+			for path in [path for path in self.folders if path.startswith(prefix) and path not in visited] :
+				del self.folders[path]
+		return found
+
+	def walk_all(self, roots=None) :
+		'''Walks several folder trees at the same time, returning { root : walk(root) }'''
+		roots = roots or []
+		results = {}
+		pending = list(set(roots))
+		lock = threading.Lock()
+
+		def _work() :
+			while True :
+				with lock :
+					if not pending :
+						return
+					root = pending.pop(0)
+				try :
+					result = self.walk(root)
+				except Exception :
+					print "NIM: Failed to scan %s" % root
+					print '%s' % traceback.format_exc()
+					result = []
+				with lock :
+					results[root] = result
+
+		threads = []
+		for index in range(min(self.workers, len(pending))) :
+			thread = threading.Thread(target=_work, name='NIM_FolderScan')
+			thread.daemon = True
+			thread.start()
+			threads.append(thread)
+		for thread in threads :
+			thread.join()
+		return results
+
+	def changed(self, clipFile='', found=None) :
+		'''Returns the subfolders in found that are new or changed since they were recorded against clipFile'''
+		found = found or []
+		if not os.path.isfile(clipFile) :
+			# The clip was removed - everything goes back in
+			return [subfolder for subfolder, fingerprint in found]
+		with self._lock :
+			recorded = self.clips.get(clipFile, {})
+			return [subfolder for subfolder, fingerprint in found if recorded.get(subfolder) != fingerprint]
+
+	def record(self, clipFile='', found=None, keep=None) :
+		'''Records the fingerprints of the ( subfolder, fingerprint ) pairs added to clipFile
+		   If keep is given, subfolders recorded earlier that aren't in it are dropped'''
+		with self._lock :
+			recorded = self.clips.setdefault(clipFile, {})
+			if keep is not None :
+				keep = set(keep)
+				for subfolder in [subfolder for subfolder in recorded if subfolder not in keep] :
+					del recorded[subfolder]
+			for subfolder, fingerprint in found or [] :
+				recorded[subfolder] = fingerprint
+
+	def forget(self, clipFile='') :
+		'''Drops what was recorded against clipFile, so all of its folders are probed again'''
+		with self._lock :
+			self.clips.pop(clipFile, None)
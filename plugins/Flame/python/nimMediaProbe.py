@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: Flame/python/nimMediaProbe.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+# Runs Flame's dl_get_media_info on media folders for the openClip updates in
+# nimFlameExport.  Probes run concurrently on a bounded pool, each one waiting
+# on its process with a timeout rather than polling, and results are cached
+# until the probed folder changes.
+#
+# Set NIM_FLAME_MEDIA_SCRIPT to use a different probe script - a stub that
+# prints a canned openClip, for instance, when testing away from Flame.
+
+import os,glob,signal,threading,subprocess,traceback
+from collections import OrderedDict
+
+
+mediaScriptPaths = ["/opt/Autodesk/mio/current/dl_get_media_info", \
+					"/usr/discreet/mio/current/dl_get_media_info"]
+mediaScriptEnv = 'NIM_FLAME_MEDIA_SCRIPT'
+
+# Seconds to wait for a probe before killing it
+probeTimeout = 15.0
+# Number of probes run at the same time
+maxProbes = 4
+# Number of probe results kept
+cacheSize = 2000
+
+
+class ProbeResult(object) :
+	'''Output of one dl_get_media_info run'''
+	def __init__(self, path='', stdout='', stderr='', returncode=None, timedOut=False) :
+		self.path = path
+		self.stdout = stdout
+		self.stderr = stderr
+		self.returncode = returncode
+		self.timedOut = timedOut
+
+
+def getMediaScript() :
+	'''Returns the path to dl_get_media_info, or None if it isn't installed'''
+	script = os.environ.get(mediaScriptEnv, '')
+	if script :
+		return script
+	for script in mediaScriptPaths :
+		if os.path.isfile(script) :
+			return script
+	return None
+
+
+def _folder(path='') :
+	'''Returns the folder whose contents a probe of path depends on'''
+	if os.path.isdir(path) :
+		return path
+	return os.path.dirname(path)
+
+
+class MediaProbe(object) :
+	'''Runs and caches media probes - safe to share between threads'''
+
+	def __init__(self, script=None, workers=None, timeout=None) :
+		self.script = script
+		self.workers = workers or maxProbes
+		self.timeout = timeout or probeTimeout
+		self._cache = OrderedDict()
+		self._lock = threading.Lock()
+		self._slots = threading.BoundedSemaphore(self.workers)
+
+	def _key(self, path='', recursive=False) :
+		'''Cache key - the probed path and the modification time of its folder'''
+		try :
+			mtime = os.stat(_folder(path)).st_mtime
+		except OSError :
+			return None
+		return (path, bool(recursive), mtime)
+
+	def cached(self, path='', recursive=False) :
+		'''Returns the cached result for a path, or None'''
+		key = self._key(path, recursive)
+		if key is None :
+			return None
+		with self._lock :
+			return self._cache.get(key)
+
+	def probe(self, path='', recursive=False) :
+		'''Probes a path - a folder, or a name.*.ext wildcard - returning a ProbeResult'''
+		key = self._key(path, recursive)
+		if key is not None :
+			with self._lock :
+				result = self._cache.get(key)
+			if result is not None :
+				return result
+
+		with self._slots :
+			result = self._run(path, recursive)
+
+		# Timed out or failed probes are tried again next time
+		if key is not None and result.returncode == 0 and not result.timedOut :
+			with self._lock :
+				self._cache[key] = result
+				while len(self._cache) > cacheSize :
+					self._cache.popitem(last=False)
+		return result
+
+	def probe_all(self, paths=None, recursive=False) :
+		'''Probes several paths at the same time, returning their results in order'''
+		paths = paths or []
+		results = {}
+		pending = list(OrderedDict.fromkeys(paths))
+		lock = threading.Lock()
+
+		def _work() :
+			while True :
+				with lock :
+					if not pending :
+						return
+					path = pending.pop(0)
+				try :
+					result = self.probe(path, recursive)
+				except Exception :
+					result = ProbeResult(path=path, stderr=traceback.format_exc(), returncode=-1)
+				with lock :
+					results[path] = result
+
+		threads = []
+		for index in range(min(self.workers, len(pending))) :
+			thread = threading.Thread(target=_work, name='NIM_MediaProbe')
+			thread.daemon = True
+			thread.start()
+			threads.append(thread)
+		for thread in threads :
+			thread.join()
+		return [results[path] for path in paths]
+
+	def clear(self) :
+		'''Drops all cached results'''
+		with self._lock :
+			self._cache.clear()
+
+	def _run(self, path='', recursive=False) :
+		'''Runs the probe script, killing it if it runs past the timeout'''
+		script = self.script or getMediaScript()
+		if not script :
+			return ProbeResult(path=path, stderr="Flame script not installed: dl_get_media_info missing", returncode=-1)
+
+		args = [script]
+		if recursive :
+			args.append('-r')
+		# Expand wildcards the way the shell would, leaving them as they are if nothing matches
+		matches = sorted(glob.glob(path))
+		args.extend(matches or [path])
+
+		# Give the probe its own process group, so any processes it starts are killed with it
+		preexec_fn = None
+		if os.name == 'posix' :
+			preexec_fn = os.setsid
+		try :
+			process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, preexec_fn=preexec_fn)
+		except OSError, e :
+			return ProbeResult(path=path, stderr=str(e), returncode=-1)
+
+		timedOut = []
+		def _kill() :
+			timedOut.append(True)
+			try :
+				if preexec_fn :
+					os.killpg(process.pid, signal.SIGKILL)
+				else :
+					process.kill()
+			except OSError :
+				pass
+		timer = threading.Timer(self.timeout, _kill)
+		timer.start()
+		try :
+			std_out, std_err = process.communicate()
+		finally :
+			timer.cancel()
+			timer.join()
+		return ProbeResult(path=path, stdout=std_out, stderr=std_err, returncode=process.returncode, timedOut=bool(timedOut))
+
+
+# Probe shared by the openClip functions
+_probe = MediaProbe()
+
+def probe(path='', recursive=False) :
+	'''Probes a path with the shared MediaProbe'''
+	return _probe.probe(path, recursive)
+
+def probe_all(paths=None, recursive=False) :
+	'''Probes several paths at once with the shared MediaProbe'''
+	return _probe.probe_all(paths, recursive)
+
+def clear() :
+	'''Drops the shared MediaProbe's cached results'''
+	_probe.clear()
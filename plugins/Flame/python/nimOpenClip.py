@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: Flame/python/nimOpenClip.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+# An openClip .clip file held in memory while versions are added to it.
+# The master clip is read once, the paths of its feeds are indexed, every new
+# feed is merged in memory and the file is written once - atomically, with a
+# single backup of the original - when the clip is saved.
+
+import os,shutil,tempfile
+
+try:
+	import xml.etree.cElementTree as ET
+except ImportError:
+	import xml.etree.ElementTree as ET
+
+
+class OpenClip(object) :
+	'''An openClip file and the feed versions added to it'''
+
+	def __init__(self, masterFile='') :
+		self.masterFile = masterFile
+		self.root = None
+		self.paths = set()
+		self.exists = os.path.isfile(masterFile)
+		self.changed = False
+		self.versionsAdded = 0
+		if self.exists :
+			# Raises if the master clip can't be parsed
+			self.root = ET.parse(masterFile).getroot()
+			for srcPath in self.root.iter('path') :
+				self.paths.add(srcPath.text)
+
+	def add(self, newXML=None, elementBasename='') :
+		'''Merges the openClip XML output by dl_get_media_info in as a new version
+		   Returns True if any new feed was added'''
+		if isinstance(newXML, basestring) :
+			newXML = ET.fromstring(newXML)
+		if hasattr(newXML, 'getroot') :
+			newXML = newXML.getroot()
+
+		if self.root is None :
+			return self._create(newXML, elementBasename)
+
+		# Get first item in feed and use as the nbTicks reference
+		src_nbTicks = None
+		for srcFeed in self.root.iter('feed') :
+			src_nbTicksObj = srcFeed.find('startTimecode/nbTicks')
+			if src_nbTicksObj is not None :
+				src_nbTicks = src_nbTicksObj.text
+			break
+
+		elementsAdded = 0
+		for newTrack in newXML.iter('track') :
+			newFeed = newTrack.find('feeds/feed')
+
+			feedHandler = newFeed.find("./handler")
+			if feedHandler is not None :
+				newFeed.remove(feedHandler)
+
+			if src_nbTicks :
+				new_nbTicksObject = newTrack.find("feeds/feed/startTimecode/nbTicks")
+				if new_nbTicksObject is not None :
+					new_nbTicksObject.text = src_nbTicks
+
+			newPath = newTrack.find("feeds/feed/spans/span/path").text
+			print "newPath: %s" % newPath
+
+			# If Path exists ... skip append
+			if newPath in self.paths :
+				print "Element exists in clip... skipping append"
+				continue
+
+			# Append new feed to source track
+			for srcTrack in self.root.iter('track') :
+				newFeed.set('vuid', elementBasename)
+				srcTrack.find('feeds').append(newFeed)
+				print "Appending element: %s" % elementBasename
+				elementsAdded += 1
+			self.paths.add(newPath)
+
+		if elementsAdded > 0 :
+			# Append vUID to versions
+			newVersion = self.root.find('versions')
+			newVersionElement = ET.Element("version", {"type": "version", "uid": elementBasename})
+			newVersion.insert(0, newVersionElement)
+			self.changed = True
+			self.versionsAdded += 1
+			return True
+		return False
+
+	def _create(self, newXML=None, elementBasename='') :
+		'''Starts a new openClip from the first version'''
+		print "Building new openClip"
+		for newFeeds in newXML.iter('feeds') :
+			feed = newFeeds.find('feed')
+			feed.set('vuid', elementBasename)
+
+			feedHandler = feed.find("./handler")
+			if feedHandler is not None :
+				feed.remove(feedHandler)
+
+		for newVersion in newXML.iter('versions') :
+			newVersion.set('currentVersion', elementBasename)
+			version = newVersion.find('version')
+			version.set('uid', elementBasename)
+			version.set('type', 'version')
+
+		self.root = newXML
+		for srcPath in self.root.iter('path') :
+			self.paths.add(srcPath.text)
+		self.changed = True
+		self.versionsAdded += 1
+		return True
+
+	def backup(self) :
+		'''Copies the master clip to the next free .bak file'''
+		masterFile = self.masterFile
+		bakfile = "%s.bak" % masterFile
+		if not os.path.isfile(bakfile):
+			shutil.copy2(masterFile,bakfile)
+			return bakfile
+		for i in range ( 1, 99 ):
+			bakfile = "%s.bak.%02d" % ( masterFile, i )
+			if not os.path.isfile(bakfile):
+				shutil.copy2(masterFile,bakfile)
+				return bakfile
+		bakfile = "%s.bak.last" % masterFile
+		shutil.copy2(masterFile,bakfile)
+		return bakfile
+
+	def save(self) :
+		'''Writes the clip if versions were added - returns True if it was written'''
+		if not self.changed :
+			return False
+
+		# Clean tmpfile - brute force remove errant <root/handler>
+		for handler in self.root.findall("./handler") :
+			self.root.remove(handler)
+		resultXML = ET.tostring(self.root)
+
+		# Create a backup of the original file
+		if self.exists :
+			self.backup()
+
+		# Write next to the master clip, then move over it
+		clipDir = os.path.dirname(os.path.abspath(self.masterFile))
+		fd, tmpfile = tempfile.mkstemp(prefix='.'+os.path.basename(self.masterFile)+'.', dir=clipDir)
+		try :
+			os.write(fd, resultXML)
+		finally :
+			os.close(fd)
+		try :
+			if self.exists :
+				shutil.copymode(self.masterFile, tmpfile)
+			else :
+				os.chmod(tmpfile, 0666 & ~_umask())
+			try :
+				os.rename(tmpfile, self.masterFile)
+			except OSError :
+				# Windows won't rename over an existing file
+				os.remove(self.masterFile)
+				os.rename(tmpfile, self.masterFile)
+		except :
+			if os.path.isfile(tmpfile) :
+				os.remove(tmpfile)
+			raise
+
+		print "openClip Updated: %s" % self.masterFile
+		self.exists = True
+		self.changed = False
+		return True
+
+
+def _umask() :
+	'''Returns the process umask'''
+	mask = os.umask(0)
+	os.umask(mask)
+	return mask
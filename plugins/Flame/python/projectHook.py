@@ -23,6 +23,12 @@ def projectChanged(projectName):
 # Hook called when application is fully initialized
 # projectName: the project that was loaded -- String
 def appInitialized( projectName ):
+   # Load the NIM data the dialogs need before the first one is opened
+   try :
+      import nimFlameExport
+      nimFlameExport.nimWarmSession()
+   except Exception, e :
+      print "NIM - Failed to load NIM data: %s" % e
    pass
 
 
@@ -19,6 +19,10 @@
 #import nim_core.nim_prefs as Prefs
 #Prefs.mk_default( notify_success=True )
 
+#  Warm the NIM connection and caches in the background :
+import nim_core.nim_prewarm as nimPrewarm
+nimPrewarm.start()
+
 try:
 	isNuke = False
 	if nuke.env['NukeVersionMajor'] > 6:
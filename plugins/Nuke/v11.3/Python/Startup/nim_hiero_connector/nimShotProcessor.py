@@ -19,7 +19,7 @@ from hiero.exporters.FnEffectHelpers import ensureEffectsNodesCreated
 
 #NIM
 import os.path
-import sys,re
+import sys,re,traceback
 import base64
 import platform
 import ntpath
@@ -30,6 +30,12 @@ import nim_core.nim_prefs as nimPrefs
 import nim_core.nim_file as nimFile
 import nim_core.nim_win as nimWin
 import nim_core.nim as nim
+import nim_core.nim_batch as nimBatch
+import nim_core.nim_versions as nimVersions
+
+import hiero.ui
+from PySide2.QtCore import Qt
+from PySide2.QtWidgets import QApplication, QProgressDialog
 
 import nimHieroConnector
 #END NIM
@@ -100,6 +106,130 @@ def buildTagsData(exportItems):
   return tags
 
 
+def nimGetUser():
+  """ Get the NIM user name and ID from the preferences, asking for the user if it can't be found. """
+  nim_prefInfo = nimPrefs.read()
+  user = nim_prefInfo['NIM_User']
+  userID = nimAPI.get_userID(user)
+  if not userID :
+    nimUI.GUI().update_user()
+    userInfo=nim.NIM().userInfo()
+    user = userInfo['name']
+    userID = userInfo['ID']
+  return user, userID
+
+
+def nimRegisterShot(showID, shot):
+  """ Add or update a shot in NIM, then get its paths and bring it online.  Runs on a NIM batch
+      worker thread, so only uses the data gathered in shot and never touches the track item. """
+  result = False
+  try:
+    result = _nimRegisterShot(showID, shot)
+  finally:
+    # The icon upload only runs for registered shots - otherwise the icon is removed here
+    if not result:
+      nimRemoveShotIcon(shot)
+  return result
+
+
+def _nimRegisterShot(showID, shot):
+  name = shot['name']
+  if shot['shotID']:
+    #update existing shot in NIM
+    shotInfo = nimAPI.update_shot( shot['shotID'], shot['duration'] )
+    if not shotInfo or not shotInfo['success']:
+      print "NIM: Failed to update trackitem %s in NIM" % name
+      return False
+    print "NIM: Successfully updated trackitem %s in NIM" % name
+  else:
+    #NO TAG found so create new shot in NIM... if shot exists with same name in NIM, link to this trackitem
+    shotInfo = nimAPI.add_shot( showID=showID, name=name, frames=shot['duration'] )
+    if not shotInfo or shotInfo['success'] != 'true':
+      print 'NIM: Failed to export trackitem %s' % name
+      if shotInfo and shotInfo.get('error'):
+        print "		ERROR: %s" % shotInfo['error']
+      return False
+    shot['shotID'] = shotInfo['ID']
+    print "NIM: Added trackitem %s as shotID %s" % (name, shot['shotID'])
+    if 'error' in shotInfo:
+      print "		WARNING: %s" % shotInfo['error']
+
+  # The shot is in NIM now - it is returned to be tagged even if the steps below fail,
+  # so the next export doesn't create it again
+  try:
+    shot['paths'] = nimAPI.get_paths('shot', shot['shotID']) or None
+
+    #BRING SHOT ONLINE AND CREATE PROJECT STRUCTURE FOLDERS
+    bringOnline_result = nimAPI.bring_online( item='shot', shotID=shot['shotID'] )
+    if not bringOnline_result:
+      print 'NIM: Failed to bring shot online'
+    elif bringOnline_result.get('success') == 'false':
+      print 'NIM: Failed to bring shot online'
+      print 'NIM: %s' % bringOnline_result.get('error')
+    elif bringOnline_result.get('success') == 'true':
+      print 'NIM: Shot brought online %s' % name
+    else :
+      print 'NIM: bringOnline returned and invalid status'
+  except Exception:
+    print 'NIM: Failed to bring shot %s online' % name
+    print traceback.format_exc()
+  return shot
+
+
+def nimRemoveShotIcon(shot):
+  """ Remove the temporary thumbnail saved for a shot. """
+  try:
+    os.remove(shot['icon'])
+  except OSError:
+    pass
+
+
+def nimUploadShotIcon(shot):
+  """ Upload the thumbnail saved for a shot, once the shot is in NIM. """
+  try:
+    apiInfo = nimAPI.upload_shotIcon( shot['shotID'], shot['icon'] )
+  finally:
+    nimRemoveShotIcon(shot)
+  if apiInfo != True:
+    print 'NIM: Failed to upload icon for trackitem %s' % shot['name']
+    return False
+  print "NIM: Successfully uploaded icon for %s" % shot['name']
+  return True
+
+
+def nimLogComp(shotID, task_type_ID, task_folder, userID, basename, filename, path, ext, version, comment, serverID, pub, forceLink, work, versionIndex=None):
+  """ Log an exported Nuke comp in NIM, updating the version with the same file name if there is one.
+      The comps of an export share a version index, so each basename's versions are only fetched once. """
+  if versionIndex is None:
+    versionIndex = nimVersions.VersionIndex()
+  file_apiResult = versionIndex.log_file( parent='shot', parentID=shotID, task_type_ID=task_type_ID, task_folder=task_folder, userID=userID, basename=basename, filename=filename, path=path, ext=ext, version=version, comment=comment, serverID=serverID, pub=pub, forceLink=forceLink, work=work )
+  print file_apiResult
+  return file_apiResult
+
+
+def nimRunBatch(batch, label):
+  """ Run a NIM batch on its worker threads, showing its progress.  Returns False if it was cancelled. """
+  if not len(batch):
+    return True
+  progress = QProgressDialog(label, 'Cancel', 0, len(batch), hiero.ui.mainWindow())
+  progress.setWindowTitle('NIM')
+  progress.setWindowModality(Qt.WindowModal)
+  progress.setMinimumDuration(500)
+
+  def updateProgress(done, total):
+    progress.setValue(done)
+    QApplication.processEvents()
+    return not progress.wasCanceled()
+
+  try:
+    batch.run(progress=updateProgress)
+  finally:
+    progress.close()
+  for job in batch.failed():
+    print 'NIM: %s - %s' % (job.key, job.error)
+  return not batch.cancelled()
+
+
 class NimShotProcessor(hiero.core.ProcessorBase):
 
   # Settings for determining the start frame of an export.  Note that 'Sequence' is currently disabled.
@@ -190,6 +320,80 @@ class NimShotProcessor(hiero.core.ProcessorBase):
       return False
 
 
+  def _nimRegisterShots(self, exportTrackItems, ignoredTrackItems):
+    """ Add or update the shots for the video track items in NIM and tag the track items and
+        their copies.  The NIM calls run on a pool of worker threads - the shots first, then their
+        icons - while the track items and tags are only touched here, on the main thread.
+        Returns a dictionary of NIM shot IDs by track item, or False if the user cancelled. """
+    nim_showID = nimHieroConnector.g_nim_showID
+    print 'NIM: showID=%s' % nim_showID
+    nimConnect = nimHieroConnector.NimHieroConnector()
+    nim_hiero_home = os.path.normpath( os.path.join( nimPrefs.get_home(), 'apps', 'Hiero' ) )
+
+    batch = nimBatch.Batch()
+    shots = []
+    taggedSequences = []
+    for trackitem, trackitemCopy in exportTrackItems:
+      if trackitem in ignoredTrackItems:
+        continue
+      #SKIP IF NOT VIDEO TRACK ITEM
+      if trackitem.mediaType() != hiero.core.TrackItem.MediaType.kVideo:
+        continue
+
+      sequence = trackitem.parentSequence()
+      if sequence not in taggedSequences:
+        nimConnect.setSequenceTag(sequence, nim_showID)
+        taggedSequences.append(sequence)
+
+      nim_shotID = None
+      nim_tag = nimConnect.getNimTag(trackitem)
+      if nim_tag != False:
+        nim_shotID = nim_tag.metadata().value("tag.shotID")
+
+      # Items linked to the same shot, or named the same, are only sent to NIM once so
+      # parallel requests can't add the same shot twice
+      if nim_shotID:
+        key = 'shot %s' % nim_shotID
+      else:
+        key = 'new shot %s' % trackitem.name()
+      shots.append((trackitem, trackitemCopy, key))
+      if key in batch:
+        continue
+
+      # Thumbnails come from the track item, so are made here and uploaded by the workers
+      icon_path = os.path.join(nim_hiero_home, 'shoticon_%s.png' % len(batch))
+      trackitem.thumbnail(trackitem.sourceIn()).save(icon_path, "PNG", -1)
+      shot = { 'name': trackitem.name(), 'duration': trackitem.duration(), 'shotID': nim_shotID, 'paths': None, 'icon': icon_path }
+      batch.add(key, nimRegisterShot, args=(nim_showID, shot))
+      batch.add(key+' icon', nimUploadShotIcon, args=(shot,), after=[key])
+
+    print 'NIM: Updating %s shots' % len(shots)
+    if not nimRunBatch(batch, 'NIM: Updating shots...'):
+      print 'NIM: Export cancelled'
+      # Icons of the shots the cancelled batch didn't get to
+      for job in batch.jobs():
+        if job.func is nimUploadShotIcon:
+          nimRemoveShotIcon(job.args[0])
+      return False
+
+    nim_shotIDs = {}
+    for trackitem, trackitemCopy, key in shots:
+      shot = batch.result(key)
+      if shot:
+        nim_tag = nimConnect.setShotTag(trackitem, nim_showID, shot['shotID'], shot['paths'])
+      else:
+        nim_tag = nimConnect.getNimTag(trackitem)
+
+      #GET UPDATED NIM TAG AND COPY TO CLONE
+      if nim_tag != False:
+        nim_shotIDs[trackitem] = nim_tag.metadata().value("tag.shotID")
+        print 'NIM: Copying nim_tag to clone'
+        trackitemCopy.addTag(nim_tag)
+      else:
+        print 'NIM: Could not copy nim_tag to copy.. tag not found'
+    return nim_shotIDs
+
+
   def startProcessing(self, exportItems, preview=False):
     hiero.core.log.debug( "NimShotProcessor::startProcessing(" + str(exportItems) + ")" )
 
@@ -409,6 +613,19 @@ class NimShotProcessor(hiero.core.ProcessorBase):
 
     ''' ****************** NIM END CHECK ONLINE STATUS AND VBPS ****************** '''
 
+    ''' ****************** NIM START UPDATE TRACKITEMS ****************** '''
+    # The shots are added to NIM and tagged before any task is made, as the export keywords read the tags
+    nim_shotIDs = self._nimRegisterShots(exportTrackItems, ignoredTrackItems)
+    if nim_shotIDs is False:
+      return False
+
+    # Elements and comps are logged together once every task has been made
+    nim_publishBatch = nimBatch.Batch()
+    nim_versionIndex = nimVersions.VersionIndex()
+    nim_user = None
+    nim_userID = None
+    ''' ****************** NIM END UPDATE TRACKITEMS ****************** '''
+
 
     allTasks = []
 
@@ -440,78 +657,8 @@ class NimShotProcessor(hiero.core.ProcessorBase):
 
       ''' ****************** NIM START UPDATE TRACKITEM ****************** '''
       print "exporting trackItem: %s" % trackitem.name()
-
-      #Test for video track
-      exportTrackItem = False
-      trackItem_mediaType = trackitem.mediaType()
-      if trackItem_mediaType == hiero.core.TrackItem.MediaType.kVideo:
-        print "Processing Video TrackItem"
-        exportTrackItem = True
-
-      #SKIP IF NOT VIDEO TRACK ITEM
-      if exportTrackItem:
-        nim_shotID = None
-        nim_shotPaths = {}
-        nim_platesPath = 'PLATES'
-        updateThumbnail = True
-
-        #global g_nim_showID
-        nim_showID = nimHieroConnector.g_nim_showID
-        print 'NIM: showID=%s' % nim_showID
-
-        name = trackitem.name()
-
-        nimConnect = nimHieroConnector.NimHieroConnector()
-        nim_tag = nimConnect.getNimTag(trackitem)
-
-        if nim_tag != False:
-          #print "NIM: Tag Found"
-          #print         nim_tag
-
-          #update existing shot in NIM
-          nim_shotID = nim_tag.metadata().value("tag.shotID")
-          print 'NIM: shotID=%s' % nim_shotID
-
-          success = nimConnect.updateTrackItem(nim_showID, trackitem)
-          if success:
-            print "NIM: Successfully updated trackitem %s in NIM" % name
-            if updateThumbnail:
-              success = nimConnect.updateShotIcon(trackitem)
-              if success == False:
-                print 'NIM: Failed to upload icon'
-          else:
-            print "NIM: Failed to update trackitem %s in NIM" % name
-
-        else:
-          #NO TAG found so create new shot in NIM... if shot exists with same name in NIM, link to this trackitem
-          print 'NIM: Tag Not Found  Exporting as new trackitem'
-          nim_shotID = nimConnect.exportTrackItem(nim_showID, trackitem)
-          if nim_shotID == False:
-            print 'NIM: Failed to export trackitem %s' % name
-          else:
-            if updateThumbnail:
-              success = nimConnect.updateShotIcon(trackitem)
-              if success == False:
-                print 'NIM: Failed to upload icon for trackitem %s' % name
-
-        #BRING SHOT ONLINE AND CREATE PROJECT STRUCTURE FOLDERS
-        bringOnline_result = nimAPI.bring_online( item='shot', shotID=nim_shotID )
-        if bringOnline_result['success'] == 'false':
-          print 'NIM: Failed to bring shot online'
-          print 'NIM: %s' % bringOnline_result['error']
-        elif bringOnline_result['success'] == 'true':
-          print 'NIM: Shot brought online %s' % name
-        else :
-          print 'NIM: bringOnline returned and invalid status'
-
-        #GET UPDATED NIM TAG AND COPY TO CLONE
-        nim_tag = nimConnect.getNimTag(trackitem)
-        if nim_tag != False:
-          print 'NIM: Copying nim_tag to clone'
-          trackitemCopy.addTag(nim_tag)
-        else:
-          print 'NIM: Could not copy nim_tag to copy.. tag not found'
-
+      nim_shotID = nim_shotIDs.get(trackitem)
+      print 'NIM: shotID=%s' % nim_shotID
 
       ''' ****************** NIM END UPDATE TRACKITEM ****************** '''
       
@@ -608,21 +755,19 @@ class NimShotProcessor(hiero.core.ProcessorBase):
           print "preset name: %s" % presetName
           #print "export name: %s" % presetExportName
           
-          nim_prefInfo = nimPrefs.read()
-          user = nim_prefInfo['NIM_User']
-          userID = nimAPI.get_userID(user)
-          if not userID :
-            nimUI.GUI().update_user()
-            userInfo=nim.NIM().userInfo()
-            user = userInfo['name']
-            userID = userInfo['ID']
+          if nim_userID is None:
+            nim_user, nim_userID = nimGetUser()
+          user = nim_user
+          userID = nim_userID
           print "NIM: user=%s" % user
           print "NIM: userID: %s" % userID
 
           if presetName == 'hiero.exporters.FnTranscodeExporter.TranscodeExporter' \
             or presetName == 'hiero.exporters.FnCopyExporter.CopyExporter' \
             or presetName == 'hiero.exporters.FnSymLinkExporter.SymLinkExporter' :
-            if nimHieroConnector.g_nim_publishElement == True:
+            if nimHieroConnector.g_nim_publishElement == True and not nim_shotID:
+              print "NIM: Skipping element %s, the shot is not in NIM" % element_fileName
+            elif nimHieroConnector.g_nim_publishElement == True:
               print "NIM: Publish Element"
               print "     shotID=", nim_shotID
               print "     name=", trackitem.name()
@@ -633,9 +778,10 @@ class NimShotProcessor(hiero.core.ProcessorBase):
               print "     endFrame=", element_endFrame
               print "     cutHandles=", cutHandles
             
-              element_result = nimAPI.add_element( parent='shot', parentID=nim_shotID, userID=userID, typeID=nimHieroConnector.g_nim_elementTypeID, \
-                                                    path=element_filePath, name=element_fileName, startFrame=element_startFrame, endFrame=element_endFrame, \
-                                                    handles=cutHandles, isPublished=nimHieroConnector.g_nim_publishElement )
+              nim_publishBatch.add( '%s: element %s' % (len(nim_publishBatch), element_fileName), nimAPI.add_element, \
+                                    kwargs=dict( parent='shot', parentID=nim_shotID, userID=userID, typeID=nimHieroConnector.g_nim_elementTypeID, \
+                                                 path=element_filePath, name=element_fileName, startFrame=element_startFrame, endFrame=element_endFrame, \
+                                                 handles=cutHandles, isPublished=nimHieroConnector.g_nim_publishElement ) )
 
           elif presetName == 'hiero.exporters.FnNukeShotExporter.NukeShotExporter':
             if nimHieroConnector.g_nim_publishComp == True:
@@ -686,31 +832,6 @@ class NimShotProcessor(hiero.core.ProcessorBase):
               print "filename: %s" % filename
               print "version: %s" % version
 
-              # Verify entry is not duplicate of existing version
-              nim_doUpdate = False
-
-              # Get versions for basename
-              nim_versions = {}
-              nim_versionID = 0
-              nim_versions = nimAPI.get_vers(shotID=nim_shotID, basename=basename)
-              print "Versions Returned: %s" % nim_versions
-
-              # if file matching class / basename / filename / version
-              try:
-                if len(nim_versions)>0:
-                  print "Existing versions found" 
-                  for versionItem in nim_versions:
-                    if versionItem['filename'] == filename:
-                      print "Existing Version Found"
-                      nim_versionID = versionItem['fileID']
-                      print "versionID: %s" % nim_versionID
-                      nim_doUpdate = True
-                else:
-                  print "No existing versions found"
-              except:
-                print "Failed to load existing versions from NIM"
-                pass
-              
               comment = 'Nuke Project File exported from NukeStudio'
               
               serverID = nimHieroConnector.g_nim_serverID
@@ -724,15 +845,16 @@ class NimShotProcessor(hiero.core.ProcessorBase):
               forceLink = 0 # lazy symlink as files wont exist yet
               work = True # set comp as working file
 
+              if not nim_shotID:
+                print "The shot is not in NIM.\n \
+                       The Nuke comp will be created but not logged into NIM."
+                nim_doSave = False
+
               if nim_doSave is True:
-                if nim_doUpdate is True:
-                  print "Updating file data in NIM"
-                  file_apiResult = nimAPI.update_file( ID=nim_versionID, task_type_ID=task_type_ID, task_folder=task_folder, userID=userID, basename=basename, filename=filename, path=filepath, ext=ext, version=version, comment=comment, serverID=serverID, pub=pub, forceLink=forceLink, work=work )
-                  print file_apiResult
-                else:
-                  print "Saving file data to NIM"
-                  file_apiResult = nimAPI.save_file( parent='shot', parentID=nim_shotID, task_type_ID=task_type_ID, task_folder=task_folder, userID=userID, basename=basename, filename=filename, path=filepath, ext=ext, version=version, comment=comment, serverID=serverID, pub=pub, forceLink=forceLink, work=work )
-                  print file_apiResult
+                nim_publishBatch.add( '%s: comp %s' % (len(nim_publishBatch), filename), nimLogComp, \
+                                      kwargs=dict( shotID=nim_shotID, task_type_ID=task_type_ID, task_folder=task_folder, userID=userID, basename=basename, \
+                                                   filename=filename, path=filepath, ext=ext, version=version, comment=comment, serverID=serverID, \
+                                                   pub=pub, forceLink=forceLink, work=work, versionIndex=nim_versionIndex ) )
           elif presetName == 'hiero.exporters.FnExternalRender.NukeRenderTask':
             #Skip - user to publish element at comp render time
             pass
@@ -752,6 +874,10 @@ class NimShotProcessor(hiero.core.ProcessorBase):
         if len(taskGroup.children()) > 0:
           self._submission.addChild( taskGroup )
 
+    ''' ****************** NIM START PUBLISH ELEMENTS ****************** '''
+    nimRunBatch(nim_publishBatch, 'NIM: Logging elements and comps...')
+    ''' ****************** NIM END PUBLISH ELEMENTS ****************** '''
+
     if not preview:
       # If processor is flagged as Synchronous, flag tasks too
       if self._synchronous:
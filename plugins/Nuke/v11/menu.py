@@ -22,6 +22,10 @@ nuke.addOnScriptSave(nim_tools.updateNimWriteNodes)
 import nim_core.nim_prefs as menuPrefs
 menuPrefs.mk_default( notify_success=True )
 
+#  Warm the NIM connection and caches in the background :
+import nim_core.nim_prewarm as nimPrewarm
+nimPrewarm.start()
+
 try:
 	isNuke = False
 	if nuke.env['NukeVersionMajor'] > 6:
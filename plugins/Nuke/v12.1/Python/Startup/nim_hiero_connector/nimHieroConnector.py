@@ -287,6 +287,47 @@ class NimHieroConnector():
 			return False
 
 
+	def setSequenceTag(self, sequence, showID):
+		'''Add or update the NIM tag holding the showID on a sequence'''
+		nim_sequence_tag = self.getNimTag(sequence)
+		if nim_sequence_tag != False:
+			nim_sequence_tag.metadata().setValue("tag.showID" , showID)
+		else:
+			nim_sequence_tag = hiero.core.Tag("NIM")
+			nim_sequence_tag.metadata().setValue("tag.showID" , showID)
+			nim_script_path = os.path.dirname(__file__)
+			nim_icon_path = os.path.join(nim_script_path,'NIM.png')
+			nim_sequence_tag.setIcon(nim_icon_path)
+			sequence.addTag(nim_sequence_tag)
+		return nim_sequence_tag
+
+
+	def setShotTag(self, trackItem, showID, shotID, shotPaths=None):
+		'''Add a NIM tag linking trackItem to a shot, or update the paths on its existing tag'''
+		nim_tag = self.getNimTag(trackItem)
+		if nim_tag == False:
+			nim_tag = hiero.core.Tag("NIM")
+			nim_tag.metadata().setValue("tag.showID" , showID)
+			nim_tag.metadata().setValue("tag.shotID" , shotID)
+			nim_tag.metadata().setValue("tag.shotPath" , trackItem.name())
+			nim_tag.metadata().setValue("tag.platesPath" , 'PLATES')
+			nim_tag.metadata().setValue("tag.renderPath" , 'RENDER')
+			nim_tag.metadata().setValue("tag.compPath" , 'COMP')
+			nim_script_path = os.path.dirname(__file__)
+			nim_icon_path = os.path.join(nim_script_path,'NIM.png')
+			nim_tag.setIcon(nim_icon_path)
+			# Tags are copied when added, so fetch the one on the trackItem
+			trackItem.addTag(nim_tag)
+			nim_tag = self.getNimTag(trackItem)
+
+		if shotPaths:
+			nim_tag.metadata().setValue("tag.shotPath" , shotPaths['root'])
+			nim_tag.metadata().setValue("tag.platesPath" , shotPaths['plates'])
+			nim_tag.metadata().setValue("tag.renderPath" , shotPaths['renders'])
+			nim_tag.metadata().setValue("tag.compPath" , shotPaths['comps'])
+		return nim_tag
+
+
 	def updateShotIcon(self, trackItem):
 		'''Create thumbnail from trackItem and upload to NIM'''
 		
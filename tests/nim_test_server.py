@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/nim_test_server.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  A local stand-in for the NIM API, used by the tests and benchmarks.  It answers
+#  queries by their "q" parameter from a table of routes, serves images from /img/,
+#  and records every request it gets, so callers can count what reached the server :
+#
+#      server=NimTestServer( routes={'getShotIcon': _icon}, delay=0.05 )
+#      with server :
+#          client=nim_client.NimClient( nimURL=server.url, apiUser='test' )
+#          client.get( {'q': 'getShotIcon', 'ID': 1} )
+#      server.hits( 'getShotIcon' )
+#
+#  A route is either the JSON result, or a function taking ( params, headers ) that
+#  returns it.  Unknown queries return an empty list.
+
+
+#  General Imports :
+import BaseHTTPServer, SocketServer, cgi, json, threading, time, urlparse
+
+
+class _Server( SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer ) :
+    daemon_threads=True
+    request_queue_size=128
+
+
+class _Handler( BaseHTTPServer.BaseHTTPRequestHandler ) :
+    protocol_version='HTTP/1.0'
+
+    def log_message( self, format, *args ) :
+        return
+
+    def do_GET(self) :
+        parsed=urlparse.urlsplit( self.path )
+        if parsed.path.startswith( '/img/' ) :
+            self.server.owner._serveImage( self, parsed.path[len('/img/'):] )
+            return
+        params=dict( urlparse.parse_qsl( parsed.query, keep_blank_values=True ) )
+        self.server.owner._serveQuery( self, params )
+
+    def do_POST(self) :
+        length=int( self.headers.get( 'Content-Length', 0 ) or 0 )
+        body=self.rfile.read( length )
+        contentType, options=cgi.parse_header( self.headers.get( 'Content-Type', '' ) )
+        params=dict( urlparse.parse_qsl( urlparse.urlsplit( self.path ).query, keep_blank_values=True ) )
+        if contentType=='multipart/form-data' :
+            #  File uploads - only the plain fields are kept :
+            for part in body.split( '--'+options.get( 'boundary', '' ) ) :
+                head, sep, value=part.partition( '\r\n\r\n' )
+                if sep and 'filename=' not in head and 'name="' in head :
+                    params[head.split( 'name="' )[1].split( '"' )[0]]=value.rstrip( '\r\n' )
+        else :
+            params.update( dict( urlparse.parse_qsl( body, keep_blank_values=True ) ) )
+        self.server.owner._serveQuery( self, params )
+
+
+class NimTestServer( object ) :
+    'A threaded HTTP server on 127.0.0.1 that answers NIM API queries'
+
+    def __init__( self, routes=None, images=None, delay=0.0 ) :
+        self.routes=dict( routes or {} )
+        self.images=dict( images or {} )
+        self.delay=delay
+        self.requests=[]
+        self.active=0
+        self.maxActive=0
+        self._lock=threading.Lock()
+        self._server=None
+        self._thread=None
+        return
+
+    def __enter__(self) :
+        self.start()
+        return self
+
+    def __exit__( self, *args ) :
+        self.stop()
+        return False
+
+    def start(self) :
+        'Starts serving on a free port'
+        self._server=_Server( ('127.0.0.1', 0), _Handler )
+        self._server.owner=self
+        self._thread=threading.Thread( target=self._server.serve_forever, name='NIM_TestServer' )
+        self._thread.daemon=True
+        self._thread.start()
+        return
+
+    def stop(self) :
+        'Stops the server'
+        if self._server is not None :
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server=None
+        return
+
+    @property
+    def root(self) :
+        return 'http://127.0.0.1:%d/' % self._server.server_address[1]
+
+    @property
+    def url(self) :
+        'The API URL, as it is stored in the NIM preferences'
+        return self.root+'nimAPI.php?'
+
+    def hits( self, q=None ) :
+        'Returns the number of requests received - all of them, or those for one query'
+        with self._lock :
+            return len( [req for req in self.requests if q is None or req['q']==q] )
+
+    def reset(self) :
+        'Forgets the requests received so far'
+        with self._lock :
+            del self.requests[:]
+            self.maxActive=0
+        return
+
+    def _begin( self, handler=None, q='' ) :
+        record={'q': q, 'path': handler.path, 'method': handler.command, 'headers': dict( handler.headers.items() ),
+            'thread': threading.current_thread().name}
+        with self._lock :
+            self.requests.append( record )
+            self.active+=1
+            self.maxActive=max( self.maxActive, self.active )
+        return record
+
+    def _end(self) :
+        with self._lock :
+            self.active-=1
+        return
+
+    def _send( self, handler=None, code=200, contentType='application/json', data='' ) :
+        handler.send_response( code )
+        handler.send_header( 'Content-Type', contentType )
+        handler.send_header( 'Content-Length', str(len(data)) )
+        handler.end_headers()
+        handler.wfile.write( data )
+        return
+
+    def _serveQuery( self, handler=None, params=None ) :
+        record=self._begin( handler, params.get( 'q', '' ) )
+        record['params']=params
+        try :
+            if self.delay :
+                time.sleep( self.delay )
+            route=self.routes.get( params.get( 'q' ), [] )
+            if callable( route ) :
+                route=route( params, record['headers'] )
+            self._send( handler, data=json.dumps( route ) )
+        finally :
+            self._end()
+        return
+
+    def _serveImage( self, handler=None, name='' ) :
+        self._begin( handler, 'img' )
+        try :
+            if self.delay :
+                time.sleep( self.delay )
+            data=self.images.get( name )
+            if data is None :
+                self._send( handler, code=404, contentType='text/plain', data='Not Found' )
+            else :
+                self._send( handler, contentType='image/jpeg', data=data )
+        finally :
+            self._end()
+        return
+
+
+#  End
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_export_spool.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Tests the Flame export spool - claiming events to flush, replaying a claimed
+#  file that was partly sent, and finding the spools left by exports that died.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import os, shutil, socket, subprocess, sys, tempfile, unittest
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( root, 'plugins', 'Flame', 'python' ) )
+
+#  NIM Imports :
+import nimExportSpool as Spool
+
+
+def _deadPid() :
+    'Returns the ID of a process that has finished'
+    process=subprocess.Popen( [sys.executable, '-c', 'pass'] )
+    process.wait()
+    return process.pid
+
+
+class ExportSpoolTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.spoolDir=tempfile.mkdtemp( prefix='nim_spool_' )
+        self.hostname=socket.gethostname().replace( '_', '-' )
+        return
+
+    def tearDown(self) :
+        shutil.rmtree( self.spoolDir, ignore_errors=True )
+        return
+
+    def _files( self, ext='' ) :
+        return sorted( [name for name in os.listdir( self.spoolDir ) if name.endswith( ext )] )
+
+    def test_claim_replay(self) :
+        'A claimed file replays only the events not marked done, and new events start a new spool'
+        spool=Spool.ExportSpool( self.spoolDir, Spool.newSpoolName() )
+        for shot in ['SH010', 'SH020', 'SH030'] :
+            spool.add( {'shot': shot} )
+        claimed=spool.claim()
+        self.assertFalse( os.path.exists( spool.path ) )
+        self.assertIsNone( spool.claim() )
+        spool.add( {'shot': 'SH040'} )
+
+        events=Spool.read( claimed )
+        self.assertEqual( [event['shot'] for event in events], ['SH010', 'SH020', 'SH030'] )
+        Spool.markDone( claimed, events[0] )
+        Spool.markDone( claimed, events[1] )
+        #  A line cut short by a crash is skipped :
+        with open( claimed, 'a' ) as f :
+            f.write( '{"done": ' )
+        events=Spool.read( claimed )
+        self.assertEqual( [event['shot'] for event in events], ['SH030'] )
+
+        self.assertEqual( Spool.release( claimed, spool, retry=events ), [] )
+        self.assertFalse( os.path.exists( claimed ) )
+        events=Spool.read( spool.claim() )
+        self.assertEqual( [(event['shot'], event['attempts']) for event in events], [('SH040', 0), ('SH030', 1)] )
+
+    def test_release_drops(self) :
+        'An event tried maxAttempts times is dropped instead of requeued'
+        spool=Spool.ExportSpool( self.spoolDir, Spool.newSpoolName() )
+        spool.add( {'shot': 'SH010', 'attempts': Spool.maxAttempts-1} )
+        claimed=spool.claim()
+        dropped=Spool.release( claimed, spool, retry=Spool.read( claimed ) )
+        self.assertEqual( [event['shot'] for event in dropped], ['SH010'] )
+        self.assertIsNone( spool.claim() )
+
+    def test_abandoned(self) :
+        'Spools and claims of exports that died are found, those still running are left alone'
+        deadPid=_deadPid()
+        dead=Spool.ExportSpool( self.spoolDir, '%s_%d_1_1' % (self.hostname, deadPid) )
+        dead.add( {'shot': 'SH010'} )
+        #  Claimed by a flush that died part way :
+        flushed=Spool.ExportSpool( self.spoolDir, '%s_%d_2_1' % (self.hostname, deadPid) )
+        flushed.add( {'shot': 'SH020'} )
+        claimed=flushed.claim()
+        os.rename( claimed, os.path.join( self.spoolDir, '%s.%d.2%s' % (flushed.name, deadPid, Spool.claimExt) ) )
+        #  Running in this process :
+        running=Spool.ExportSpool( self.spoolDir, Spool.newSpoolName() )
+        running.add( {'shot': 'SH030'} )
+        #  Finished, with nothing left to send :
+        empty=Spool.ExportSpool( self.spoolDir, '%s_%d_3_1' % (self.hostname, deadPid) )
+        os.close( os.open( os.path.join( self.spoolDir, empty.name+Spool.closedExt ), os.O_CREAT | os.O_WRONLY ) )
+
+        found=dict( [(spool.name, claims) for spool, claims in Spool.abandoned( self.spoolDir )] )
+        self.assertEqual( sorted( found ), sorted( [dead.name, flushed.name] ) )
+        self.assertEqual( found[dead.name], [] )
+        self.assertEqual( [Spool.read( path )[0]['shot'] for path in found[flushed.name]], ['SH020'] )
+        self.assertEqual( self._files( Spool.closedExt ), [] )
+
+        #  Once this process has finished the sequence, its events are retried too :
+        running.close()
+        found=[spool.name for spool, claims in Spool.abandoned( self.spoolDir )]
+        self.assertIn( running.name, found )
+
+
+if __name__=='__main__' :
+    unittest.main()
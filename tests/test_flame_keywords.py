@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_flame_keywords.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Tests the Flame batch keyword rewrite - nimFlameExport.rewriteKeywords, and
+#  resolveBatchKeywords scanning each export_node once and looking the shot's
+#  keywords up once.  nimFlameExport needs Qt to import; the tests are skipped
+#  without it.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import os, shutil, stat, sys, tempfile, unittest
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( root, 'plugins', 'Flame', 'python' ) )
+
+
+#  Variables :
+E=None
+_home=None
+_exportNode='''<ExportNode>
+  <Path>&lt;nim_shot_comp&gt;/&lt;nim_shot_name&gt;_v01</Path>
+  <Name>&lt;nim_unknown&gt;</Name>
+</ExportNode>
+'''
+
+
+def setUpModule() :
+    'Imports nimFlameExport with a NIM home of its own, as it writes the default preferences'
+    global E, _home
+    _home=tempfile.mkdtemp( prefix='nim_flame_' )
+    os.makedirs( os.path.join( _home, '.nim' ) )
+    with open( os.path.join( _home, '.nim', 'prefs.nim' ), 'w' ) as prefsFile :
+        prefsFile.write( 'NIM_URL=http://127.0.0.1:9/nimAPI.php?\nNIM_User=test\n' )
+    environ=dict( os.environ )
+    os.environ['HOME']=os.environ['USERPROFILE']=_home
+    try :
+        import nimFlameExport
+        E=nimFlameExport
+    except Exception, e :
+        E=None
+        raise unittest.SkipTest( 'nimFlameExport can\'t be imported here - %s' % e )
+    finally :
+        os.environ.clear()
+        os.environ.update( environ )
+
+def tearDownModule() :
+    if _home :
+        shutil.rmtree( _home, ignore_errors=True )
+
+
+class RewriteKeywordsTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.tmpDir=tempfile.mkdtemp( prefix='nim_keywords_' )
+        self.path=os.path.join( self.tmpDir, 'SH010_v01.export_node' )
+        with open( self.path, 'wb' ) as f :
+            f.write( _exportNode )
+        os.chmod( self.path, 0640 )
+        self.scanSize=E.keywordScanSize
+        return
+
+    def tearDown(self) :
+        E.keywordScanSize=self.scanSize
+        shutil.rmtree( self.tmpDir, ignore_errors=True )
+        return
+
+    def _read(self) :
+        with open( self.path, 'rb' ) as f :
+            return f.read()
+
+    def test_rewrite(self) :
+        'Known keywords are replaced, in utf-8, unknown ones are left, and the mode is kept'
+        nimPaths={'nim_shot_comp': u'/prj/sh\xe9/COMP', 'nim_shot_name': 'SH010'}
+        self.assertTrue( E.rewriteKeywords( self.path, nimPaths, tokenL='&lt;', tokenR='&gt;' ) )
+        self.assertEqual( self._read(), _exportNode.replace( '&lt;nim_shot_comp&gt;', '/prj/sh\xc3\xa9/COMP' )
+            .replace( '&lt;nim_shot_name&gt;', 'SH010' ) )
+        self.assertEqual( stat.S_IMODE( os.stat( self.path ).st_mode ), 0640 )
+        self.assertEqual( os.listdir( self.tmpDir ), [os.path.basename( self.path )] )
+
+    def test_no_keywords(self) :
+        'A file without keywords is left alone'
+        with open( self.path, 'wb' ) as f :
+            f.write( _exportNode.replace( '&lt;nim_', '&lt;' ) )
+        before=os.stat( self.path )
+        self.assertFalse( E.rewriteKeywords( self.path, {'nim_shot_name': 'SH010'}, tokenL='&lt;', tokenR='&gt;' ) )
+        self.assertEqual( os.stat( self.path ).st_ino, before.st_ino )
+
+    def test_split_marker(self) :
+        'A keyword split between the chunks the file is scanned in is found'
+        for size in range( 1, 12 ) :
+            E.keywordScanSize=size
+            self.assertTrue( E._hasKeywords( self.path, tokenL='&lt;' ), size )
+
+    def test_batch_keywords(self) :
+        'Each export_node is scanned once, and the shot\'s keywords are looked up once'
+        with open( os.path.join( self.tmpDir, 'SH010_v02.export_node' ), 'wb' ) as f :
+            f.write( _exportNode )
+        with open( os.path.join( self.tmpDir, 'plain.export_node' ), 'wb' ) as f :
+            f.write( '<ExportNode/>\n' )
+        scanned=[]
+        lookups=[]
+        hasKeywords, nimKeywords=E._hasKeywords, E.nimKeywords
+        E._hasKeywords=lambda path, tokenL='<' : scanned.append( os.path.basename( path ) ) or hasKeywords( path, tokenL=tokenL )
+        E.nimKeywords=lambda **kwargs : lookups.append( kwargs ) or {'nim_shot_comp': '/prj/COMP', 'nim_shot_name': 'SH010'}
+        try :
+            self.assertTrue( E.resolveBatchKeywords( nim_shotID=10, batch_path=self.tmpDir+'.batch' ) )
+        finally :
+            E._hasKeywords, E.nimKeywords=hasKeywords, nimKeywords
+        self.assertEqual( sorted( scanned ), ['SH010_v01.export_node', 'SH010_v02.export_node', 'plain.export_node'] )
+        self.assertEqual( lookups, [{'nim_shotID': 10}] )
+        self.assertIn( '/prj/COMP/SH010_v01', self._read() )
+
+
+if __name__=='__main__' :
+    unittest.main()
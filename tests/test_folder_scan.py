@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_folder_scan.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Tests the Flame openClip folder scan - which subfolders it reports as new or
+#  changed since they were recorded against a clip, and its state file.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import os, shutil, sys, tempfile, time, unittest
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( root, 'plugins', 'Flame', 'python' ) )
+
+#  NIM Imports :
+import nimFolderScan
+
+
+class FolderScanTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.tmpDir=tempfile.mkdtemp( prefix='nim_folderscan_' )
+        self.comp=os.path.join( self.tmpDir, 'SH010', 'COMP' )
+        self.stateFile=os.path.join( self.tmpDir, 'state', 'folderScan.json' )
+        self.clipFile=os.path.join( self.tmpDir, 'SH010_comp.clip' )
+        open( self.clipFile, 'w' ).close()
+        for name in ['v01', 'v02'] :
+            self._frames( name )
+        return
+
+    def tearDown(self) :
+        shutil.rmtree( self.tmpDir, ignore_errors=True )
+        return
+
+    def _frames( self, name='', frames=2 ) :
+        'Writes a render folder, dated in the past so it has settled'
+        folder=os.path.join( self.comp, name )
+        if not os.path.isdir( folder ) :
+            os.makedirs( folder )
+        for frame in range( 1, frames+1 ) :
+            open( os.path.join( folder, '%s.%04d.exr' % (name, frame) ), 'w' ).close()
+        stamp=time.time()-60-frames
+        os.utime( folder, (stamp, stamp) )
+        return folder
+
+    def test_changed(self) :
+        'Only new and changed subfolders are reported after the clip is recorded'
+        scan=nimFolderScan.FolderScan( stateFile=self.stateFile )
+        found=scan.walk( self.comp )
+        self.assertEqual( sorted( [subfolder for subfolder, fingerprint in found] ),
+            [os.path.join( self.comp, 'v01' ), os.path.join( self.comp, 'v02' )] )
+        self.assertEqual( len( scan.changed( self.clipFile, found ) ), 2 )
+        scan.record( self.clipFile, found )
+        self.assertEqual( scan.changed( self.clipFile, scan.walk( self.comp ) ), [] )
+
+        #  A frame added to v02, and a new v03 :
+        v02=self._frames( 'v02', frames=3 )
+        v03=self._frames( 'v03' )
+        self.assertEqual( sorted( scan.changed( self.clipFile, scan.walk( self.comp ) ) ), [v02, v03] )
+
+        #  A removed clip gets everything again :
+        os.remove( self.clipFile )
+        self.assertEqual( len( scan.changed( self.clipFile, scan.walk( self.comp ) ) ), 3 )
+
+    def test_state_file(self) :
+        'What was recorded is read back from the state file by a new scan'
+        scan=nimFolderScan.FolderScan( stateFile=self.stateFile )
+        found=scan.walk( self.comp )
+        scan.record( self.clipFile, found )
+        self.assertTrue( scan.save() )
+
+        scan=nimFolderScan.FolderScan( stateFile=self.stateFile )
+        self.assertEqual( scan.changed( self.clipFile, scan.walk( self.comp ) ), [] )
+        scan.forget( self.clipFile )
+        self.assertEqual( len( scan.changed( self.clipFile, scan.walk( self.comp ) ) ), 2 )
+
+    def test_undecodable_paths(self) :
+        'Paths that aren\'t utf-8 are left out of the state file, and scanned again next time'
+        bad=self._frames( 'v03_\xff' )
+        scan=nimFolderScan.FolderScan( stateFile=self.stateFile )
+        found=scan.walk( self.comp )
+        scan.record( self.clipFile, found )
+        self.assertTrue( scan.save() )
+
+        scan=nimFolderScan.FolderScan( stateFile=self.stateFile )
+        self.assertEqual( scan.changed( self.clipFile, scan.walk( self.comp ) ), [bad] )
+
+
+if __name__=='__main__' :
+    unittest.main()
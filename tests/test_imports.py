@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_imports.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Checks that the headless nim_core modules, used by render farm tasks and
+#  startup scripts, don't import the GUI or the applications.  Each module is
+#  imported in a fresh interpreter.  benchmarks/bench_import.py times them.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import json, os, shutil, subprocess, sys, tempfile, unittest
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+
+
+#  Variables :
+headless=['nim_core.nim_api', 'nim_core.nim_batch', 'nim_core.nim_client', 'nim_core.nim_file',
+    'nim_core.nim_postsave', 'nim_core.nim_prefs', 'nim_core.nim_prewarm', 'nim_core.nim_publish',
+    'nim_core.nim_versions']
+#  Imported on first use only :
+gui=['nim_core.nim', 'nim_core.nim_tools', 'nim_core.nim_win', 'nim_core.nim_thumbs', 'nim_core.UI',
+    'PySide', 'PySide2', 'PyQt4', 'PyQt5']
+
+_child='''
+import json, sys
+sys.path.insert( 0, %r )
+__import__( %r )
+print json.dumps( sorted( [key for key in sys.modules if sys.modules[key] is not None] ) )
+'''
+
+
+def _loaded( module='' ) :
+    'Imports a module in a new interpreter, with an empty NIM home, returning the modules loaded'
+    home=tempfile.mkdtemp( prefix='nim_imports_' )
+    env=dict( os.environ )
+    env['HOME']=env['USERPROFILE']=home
+    try :
+        output=subprocess.check_output( [sys.executable, '-c', _child % (root, module)], env=env, cwd=home )
+    finally :
+        shutil.rmtree( home, ignore_errors=True )
+    return json.loads( output.strip().splitlines()[-1] )
+
+
+class ImportTest( unittest.TestCase ) :
+
+    def test_headless_modules(self) :
+        'The headless modules don\'t load the GUI modules or Qt'
+        for module in headless :
+            loaded=_loaded( module )
+            self.assertIn( module, loaded )
+            self.assertEqual( [name for name in gui if name in loaded], [], module )
+
+
+if __name__=='__main__' :
+    unittest.main()
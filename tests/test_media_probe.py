@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_media_probe.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Tests the Flame media probe pool, with NIM_FLAME_MEDIA_SCRIPT pointed at a stub
+#  of dl_get_media_info.  The stub logs how many probes are running when it starts,
+#  and hangs when asked to probe a folder named "hang".
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import os, shutil, stat, sys, tempfile, time, unittest
+
+root=os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( root, 'plugins', 'Flame', 'python' ) )
+
+#  NIM Imports :
+import nimMediaProbe
+
+
+_stub='''#!/bin/sh
+touch "%(running)s/$$"
+ls "%(running)s" | wc -l >> "%(log)s"
+case "$*" in *hang*) sleep 30;; esac
+sleep 0.2
+rm -f "%(running)s/$$"
+echo "<clip><args>$*</args></clip>"
+'''
+
+
+@unittest.skipUnless( os.name=='posix', 'the stub probe script is a shell script' )
+class MediaProbeTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.tmpDir=tempfile.mkdtemp( prefix='nim_probe_' )
+        self.running=os.path.join( self.tmpDir, 'running' )
+        self.log=os.path.join( self.tmpDir, 'probes.log' )
+        os.makedirs( self.running )
+        script=os.path.join( self.tmpDir, 'dl_get_media_info' )
+        with open( script, 'w' ) as f :
+            f.write( _stub % {'running': self.running, 'log': self.log} )
+        os.chmod( script, stat.S_IRWXU )
+        self.environ=os.environ.get( nimMediaProbe.mediaScriptEnv )
+        os.environ[nimMediaProbe.mediaScriptEnv]=script
+        return
+
+    def tearDown(self) :
+        if self.environ is None :
+            os.environ.pop( nimMediaProbe.mediaScriptEnv, None )
+        else :
+            os.environ[nimMediaProbe.mediaScriptEnv]=self.environ
+        shutil.rmtree( self.tmpDir, ignore_errors=True )
+        return
+
+    def _folder( self, name='' ) :
+        'Makes a media folder with one frame in it'
+        folder=os.path.join( self.tmpDir, 'media', name )
+        os.makedirs( folder )
+        open( os.path.join( folder, name+'.0001.exr' ), 'w' ).close()
+        return folder
+
+    def _runs(self) :
+        'Returns the number of probes running as each stub started'
+        if not os.path.isfile( self.log ) :
+            return []
+        with open( self.log ) as f :
+            return [int( line ) for line in f.read().split()]
+
+    def test_concurrent_probes(self) :
+        'Probes run at the same time, never more than maxProbes'
+        folders=[self._folder( 'plate%02d' % index ) for index in range( nimMediaProbe.maxProbes*3 )]
+        probe=nimMediaProbe.MediaProbe()
+        start=time.time()
+        results=probe.probe_all( folders )
+        elapsed=time.time()-start
+        self.assertEqual( [result.path for result in results], folders )
+        self.assertTrue( all( [result.returncode==0 and folder in result.stdout for result, folder in zip( results, folders )] ) )
+        runs=self._runs()
+        self.assertEqual( len( runs ), len( folders ) )
+        self.assertTrue( 1 < max( runs ) <= nimMediaProbe.maxProbes, runs )
+        #  Three rounds of 0.2 second probes, not twelve :
+        self.assertTrue( elapsed < 0.2*len( folders ), elapsed )
+
+    def test_cached(self) :
+        'A repeated probe is answered from the cache'
+        folder=self._folder( 'plate' )
+        probe=nimMediaProbe.MediaProbe()
+        first=probe.probe( folder )
+        self.assertIs( probe.probe( folder ), first )
+        self.assertIs( probe.cached( folder ), first )
+        self.assertEqual( len( self._runs() ), 1 )
+
+    def test_folder_changed(self) :
+        'A change to the folder\'s modification time probes it again'
+        folder=self._folder( 'plate' )
+        probe=nimMediaProbe.MediaProbe()
+        probe.probe( folder )
+        open( os.path.join( folder, 'plate.0002.exr' ), 'w' ).close()
+        mtime=os.stat( folder ).st_mtime+10
+        os.utime( folder, (mtime, mtime) )
+        self.assertIsNone( probe.cached( folder ) )
+        probe.probe( folder )
+        self.assertEqual( len( self._runs() ), 2 )
+        probe.probe( folder )
+        self.assertEqual( len( self._runs() ), 2 )
+
+    def test_timeout(self) :
+        'A hanging probe is killed at the timeout, and isn\'t cached'
+        folder=self._folder( 'hang' )
+        probe=nimMediaProbe.MediaProbe( timeout=0.5 )
+        start=time.time()
+        result=probe.probe( folder )
+        self.assertTrue( time.time()-start < 5 )
+        self.assertTrue( result.timedOut )
+        self.assertNotEqual( result.returncode, 0 )
+        self.assertIsNone( probe.cached( folder ) )
+        probe.probe( folder )
+        self.assertEqual( len( self._runs() ), 2 )
+
+
+if __name__=='__main__' :
+    unittest.main()
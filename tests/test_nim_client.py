@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_nim_client.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Stress test for nim_client.NimClient - many threads share clients, switch
+#  between clients with "with client :", and ask for the same cached queries at
+#  once, against a local stand-in NIM server.  Checks that every answer goes to
+#  the thread that asked for it, with the right user, and that shared queries and
+#  uploads reach the server as often as they should.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import os, shutil, sys, tempfile, threading, time, unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+#  NIM Imports :
+import nim_core.nim_client as Client
+from nim_test_server import NimTestServer
+
+
+#  Variables :
+threads=16
+calls=20
+
+
+def _echo( params=None, headers=None ) :
+    'Answers with the query\'s ID and the user and API key it was sent with'
+    return [{'ID': params.get( 'ID' ), 'user': headers.get( 'x-nim-api-user' ), 'key': headers.get( 'x-nim-api-key' )}]
+
+def _start( target=None, count=threads ) :
+    'Runs target( index ) in several threads, released at the same time, and returns the errors raised'
+    go=threading.Event()
+    errors=[]
+    def _run( index ) :
+        go.wait()
+        try :
+            target( index )
+        except Exception, e :
+            errors.append( e )
+    pool=[threading.Thread( target=_run, args=(index,) ) for index in range( count )]
+    for thread in pool : thread.start()
+    go.set()
+    for thread in pool : thread.join( 60 )
+    return errors
+
+
+class NimClientTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.failed=0
+        self.server=NimTestServer( routes={'echo': _echo, 'getShows': _echo, 'testAPI': [{'success': True}]} )
+        self.server.start()
+        return
+
+    def tearDown(self) :
+        self.server.stop()
+        return
+
+    def test_shared_client(self) :
+        'Threads sharing one client each get the answers to their own queries'
+        client=Client.NimClient( nimURL=self.server.url, apiUser='artist', apiKey='secret' )
+        def _calls( index ) :
+            for call in range( calls ) :
+                ID='%d.%d' % (index, call)
+                method=client.get if call % 2 else client.post
+                result=method( {'q': 'echo', 'ID': ID} )
+                assert result==[{'ID': ID, 'user': 'artist', 'key': 'secret'}], result
+
+        self.assertEqual( _start( _calls ), [] )
+        self.assertEqual( self.server.hits( 'echo' ), threads*calls )
+
+    def test_client_per_thread(self) :
+        'Each thread\'s "with client :" sends its module calls through its own client only'
+        clients=[Client.NimClient( nimURL=self.server.url, apiUser='user%d' % index, apiKey='key%d' % index )
+            for index in range( threads )]
+        def _calls( index ) :
+            for call in range( calls ) :
+                with clients[index] :
+                    assert Client.current() is clients[index]
+                    result=Client.get( {'q': 'echo', 'ID': call} )
+                    assert result[0]['user']=='user%d' % index, result
+                    assert result[0]['key']=='key%d' % index, result
+                    #  A nested client is used, then the outer one again :
+                    with clients[(index+1) % threads] :
+                        assert Client.get( {'q': 'echo', 'ID': call} )[0]['user']=='user%d' % ((index+1) % threads)
+                    assert Client.get( {'q': 'echo', 'ID': call} )[0]['user']=='user%d' % index
+                assert Client.current() is Client._default
+
+        self.assertEqual( _start( _calls ), [] )
+        self.assertEqual( self.server.hits( 'echo' ), threads*calls*3 )
+        self.assertIs( Client.current(), Client._default )
+
+    def test_cached_get_single_flight(self) :
+        'Concurrent identical cached queries share one request, and callers get their own copies'
+        client=Client.NimClient( nimURL=self.server.url, apiUser='artist' )
+        self.server.delay=0.2
+        results=[None]*threads
+        def _calls( index ) :
+            results[index]=client.cached_get( {'q': 'getShows', 'ID': 7} )
+            results[index][0]['changed']=index
+
+        self.assertEqual( _start( _calls ), [] )
+        self.assertEqual( self.server.hits( 'getShows' ), 1 )
+        self.assertEqual( sorted( [result[0].pop( 'changed' ) for result in results] ), range( threads ) )
+        for result in results :
+            self.assertEqual( result, [{'ID': '7', 'user': 'artist', 'key': ''}] )
+
+        #  Cached, until the cache is cleared :
+        self.server.delay=0.0
+        self.assertEqual( _start( lambda index : client.cached_get( {'q': 'getShows', 'ID': 7} ) ), [] )
+        self.assertEqual( self.server.hits( 'getShows' ), 1 )
+        Client.clear_cache( q='getShows' )
+        client.cached_get( {'q': 'getShows', 'ID': 7} )
+        self.assertEqual( self.server.hits( 'getShows' ), 2 )
+
+    def test_cached_get_failure(self) :
+        'A failed shared query raises in every waiting caller, and isn\'t cached'
+        def _fail( params=None, headers=None ) :
+            if not self.failed :
+                self.failed+=1
+                return [{'success': False, 'error': 'Database busy'}]
+            return [{'ID': params.get( 'ID' )}]
+        self.server.routes['getJobs']=_fail
+        self.server.delay=0.2
+        client=Client.NimClient( nimURL=self.server.url, apiUser='artist' )
+
+        errors=_start( lambda index : client.cached_get( {'q': 'getJobs', 'ID': 1} ) )
+        self.assertEqual( len( errors ), threads )
+        self.assertTrue( all( [isinstance( e, Client.NimAPIError ) for e in errors] ) )
+        self.assertEqual( self.server.hits( 'getJobs' ), 1 )
+        self.assertEqual( client.cached_get( {'q': 'getJobs', 'ID': 1} ), [{'ID': '1'}] )
+        self.assertEqual( self.server.hits( 'getJobs' ), 2 )
+
+    def test_upload_slots(self) :
+        'Concurrent uploads to a server are limited to max_uploads_per_host at once'
+        self.server.routes['uploadReview']=lambda params, headers : {'success': True, 'ID': params.get( 'ID' )}
+        client=Client.NimClient( nimURL=self.server.url, apiUser='artist', apiKey='secret' )
+        tmpDir=tempfile.mkdtemp( prefix='nim_upload_' )
+        try :
+            filePath=os.path.join( tmpDir, 'SH010_comp_v01.mov' )
+            with open( filePath, 'wb' ) as f :
+                f.write( os.urandom( 64*1024 ) )
+            def _upload( index ) :
+                with open( filePath, 'rb' ) as f :
+                    response=client.upload( {'q': 'uploadReview', 'ID': str(index), 'file': f} )
+                assert '"ID": "%d"' % index in response, response
+
+            #  Check for a redirect before timing the uploads :
+            _upload( 0 )
+            self.server.reset()
+            self.server.delay=0.1
+            self.assertEqual( _start( _upload ), [] )
+        finally :
+            shutil.rmtree( tmpDir, ignore_errors=True )
+        self.assertEqual( self.server.hits( 'uploadReview' ), threads )
+        self.assertTrue( 1 < self.server.maxActive <= Client.max_uploads_per_host, self.server.maxActive )
+        for record in self.server.requests :
+            self.assertEqual( record['headers'].get( 'x-nim-api-user' ), 'artist' )
+
+    def test_connection_error(self) :
+        'Every thread gets a NimConnectionError when the server is down'
+        client=Client.NimClient( nimURL=self.server.url, apiUser='artist', timeout=5 )
+        self.server.stop()
+        errors=_start( lambda index : client.get( {'q': 'echo', 'ID': index} ) )
+        self.assertEqual( len( errors ), threads )
+        self.assertTrue( all( [isinstance( e, Client.NimConnectionError ) for e in errors] ) )
+
+
+if __name__=='__main__' :
+    unittest.main()
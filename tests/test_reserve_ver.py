@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_reserve_ver.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Stress test for nim_file.reserve_ver - many processes, each running several
+#  threads, version up the same basename at once, the way artists and farm jobs
+#  saving on a shared file system do.  No DCC is needed - each simulated save
+#  plans its version from the files on disk, reserves it, writes the file and
+#  releases the reservation.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import multiprocessing, os, random, shutil, sys, tempfile, threading, time, unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+#  NIM Imports :
+import nim_core.nim_file as F
+
+
+#  Variables :
+processes=4
+threads=4
+saves=10
+basename='SH010_comp'
+ext='.nk'
+
+
+def _save( fileDir='', results=None ) :
+    'Versions up the basename once, as verUp does, recording the version written'
+    verNum=F.scan_dir( fileDir, useCache=False ).max_ver( basename=basename )+1
+    verNum, lockPath=F.reserve_ver( fileDir=fileDir, basename=basename, verNum=verNum, ext=ext )
+    if not lockPath :
+        results.append( None )
+        return
+    try :
+        #  Give the other saves time to race for the same version :
+        time.sleep( random.uniform( 0, 0.005 ) )
+        fileName='%s_v%s%s' % ( basename, str(verNum).zfill(2), ext )
+        with open( os.path.join( fileDir, fileName ), 'wb' ) as f :
+            f.write( '%s\n' % os.getpid() )
+    finally :
+        F.release_ver( lockPath )
+    results.append( verNum )
+
+def _worker( fileDir='', queue=None ) :
+    'Runs the saves of one simulated session'
+    results=[]
+    def _run() :
+        for index in range( saves ) :
+            _save( fileDir, results )
+    pool=[threading.Thread( target=_run ) for index in range( threads )]
+    for thread in pool : thread.start()
+    for thread in pool : thread.join()
+    queue.put( results )
+
+
+class ReserveVerTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.fileDir=tempfile.mkdtemp( prefix='nim_reserve_' )
+
+    def tearDown(self) :
+        shutil.rmtree( self.fileDir, ignore_errors=True )
+
+    def test_concurrent_saves(self) :
+        'Every concurrent save gets a different version, and no reservation is left behind'
+        queue=multiprocessing.Queue()
+        pool=[multiprocessing.Process( target=_worker, args=(self.fileDir, queue) ) for index in range( processes )]
+        for process in pool : process.start()
+        versions=[]
+        for process in pool :
+            versions.extend( queue.get( timeout=120 ) )
+        for process in pool : process.join()
+
+        total=processes*threads*saves
+        self.assertNotIn( None, versions )
+        self.assertEqual( len(versions), total )
+        self.assertEqual( len(set(versions)), total )
+        fileNames=os.listdir( self.fileDir )
+        self.assertEqual( len([name for name in fileNames if name.endswith( ext )]), total )
+        self.assertEqual( [name for name in fileNames if name.endswith( '.lock' )], [] )
+
+    def test_abandoned_reservation(self) :
+        'A reservation older than reserve_ttl is taken over, a recent one is skipped'
+        verNum, lockPath=F.reserve_ver( fileDir=self.fileDir, basename=basename, verNum=1, ext=ext )
+        self.assertEqual( verNum, 1 )
+        self.assertEqual( F.reserve_ver( fileDir=self.fileDir, basename=basename, verNum=1, ext=ext )[0], 2 )
+        stale=time.time()-F.reserve_ttl-60
+        os.utime( lockPath, (stale, stale) )
+        self.assertEqual( F.reserve_ver( fileDir=self.fileDir, basename=basename, verNum=1, ext=ext )[0], 1 )
+
+    def test_failed_save_releases(self) :
+        'verUp releases its reservation when the save raises'
+        class _Nim( object ) :
+            def filePath(self) : return ''
+            def app(self) : raise RuntimeError( 'Save failed' )
+
+        reserved=[]
+        def _plan( nim=None, padding=2, pub=False ) :
+            verNum, lockPath=F.reserve_ver( fileDir=self.fileDir, basename=basename, verNum=1, ext=ext )
+            reserved.append( lockPath )
+            fileName='%s_v%s%s' % ( basename, str(verNum).zfill(2), ext )
+            return {'basename': basename, 'fileDir': self.fileDir, 'projDir': '', 'verNum': verNum, 'ext': ext,
+                'fileName': fileName, 'filePath': os.path.join( self.fileDir, fileName ), 'renDir': '',
+                'compPath': '', 'context': {}, 'reservation': lockPath}
+
+        plan_verUp=F.plan_verUp
+        F.plan_verUp=_plan
+        try :
+            self.assertRaises( RuntimeError, F.verUp, nim=_Nim() )
+        finally :
+            F.plan_verUp=plan_verUp
+        self.assertTrue( reserved[0] )
+        self.assertFalse( os.path.exists( reserved[0] ) )
+
+
+if __name__=='__main__' :
+    unittest.main()
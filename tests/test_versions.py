@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#******************************************************************************
+#
+# Filename: tests/test_versions.py
+# Version:  v4.0.61.210104
+#
+# Copyright (c) 2014-2021 NIM Labs LLC
+# All rights reserved.
+#
+# Use of this software is subject to the terms of the NIM Labs license
+# agreement provided at the time of installation or download, or which
+# otherwise accompanies this software in either electronic or hard copy form.
+# *****************************************************************************
+
+#  Tests nim_versions.VersionIndex - a basename's versions are fetched once for
+#  every thread logging files under it, and each file name is saved only once.
+#  The nim_api calls it makes are replaced by ones that count them.
+#
+#      python -m unittest discover -s tests
+
+
+#  General Imports :
+import itertools, os, sys, threading, time, unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+#  NIM Imports :
+import nim_core.nim_client as Client
+import nim_core.nim_versions as Versions
+Api=Versions.Api
+
+
+#  Variables :
+threads=8
+
+
+class VersionIndexTest( unittest.TestCase ) :
+
+    def setUp(self) :
+        self.calls=[]
+        self.versions=[]
+        self.ids=itertools.count( 100 )
+        self.patched={}
+        for name in ['get_vers', 'save_file', 'update_file'] :
+            self.patched[name]=getattr( Api, name )
+            setattr( Api, name, getattr( self, '_'+name ) )
+        return
+
+    def tearDown(self) :
+        for name, func in self.patched.items() :
+            setattr( Api, name, func )
+        return
+
+    def _get_vers( self, **kwargs ) :
+        self.calls.append( ('get_vers', kwargs) )
+        time.sleep( 0.05 )
+        if isinstance( self.versions, Exception ) :
+            raise self.versions
+        return self.versions
+
+    def _save_file( self, **kwargs ) :
+        self.calls.append( ('save_file', kwargs['filename']) )
+        return {'success': 'true', 'ID': next( self.ids )}
+
+    def _update_file( self, ID=None, **kwargs ) :
+        self.calls.append( ('update_file', ID) )
+        return {'success': 'true', 'ID': ID}
+
+    def _count( self, name='' ) :
+        return len( [call for call in self.calls if call[0]==name] )
+
+    def test_single_fetch(self) :
+        'Threads logging under one basename fetch its versions once, and save each file once'
+        index=Versions.VersionIndex()
+        def _log( number ) :
+            for repeat in range( 2 ) :
+                index.log_file( parent='shot', parentID=10, basename='SH010_comp',
+                    filename='SH010_comp_v%02d.nk' % (number % 4) )
+        pool=[threading.Thread( target=_log, args=(number,) ) for number in range( threads )]
+        for thread in pool : thread.start()
+        for thread in pool : thread.join()
+
+        self.assertEqual( self._count( 'get_vers' ), 1 )
+        self.assertEqual( self.calls[0][1], {'shotID': 10, 'basename': 'SH010_comp'} )
+        self.assertEqual( self._count( 'save_file' ), 4 )
+        self.assertEqual( self._count( 'update_file' ), threads*2-4 )
+
+    def test_logged_versions(self) :
+        'Files already logged are updated by their file ID'
+        self.versions=[{'filename': 'SH010_comp_v01.nk', 'fileID': 7}]
+        index=Versions.VersionIndex()
+        self.assertEqual( index.file_id( parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' ), 7 )
+        index.log_file( parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' )
+        index.log_file( parent='asset', parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' )
+        self.assertEqual( self.calls[1], ('update_file', 7) )
+        self.assertEqual( self.calls[2][1], {'assetID': 10, 'basename': 'SH010_comp'} )
+        self.assertEqual( self.calls[3], ('update_file', 7) )
+
+    def test_fetch_errors(self) :
+        'A failed fetch reaches the caller, and is tried again next time'
+        self.versions=Client.NimConnectionError( reason='Connection refused' )
+        index=Versions.VersionIndex()
+        self.assertRaises( Client.NimConnectionError, index.log_file, parentID=10, basename='SH010_comp',
+            filename='SH010_comp_v01.nk' )
+        self.assertEqual( self._count( 'save_file' ), 0 )
+        self.versions=False
+        index.log_file( parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' )
+        self.versions=[]
+        index.log_file( parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' )
+        index.log_file( parentID=10, basename='SH010_comp', filename='SH010_comp_v01.nk' )
+        self.assertEqual( self._count( 'get_vers' ), 3 )
+
+
+if __name__=='__main__' :
+    unittest.main()